@@ -0,0 +1 @@
+"""Performance harnesses for the Fogsift Memory System. Run from fogsift-api/."""
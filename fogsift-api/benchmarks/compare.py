@@ -0,0 +1,81 @@
+"""
+Compares two benchmarks.suite result files and flags regressions.
+
+    python -m benchmarks.compare base.json head.json
+    python -m benchmarks.compare base.json head.json --threshold 15 --metric p99_ms
+
+A scenario regresses when its latency metric grows (or ops_per_sec drops)
+by more than --threshold percent. Exits 1 if any scenario regressed, so it
+can gate a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "ops_per_sec"]
+
+
+def change_pct(base: float, head: float) -> float:
+    if not base:
+        return 0.0
+    return (head - base) / base * 100
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], metric: str,
+            threshold: float) -> Tuple[List[List[str]], List[str]]:
+    """Returns table rows for the shared scenarios and the names that regressed."""
+    rows: List[List[str]] = []
+    regressions: List[str] = []
+    for name, base_result in base["results"].items():
+        head_result = head["results"].get(name)
+        if head_result is None:
+            continue
+        row = [name]
+        for m in METRICS:
+            row.append(f"{base_result[m]:.3f} -> {head_result[m]:.3f} ({change_pct(base_result[m], head_result[m]):+.1f}%)")
+        delta = change_pct(base_result[metric], head_result[metric])
+        worse = -delta if metric == "ops_per_sec" else delta
+        if worse > threshold:
+            regressions.append(name)
+            row.append("REGRESSED")
+        else:
+            row.append("ok")
+        rows.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p95_ms", choices=METRICS)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for label, report in (("base", base), ("head", head)):
+        meta = report["meta"]
+        dirty = " (dirty)" if meta.get("dirty") else ""
+        print(f"{label}: {(meta.get('commit') or 'unknown')[:12]}{dirty} fragments={meta.get('fragments')}")
+    if base["meta"].get("fragments") != head["meta"].get("fragments"):
+        print("warning: runs used different --fragments; latencies are not comparable")
+
+    rows, regressions = compare(base, head, args.metric, args.threshold)
+    header = ["scenario", *METRICS, args.metric]
+    widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:g}% on {args.metric}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic memory-base generator for benchmarks.
+
+Keywords and topics follow Zipf distributions (a few very common terms, a
+long tail of rare ones), content length is log-normal around a couple of
+sentences, and links attach preferentially to already well-linked
+fragments. Everything is driven by one seed, so a given --seed and
+--fragments always produce the same data.
+
+    python -m benchmarks.datagen --fragments 100000 --db /tmp/fogsift_bench.db
+"""
+
+import argparse
+import bisect
+import itertools
+import random
+import time
+from typing import Iterator, List, Sequence
+
+from fogsift_memory_system import ConnectionPool, MemoryStore, MemorySearch, MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, LinkCreate, LinkRelationType
+
+# Rough production mix of fragment types
+TYPE_WEIGHTS = {
+    FragmentType.SOLUTION_APPROACH: 30,
+    FragmentType.DECISION: 25,
+    FragmentType.ERROR: 20,
+    FragmentType.PROCEDURE: 12,
+    FragmentType.CLIENT_PATTERN: 10,
+    FragmentType.PREFERENCE: 3,
+}
+_SYLLABLES = ["ka", "lo", "mi", "ra", "te", "zu", "po", "ne", "si", "vo", "da", "qu"]
+
+
+class ZipfSampler:
+    """Samples ranks 0..n-1 with P(rank k) proportional to 1 / (k + 1) ** s."""
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.rng = rng
+        self._cumulative = list(itertools.accumulate(1 / (k + 1) ** s for k in range(n)))
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self._cumulative, self.rng.random() * self._cumulative[-1])
+
+    def sample_distinct(self, k: int) -> List[int]:
+        picked: List[int] = []
+        while len(picked) < k:
+            rank = self.sample()
+            if rank not in picked:
+                picked.append(rank)
+        return picked
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(_SYLLABLES, k=rng.randint(2, 4))))
+    ordered = sorted(words)
+    rng.shuffle(ordered)  # Rank order independent of spelling
+    return ordered
+
+
+class SyntheticCorpus:
+    """Deterministic stream of FragmentCreate requests and link endpoints."""
+
+    def __init__(self, seed: int = 7, vocab_size: int = 5000, topics: int = 200,
+                 keyword_skew: float = 1.1, topic_skew: float = 1.0):
+        self.rng = random.Random(seed)
+        self.vocabulary = make_vocabulary(vocab_size, self.rng)
+        self.topics = [f"client-{i}" for i in range(topics)]
+        self.keyword_ranks = ZipfSampler(vocab_size, keyword_skew, self.rng)
+        self.topic_ranks = ZipfSampler(topics, topic_skew, self.rng)
+        self._types = list(TYPE_WEIGHTS)
+        self._type_weights = list(TYPE_WEIGHTS.values())
+
+    def keywords(self, k: int) -> List[str]:
+        return [self.vocabulary[r] for r in self.keyword_ranks.sample_distinct(k)]
+
+    def topic(self) -> str:
+        return self.topics[self.topic_ranks.sample()]
+
+    def text(self, words: int) -> str:
+        return " ".join(self.vocabulary[self.keyword_ranks.sample()] for _ in range(words))
+
+    def fragments(self, count: int) -> Iterator[FragmentCreate]:
+        for i in range(count):
+            words = max(4, min(400, int(self.rng.lognormvariate(3.3, 0.6))))
+            yield FragmentCreate(
+                content=f"Fragment {i}. " + self.text(words),
+                topic=self.topic(),
+                type=self.rng.choices(self._types, self._type_weights)[0],
+                keywords=self.keywords(self.rng.randint(2, 6)),
+            )
+
+    def link_pairs(self, fragment_ids: Sequence[str], count: int) -> Iterator[tuple]:
+        """Preferential attachment: endpoints are drawn from earlier endpoints half the time."""
+        relations = list(LinkRelationType)
+        endpoints: List[str] = []
+        for _ in range(count):
+            if endpoints and self.rng.random() < 0.5:
+                source = self.rng.choice(endpoints)
+            else:
+                source = self.rng.choice(fragment_ids)
+            target = self.rng.choice(fragment_ids)
+            if source == target:
+                continue
+            endpoints.extend((source, target))
+            yield source, target, self.rng.choice(relations)
+
+
+def populate(service: MemoryService, corpus: SyntheticCorpus, fragments: int,
+             links_per_fragment: float = 0.5, batch_size: int = 1000) -> List[str]:
+    """Writes the corpus through remember_batch; returns the fragment ids."""
+    ids: List[str] = []
+    batch: List[FragmentCreate] = []
+    for request in corpus.fragments(fragments):
+        batch.append(request)
+        if len(batch) >= batch_size:
+            ids.extend(f.id for f in service.remember_batch(batch))
+            batch = []
+    if batch:
+        ids.extend(f.id for f in service.remember_batch(batch))
+
+    for source, target, relation in corpus.link_pairs(ids, int(fragments * links_per_fragment)):
+        service.link(LinkCreate(from_id=source, to_id=target, relation_type=relation))
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fragments", type=int, default=10_000)
+    parser.add_argument("--links-per-fragment", type=float, default=0.5)
+    parser.add_argument("--db", required=True, help="SQLite file to create or extend")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.db, size=1)
+    store = MemoryStore(pool)
+    service = MemoryService(store, MemorySearch(store))
+    started = time.perf_counter()
+    populate(service, SyntheticCorpus(args.seed), args.fragments, args.links_per_fragment)
+    pool.close()
+    print(f"wrote {args.fragments} fragments to {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
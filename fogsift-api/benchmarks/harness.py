@@ -0,0 +1,45 @@
+"""
+Timing helpers shared by the benchmark scripts.
+"""
+
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies_ms: List[float], elapsed_s: float, ops: int) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(statistics.mean(latencies_ms), 4),
+        "p50_ms": round(percentile(latencies_ms, 50), 4),
+        "p95_ms": round(percentile(latencies_ms, 95), 4),
+        "p99_ms": round(percentile(latencies_ms, 99), 4),
+        "max_ms": round(max(latencies_ms), 4),
+    }
+
+
+def measure(fn: Callable[[int], object], iterations: int, warmup: int = 10,
+            ops_per_call: int = 1) -> Dict[str, float]:
+    """Calls fn(i) for warmup + iterations rounds and summarizes the timed ones.
+
+    ops_per_call scales throughput for batched calls (e.g. 100 fragments per
+    remember_batch) while latencies stay per call.
+    """
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(warmup + i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, iterations * ops_per_call)
@@ -0,0 +1,140 @@
+"""
+Concurrent recall load test against the HTTP API.
+
+Seeds a temporary database, then fires concurrent POST /api/memory/recall
+requests through an in-process ASGI transport and reports latency
+percentiles plus event-loop lag (how late a 10ms heartbeat fires).
+
+    python -m benchmarks.recall_load --fragments 5000 --concurrency 32 --requests 2000
+    python -m benchmarks.recall_load --inline   # baseline: sync service on the loop
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from fogsift_memory_system import (
+    ConnectionPool, MemoryStore, MemorySearch, MemoryService, AsyncMemoryService,
+)
+from fogsift_memory_system.models import FragmentCreate, FragmentType
+import fogsift_memory_system.routes as routes
+
+from .harness import percentile
+
+VOCAB = [f"kw{i}" for i in range(200)]
+TOPICS = [f"topic{i}" for i in range(20)]
+
+
+class _InlineService:
+    """Baseline that runs the sync service directly on the event loop."""
+
+    def __init__(self, service: MemoryService):
+        self.service = service
+
+    async def recall(self, request):
+        return self.service.recall(request)
+
+    async def recall_json(self, request):
+        return self.service.recall_json(request)
+
+
+def seed(service: MemoryService, count: int, rng: random.Random) -> None:
+    for i in range(count):
+        service.remember(FragmentCreate(
+            content=f"Seed fragment {i} " + " ".join(rng.choices(VOCAB, k=30)),
+            topic=rng.choice(TOPICS),
+            type=rng.choice(list(FragmentType)),
+            keywords=rng.sample(VOCAB, 4),
+        ))
+
+
+async def run_load(app: FastAPI, total: int, concurrency: int, rng: random.Random):
+    latencies = []
+    lag = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append((time.perf_counter() - start) * 1000 - 10)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait({"keywords": rng.sample(VOCAB, 2), "token_budget": 2000})
+
+        async def worker():
+            while not queue.empty():
+                body = queue.get_nowait()
+                start = time.perf_counter()
+                resp = await client.post("/api/memory/recall", json=body)
+                resp.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        beat = asyncio.ensure_future(heartbeat())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await beat
+
+    return latencies, lag, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fragments", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--inline", action="store_true", help="run sync service on the loop (baseline)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "load.db"), size=args.pool_size)
+        store = MemoryStore(pool)
+        service = MemoryService(store, MemorySearch(store))
+        seed(service, args.fragments, rng)
+
+        if args.inline:
+            facade = _InlineService(service)
+        else:
+            facade = AsyncMemoryService(service, max_workers=args.pool_size + 1)
+        routes.memory_service = facade
+
+        app = FastAPI()
+        app.include_router(routes.router)
+        latencies, lag, elapsed = asyncio.run(run_load(app, args.requests, args.concurrency, rng))
+
+        if isinstance(facade, AsyncMemoryService):
+            facade.shutdown()
+        pool.close()
+
+    mode = "inline (blocking)" if args.inline else "thread-pool offload"
+    print(f"mode={mode} fragments={args.fragments} requests={args.requests} concurrency={args.concurrency}")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s")
+    print(
+        "latency ms: p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f}".format(
+            percentile(latencies, 50), percentile(latencies, 95),
+            percentile(latencies, 99), max(latencies),
+        )
+    )
+    if lag:
+        print(f"loop lag ms: mean={statistics.mean(lag):.2f} max={max(lag):.2f}")
+
+
+if __name__ == "__main__":
+    main()
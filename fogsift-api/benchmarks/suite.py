@@ -0,0 +1,311 @@
+"""
+Benchmark suite for the memory system hot paths.
+
+Builds (or reuses) a synthetic memory base from benchmarks.datagen, then
+times each scenario in-process against MemoryService, plus recall end to
+end through the HTTP routes. Every scenario reports p50/p95/p99 latency and
+throughput; --output writes them as JSON, tagged with the git commit, for
+benchmarks.compare to diff between commits.
+
+    python -m benchmarks.suite --fragments 10000 --output base.json
+    python -m benchmarks.suite --db /data/bench_1m.db --fragments 1000000 --output head.json
+    python -m benchmarks.suite --scenarios recall_l1,recall_l2 --iterations 2000
+    python -m benchmarks.suite --backend memory --fragments 10000
+
+Read scenarios run first so they see exactly the generated corpus; write
+scenarios run last. A --db that already holds fragments is reused as is
+(generate it once with benchmarks.datagen using the same --seed).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from fogsift_memory_system import (
+    ConnectionPool, MemoryStore, MemorySearch, MemoryService, AsyncMemoryService,
+    RecallCache, ReferenceTracker, EmbeddingIndex, InMemoryStore, InMemorySearch,
+)
+from fogsift_memory_system.models import FragmentCreate, LinkCreate, RecallRequest
+
+from .datagen import SyntheticCorpus, populate
+from .harness import measure, summarize
+
+READ_SCENARIOS = [
+    "recall_l1", "recall_l1_paged", "recall_l2", "recall_l2_json", "recall_l3", "recall_mixed",
+    "recall_links", "get_stats", "http_recall",
+]
+WRITE_SCENARIOS = ["remember", "remember_batch", "link"]
+SCENARIOS = READ_SCENARIOS + WRITE_SCENARIOS
+
+
+def git_commit() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+class Suite:
+    def __init__(self, service: MemoryService, corpus: SyntheticCorpus,
+                 fragment_ids: List[str], iterations: int, warmup: int,
+                 concurrency: int, pool_size: int):
+        self.service = service
+        self.corpus = corpus
+        self.fragment_ids = fragment_ids
+        self.iterations = iterations
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        # Query mixes are drawn up front so every run times the same requests
+        total = iterations + warmup
+        self.keyword_queries = [corpus.keywords(2) for _ in range(total)]
+        self.topic_queries = [corpus.topic() for _ in range(total)]
+        self.text_queries = [corpus.text(4) for _ in range(total)]
+
+    def _recall(self, **fields: Any) -> Callable[[int], object]:
+        def run(i: int):
+            request = RecallRequest(**{
+                name: value(i) if callable(value) else value for name, value in fields.items()
+            })
+            return self.service.recall(request)
+        return run
+
+    def recall_l1(self):
+        return measure(self._recall(keywords=lambda i: self.keyword_queries[i]),
+                       self.iterations, self.warmup)
+
+    def recall_l1_paged(self):
+        """Second page of a keyword recall (cursor continuation)."""
+        cursors = []
+        for keywords in self.keyword_queries:
+            page = self.service.recall(RecallRequest(keywords=keywords[:1], token_budget=100))
+            cursors.append((keywords[:1], page.next_cursor))
+        paged = [c for c in cursors if c[1]] or [(k[:1], None) for k in self.keyword_queries]
+        return measure(
+            self._recall(keywords=lambda i: paged[i % len(paged)][0],
+                         cursor=lambda i: paged[i % len(paged)][1]),
+            self.iterations, self.warmup,
+        )
+
+    def recall_l2(self):
+        return measure(self._recall(topic=lambda i: self.topic_queries[i]),
+                       self.iterations, self.warmup)
+
+    def recall_l2_json(self):
+        """recall_l2 including the HTTP encoding (RecallResult.to_json)."""
+        return measure(
+            lambda i: self.service.recall_json(RecallRequest(topic=self.topic_queries[i])),
+            self.iterations, self.warmup,
+        )
+
+    def recall_l3(self):
+        return measure(self._recall(text=lambda i: self.text_queries[i]),
+                       self.iterations, self.warmup)
+
+    def recall_mixed(self):
+        return measure(
+            self._recall(keywords=lambda i: self.keyword_queries[i],
+                         text=lambda i: self.text_queries[i],
+                         topic=lambda i: self.topic_queries[i],
+                         token_budget=4000),
+            self.iterations, self.warmup,
+        )
+
+    def recall_links(self):
+        return measure(
+            self._recall(keywords=lambda i: self.keyword_queries[i],
+                         include_links=True, link_depth=2, token_budget=4000),
+            self.iterations, self.warmup,
+        )
+
+    def get_stats(self):
+        return measure(lambda i: self.service.get_stats(),
+                       max(1, self.iterations // 10), min(self.warmup, 2))
+
+    def http_recall(self):
+        try:
+            import httpx
+        except ImportError:
+            return None  # httpx is only needed for the end-to-end scenario
+        from fastapi import FastAPI
+        import fogsift_memory_system.routes as routes
+
+        facade = AsyncMemoryService(self.service, max_workers=self.pool_size + 1)
+        routes.memory_service = facade
+        app = FastAPI()
+        app.include_router(routes.router)
+
+        async def run():
+            latencies: List[float] = []
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                queue: asyncio.Queue = asyncio.Queue()
+                for keywords in self.keyword_queries:
+                    queue.put_nowait({"keywords": keywords, "token_budget": 2000})
+
+                async def worker():
+                    while not queue.empty():
+                        body = queue.get_nowait()
+                        start = time.perf_counter()
+                        resp = await client.post("/api/memory/recall", json=body)
+                        resp.raise_for_status()
+                        latencies.append((time.perf_counter() - start) * 1000)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+                return latencies, time.perf_counter() - started
+
+        try:
+            latencies, elapsed = asyncio.run(run())
+        finally:
+            facade.shutdown()
+        return summarize(latencies, elapsed, len(latencies))
+
+    def remember(self):
+        requests = list(self.corpus.fragments(self.iterations + self.warmup))
+        return measure(lambda i: self.service.remember(requests[i]), self.iterations, self.warmup)
+
+    def remember_batch(self, batch_size: int = 100):
+        rounds = max(1, self.iterations // 10)
+        warmup = min(self.warmup, 2)
+        requests: List[FragmentCreate] = list(self.corpus.fragments((rounds + warmup) * batch_size))
+        return measure(
+            lambda i: self.service.remember_batch(requests[i * batch_size:(i + 1) * batch_size]),
+            rounds, warmup, ops_per_call=batch_size,
+        )
+
+    def link(self):
+        pairs = list(self.corpus.link_pairs(self.fragment_ids, self.iterations + self.warmup))
+        return measure(
+            lambda i: self.service.link(LinkCreate(
+                from_id=pairs[i][0], to_id=pairs[i][1], relation_type=pairs[i][2],
+            )),
+            len(pairs) - self.warmup, self.warmup,
+        )
+
+
+def run_suite(args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = None
+        if args.backend == "memory":
+            store = InMemoryStore()
+            search = InMemorySearch(store)
+        else:
+            pool = ConnectionPool(args.db or os.path.join(tmp, "bench.db"), size=args.pool_size)
+            store = MemoryStore(pool)
+            search = MemorySearch(store)
+        if not args.no_link_graph:
+            store.enable_link_graph()
+        if not args.no_keyword_index:
+            store.enable_keyword_index()
+        references = ReferenceTracker(store, args.references)
+        references.start()
+        embeddings = EmbeddingIndex(store) if args.embeddings else None
+        if embeddings:
+            embeddings.load()
+        service = MemoryService(
+            store, search,
+            cache=RecallCache() if args.cache else None,
+            references=references, embeddings=embeddings,
+        )
+        corpus = SyntheticCorpus(args.seed)
+
+        existing = store.get_stats()["total_fragments"]
+        load = None
+        if existing < args.fragments:
+            started = time.perf_counter()
+            populate(service, corpus, args.fragments - existing, args.links_per_fragment)
+            elapsed = time.perf_counter() - started
+            load = {"fragments": args.fragments - existing, "seconds": round(elapsed, 2),
+                    "fragments_per_sec": round((args.fragments - existing) / elapsed, 1)}
+            print(f"loaded {load['fragments']} fragments in {load['seconds']}s", file=sys.stderr)
+
+        fragment_ids = [f["id"] for f in store.iter_fragments()]
+        fragment_ids = random.Random(args.seed).sample(fragment_ids, min(5000, len(fragment_ids)))
+
+        suite = Suite(service, corpus, fragment_ids, args.iterations, args.warmup,
+                      args.concurrency, args.pool_size)
+        selected = args.scenarios.split(",") if args.scenarios else SCENARIOS
+        unknown = set(selected) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+        results: Dict[str, Any] = {}
+        for name in SCENARIOS:
+            if name not in selected:
+                continue
+            result = getattr(suite, name)()
+            if result is None:
+                print(f"{name:<16} skipped", file=sys.stderr)
+                continue
+            results[name] = result
+            print(
+                f"{name:<16} p50={result['p50_ms']:>9.3f}ms p95={result['p95_ms']:>9.3f}ms "
+                f"p99={result['p99_ms']:>9.3f}ms {result['ops_per_sec']:>10.1f} ops/s",
+                file=sys.stderr,
+            )
+
+        references.close()
+        if pool:
+            pool.close()
+
+    return {
+        "meta": {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "fragments": args.fragments,
+            "load": load,
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fragments", type=int, default=10_000)
+    parser.add_argument("--links-per-fragment", type=float, default=0.5)
+    parser.add_argument("--backend", default="sqlite", choices=("sqlite", "memory"),
+                        help="storage engine; memory ignores --db and --pool-size")
+    parser.add_argument("--db", help="reuse or create this SQLite file instead of a temporary one")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests for http_recall")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--references", default=ReferenceTracker.BUFFERED, choices=ReferenceTracker.MODES)
+    parser.add_argument("--cache", action="store_true", help="enable the recall cache (off: measure the raw path)")
+    parser.add_argument("--embeddings", action="store_true", help="enable L4 semantic recall")
+    parser.add_argument("--no-link-graph", action="store_true", help="expand links with SQL instead of the in-memory graph")
+    parser.add_argument("--no-keyword-index", action="store_true", help="answer L1 with SQL instead of the in-memory keyword index")
+    parser.add_argument("--scenarios", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Write-path benchmark: remember() against remember() plus the read-back it used to do.
+
+Seeds a file-backed database (WAL, like production), then times, on the
+same corpus:
+
+  remember             MemoryService.remember as it is now
+  remember+readback    the same call followed by store.get_fragment and a
+                       FragmentResponse rebuild, i.e. the old remember()
+  remember_batch/100   per-fragment cost when writing 100 at a time
+
+    python -m benchmarks.write_path --fragments 20000 --iterations 2000
+"""
+
+import argparse
+import os
+import tempfile
+
+from fogsift_memory_system import ConnectionPool, MemoryStore, MemorySearch, MemoryService
+from fogsift_memory_system.models import FragmentResponse
+
+from .datagen import SyntheticCorpus, populate
+from .harness import measure
+
+BATCH_SIZE = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fragments", type=int, default=10_000, help="rows in the table before timing")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "write.db"), size=2)
+        store = MemoryStore(pool)
+        service = MemoryService(store, MemorySearch(store))
+        corpus = SyntheticCorpus(args.seed)
+        populate(service, corpus, args.fragments, links_per_fragment=0)
+
+        rounds = args.iterations + args.warmup
+        plain = list(corpus.fragments(rounds))
+        readback = list(corpus.fragments(rounds))
+        batch_rounds = max(1, args.iterations // 100)
+        batch_warmup = min(2, args.warmup)
+        batched = list(corpus.fragments((batch_rounds + batch_warmup) * BATCH_SIZE))
+
+        def remember_with_readback(i):
+            response = service.remember(readback[i])
+            return FragmentResponse(**store.get_fragment(response.id))
+
+        def remember_batch(i):
+            batch = batched[i * BATCH_SIZE:(i + 1) * BATCH_SIZE]
+            if len(batch) != BATCH_SIZE:
+                raise RuntimeError(f"batch round {i} has {len(batch)} fragments, expected {BATCH_SIZE}")
+            return service.remember_batch(batch)
+
+        results = {
+            "remember": measure(lambda i: service.remember(plain[i]), args.iterations, args.warmup),
+            "remember+readback": measure(remember_with_readback, args.iterations, args.warmup),
+            f"remember_batch/{BATCH_SIZE}": measure(
+                remember_batch, batch_rounds, batch_warmup, ops_per_call=BATCH_SIZE,
+            ),
+        }
+        pool.close()
+
+    print(f"fragments={args.fragments} iterations={args.iterations}")
+    for name, r in results.items():
+        print(
+            f"{name:<20} p50={r['p50_ms']:>8.3f}ms p95={r['p95_ms']:>8.3f}ms "
+            f"p99={r['p99_ms']:>8.3f}ms {r['ops_per_sec']:>10.1f} fragments/s"
+        )
+    saved = results["remember+readback"]["p50_ms"] - results["remember"]["p50_ms"]
+    print(f"read-back cost at p50: {saved:.3f}ms "
+          f"({saved / results['remember+readback']['p50_ms'] * 100:.0f}% of the old remember)")
+
+
+if __name__ == "__main__":
+    main()
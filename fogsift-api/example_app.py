@@ -8,29 +8,31 @@ from contextlib import asynccontextmanager
 import uvicorn
 
 # Ensure your folder is named fogsift_memory_system or run from within it
-from fogsift_memory_system.schema import initialize_database
+from fogsift_memory_system.pool import ConnectionPool
 from fogsift_memory_system.store import MemoryStore
 from fogsift_memory_system.search import MemorySearch
 from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.async_service import AsyncMemoryService
 import fogsift_memory_system.routes as routes
 
-db_connection = None
+db_pool = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global db_connection
+    global db_pool
 
-    # 1. Initialize SQLite Database
-    db_connection = initialize_database("fogsift_memory.db")
+    # 1. Initialize SQLite Database (1 writer + 4 WAL readers)
+    db_pool = ConnectionPool("fogsift_memory.db", size=4)
 
     # 2. Setup System Layers
-    store = MemoryStore(db_connection)
+    store = MemoryStore(db_pool)
     search = MemorySearch(store)
     service = MemoryService(store, search)
 
-    # 3. Inject service into routes
-    routes.memory_service = service
+    # 3. Inject service into routes (blocking calls run off the event loop)
+    async_service = AsyncMemoryService(service, max_workers=5)
+    routes.memory_service = async_service
     print("\n[✔] Fogsift Memory System Online")
     print("[✔] Database connected: fogsift_memory.db")
     print("[✔] Docs available at: http://localhost:8000/docs\n")
@@ -38,9 +40,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Teardown
-    if db_connection:
-        db_connection.close()
-        print("[!] Database connection closed.")
+    async_service.shutdown()
+    if db_pool:
+        db_pool.close()
+        print("[!] Database connections closed.")
 
 
 app = FastAPI(
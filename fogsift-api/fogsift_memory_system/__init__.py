@@ -4,13 +4,58 @@ A tiered, SQLite-backed memory system for architectural patterns and client know
 """
 
 from .schema import initialize_database
+from .pool import ConnectionPool, PoolTimeout
+from .backend import StorageBackend, SearchBackend
 from .store import MemoryStore
+from .graph import LinkGraph
+from .keyword_index import KeywordIndex
+from .keywords import KeywordExtractor
+from .vocabulary import KeywordVocabulary
+from .metrics import Metrics
 from .search import MemorySearch
+from .inmemory import InMemoryStore, InMemorySearch
+from .cache import RecallCache
+from .ranking import RelevanceScorer
+from .tokens import ApproxTokenizer, TiktokenTokenizer, backfill_token_counts
+from .references import ReferenceTracker
+from .embeddings import EmbeddingIndex, HashingEncoder, VectorIndex
+from .tiering import TierPolicy, TieringJob
+from .sessions import SessionSweeper
 from .service import MemoryService
+from .sharding import ShardRouter, ShardedMemoryService, ShardLimitReached, UnknownTenant
+from .async_service import AsyncMemoryService
 
 __all__ = [
     "initialize_database",
+    "ConnectionPool",
+    "PoolTimeout",
+    "StorageBackend",
+    "SearchBackend",
     "MemoryStore",
+    "LinkGraph",
+    "KeywordIndex",
+    "KeywordExtractor",
+    "KeywordVocabulary",
+    "Metrics",
     "MemorySearch",
-    "MemoryService"
+    "InMemoryStore",
+    "InMemorySearch",
+    "RecallCache",
+    "RelevanceScorer",
+    "ApproxTokenizer",
+    "TiktokenTokenizer",
+    "backfill_token_counts",
+    "ReferenceTracker",
+    "EmbeddingIndex",
+    "HashingEncoder",
+    "VectorIndex",
+    "TierPolicy",
+    "TieringJob",
+    "SessionSweeper",
+    "MemoryService",
+    "ShardRouter",
+    "ShardedMemoryService",
+    "ShardLimitReached",
+    "UnknownTenant",
+    "AsyncMemoryService",
 ]
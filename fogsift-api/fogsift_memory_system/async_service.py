@@ -0,0 +1,106 @@
+"""
+Fogsift Memory System - Async Service Facade
+Runs blocking MemoryService calls on a worker thread pool so the event loop stays free.
+"""
+
+import asyncio
+import copy
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .models import (
+    FragmentCreate, FragmentResponse, LinkCreate, LinkResponse,
+    RecallRequest, RecallResponse, FragmentStats, PoolStats, ImportResponse,
+    SessionEndResponse, GraphResponse, LinkRelationType, ShardStatsResponse,
+)
+from .service import MemoryService
+
+
+class AsyncMemoryService:
+    """Awaitable wrapper around MemoryService.
+
+    Every call is dispatched to a dedicated executor, sized to match the
+    connection pool so worker threads don't queue behind pool checkouts.
+    """
+
+    def __init__(self, service: MemoryService, max_workers: Optional[int] = None):
+        self.service = service
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fogsift-memory"
+        )
+
+    def for_tenant(self, tenant: str, create: bool = True) -> "AsyncMemoryService":
+        """The facade for one tenant's shard, sharing this executor.
+
+        Services without tenants (a single MemoryService) serve every tenant.
+        Raises ValueError for a malformed or reserved tenant id; see
+        ShardRouter.for_tenant for ``create`` and the other errors.
+        """
+        select = getattr(self.service, "for_tenant", None)
+        service = select(tenant, create) if select else self.service
+        if service is self.service:
+            return self
+        view = copy.copy(self)
+        view.service = service
+        return view
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def remember(self, request: FragmentCreate) -> FragmentResponse:
+        return await self._run(self.service.remember, request)
+
+    async def remember_batch(self, requests: List[FragmentCreate]) -> List[FragmentResponse]:
+        return await self._run(self.service.remember_batch, requests)
+
+    async def recall(self, request: RecallRequest) -> RecallResponse:
+        return await self._run(self.service.recall, request)
+
+    async def recall_json(self, request: RecallRequest) -> bytes:
+        return await self._run(self.service.recall_json, request)
+
+    async def forget(self, fragment_id: str) -> bool:
+        return await self._run(self.service.forget, fragment_id)
+
+    async def end_session(self, session_id: str) -> SessionEndResponse:
+        return await self._run(self.service.end_session, session_id)
+
+    async def link(self, request: LinkCreate) -> LinkResponse:
+        return await self._run(self.service.link, request)
+
+    async def graph(
+        self,
+        fragment_id: str,
+        depth: int = 1,
+        relation_types: Optional[List[LinkRelationType]] = None,
+        fanout: int = 10,
+    ) -> Optional[GraphResponse]:
+        return await self._run(self.service.graph, fragment_id, depth, relation_types, fanout)
+
+    async def get_stats(self, detailed: bool = False) -> FragmentStats:
+        return await self._run(self.service.get_stats, detailed)
+
+    def export_ndjson(self, after_id: Optional[str] = None) -> Iterator[str]:
+        # Sync generator: StreamingResponse iterates it on a worker thread
+        return self.service.export_ndjson(after_id)
+
+    async def import_records(self, records: List[Dict[str, Any]]) -> ImportResponse:
+        return await self._run(self.service.import_records, records)
+
+    async def get_pool_stats(self) -> PoolStats:
+        # In-memory counters only; no need to hop threads
+        return self.service.get_pool_stats()
+
+    async def render_metrics(self) -> str:
+        # In-memory counters only; no need to hop threads
+        return self.service.render_metrics()
+
+    async def shard_stats(self) -> Optional[ShardStatsResponse]:
+        """Per-shard stats; None when the service isn't sharded."""
+        shard_stats = getattr(self.service, "shard_stats", None)
+        return await self._run(shard_stats) if shard_stats else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
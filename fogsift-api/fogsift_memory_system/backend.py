@@ -0,0 +1,99 @@
+"""
+Fogsift Memory System - Storage Backends
+The storage and search interfaces MemoryService and the background jobs depend on.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from .vocabulary import KeywordVocabulary
+
+# Fragment rows are plain dicts with the fragments table's columns (type and
+# ttl_tier as their string values, source decoded), plus "keywords" when
+# returned by a read and the layer score (match_count, text_score,
+# vector_score) when returned by a search.
+Row = Dict[str, Any]
+
+
+class StorageBackend(Protocol):
+    """Fragment, link, session and metadata storage.
+
+    MemoryStore (SQLite) and InMemoryStore implement it. Constraint
+    violations (duplicate ids, links to missing fragments) raise
+    sqlite3.IntegrityError whatever the engine, so callers handle one type.
+    """
+
+    # Fragments
+    def create_fragments(
+        self, fragments: List[Row], keywords: List[List[str]], ignore_existing: bool = False,
+    ) -> int: ...
+    def get_fragment(self, fragment_id: str) -> Optional[Row]: ...
+    def fragment_exists(self, fragment_id: str) -> bool: ...
+    def delete_fragment(self, fragment_id: str) -> bool: ...
+    def iter_fragments(self, after_id: Optional[str] = None, batch_size: int = 500) -> Iterator[Row]: ...
+
+    # References and tiers
+    def increment_reference(self, fragment_ids: List[str]) -> None: ...
+    def apply_references(self, counts: Dict[str, int], referenced_at: Dict[str, str]) -> None: ...
+    def demote_tier(
+        self, from_tier: str, to_tier: str, idle_before: datetime,
+        max_references: Optional[int] = None, batch_size: int = 500,
+    ) -> List[str]: ...
+
+    # Sessions
+    def end_session(self, session_id: str) -> int: ...
+    def sweep_ended_sessions(self, batch_size: int = 500) -> List[str]: ...
+    def sweep_idle_sessions(self, active_before: datetime, batch_size: int = 500) -> List[str]: ...
+    def sweep_orphan_session_fragments(self, created_before: datetime, batch_size: int = 500) -> List[str]: ...
+
+    # Links
+    def create_link(self, link_id: str, from_id: str, to_id: str, relation_type: str) -> str: ...
+    def create_links(self, links: List[Row]) -> int: ...
+    def get_neighbors(
+        self, fragment_ids: List[str], relation_types: Optional[List[str]] = None, fanout: int = 10,
+    ) -> List[Row]: ...
+    def iter_links(self, batch_size: int = 500) -> Iterator[Row]: ...
+
+    # Embeddings and token counts
+    def save_embeddings(self, model: str, rows: List[Tuple[str, bytes]]) -> None: ...
+    def iter_embeddings(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, bytes]]: ...
+    def iter_unembedded(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, str]]: ...
+    def iter_missing_token_counts(self, batch_size: int = 500) -> Iterator[Tuple[str, str]]: ...
+    def set_token_counts(self, rows: List[Tuple[int, str]]) -> int: ...
+    def reset_token_counts(self) -> None: ...
+
+    # Metadata, stats and diagnostics
+    def get_metadata(self, key: str) -> Optional[str]: ...
+    def set_metadata(self, key: str, value: str) -> None: ...
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]: ...
+    def term_document_frequencies(self, terms: List[str]) -> Tuple[int, Dict[str, int]]: ...
+    def keyword_vocabulary(self) -> KeywordVocabulary: ...
+    def pool_metrics(self) -> Dict[str, Any]: ...
+    def explain_query_plan(self, sql: str, params: List[Any]) -> List[str]: ...
+
+
+class SearchBackend(Protocol):
+    """The four recall layers over a StorageBackend.
+
+    MemorySearch (SQL) and InMemorySearch implement it. Every method returns
+    rows with their keywords; search_l1 also returns match_count and orders
+    by (match_count desc, importance desc, id), which cursors rely on.
+    """
+
+    def search_l1(
+        self, keywords: List[str], topic: Optional[str] = None, type_filter: Optional[str] = None,
+        limit: int = 50, after: Optional[Tuple[int, float, str]] = None, match_all: bool = False,
+        prefix: bool = False, fuzzy: bool = False,
+    ) -> List[Row]: ...
+    def search_l2(
+        self, topic: Optional[str] = None, type_filter: Optional[str] = None, limit: int = 50,
+        tiers: Optional[Sequence[str]] = None, token_budget: Optional[int] = None,
+    ) -> List[Row]: ...
+    def search_l3(
+        self, text: str, topic: Optional[str] = None, type_filter: Optional[str] = None, limit: int = 50,
+    ) -> List[Row]: ...
+    def search_l4(
+        self, matches: Sequence[Tuple[str, float]], topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+    ) -> List[Row]: ...
+    def get_fragments(self, fragment_ids: Sequence[str]) -> List[Row]: ...
@@ -0,0 +1,59 @@
+"""
+Fogsift Memory System - Background Workers
+Daemon threads that run maintenance callables on a fixed interval.
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger("fogsift_memory.background")
+
+
+class PeriodicWorker:
+    """Calls ``target`` every ``interval`` seconds on a daemon thread.
+
+    ``wake()`` triggers an early run. Exceptions are logged and the worker
+    keeps going; ``close()`` stops the thread after the current run.
+    """
+
+    def __init__(self, name: str, interval: float, target: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.target = target
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.target()
+            except Exception:
+                logger.exception("%s run failed; will retry", self.name)
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
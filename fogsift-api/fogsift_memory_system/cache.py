@@ -0,0 +1,194 @@
+"""
+Fogsift Memory System - Recall Cache
+In-process LRU/TTL cache of recall responses with write-driven invalidation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+from .keywords import normalize_keyword
+from .models import RecallRequest
+from .serialization import RecallResult
+from .vocabulary import keyword_matches
+
+
+class _Entry:
+    __slots__ = ("response", "expires_at", "topic", "type", "keywords", "prefix", "fuzzy",
+                 "has_text", "metadata_fallback", "fragment_ids")
+
+    def __init__(self, request: RecallRequest, response: RecallResult, expires_at: float):
+        self.response = response
+        self.expires_at = expires_at
+        self.topic = request.topic
+        self.type = request.type.value if request.type else None
+        self.keywords: FrozenSet[str] = frozenset(normalize_keyword(k) for k in request.keywords or ())
+        self.prefix = request.prefix_keywords
+        self.fuzzy = request.fuzzy_keywords
+        self.has_text = bool(request.text and request.text.strip())
+        # L2 only runs when the content layers found nothing, so any new fragment
+        # passing the topic/type filter could change such an entry
+        content_hit = any(p.startswith(("L1", "L3", "L4")) for p in response.search_path)
+        self.metadata_fallback = bool(request.topic or request.type) and not content_hit
+        self.fragment_ids: FrozenSet[str] = response.fragment_ids
+
+    def may_admit(self, keywords: Set[str]) -> bool:
+        """Could a new fragment that passes this entry's topic and type filters,
+        with one of these keywords, appear in this entry's result?"""
+        if self.has_text or self.metadata_fallback or self.keywords & keywords:
+            return True
+        return (self.prefix or self.fuzzy) and any(
+            keyword_matches(query, keyword, self.prefix, self.fuzzy)
+            for query in self.keywords for keyword in keywords
+        )
+
+
+class RecallCache:
+    """Thread-safe LRU cache of RecallResults with a per-entry TTL.
+
+    Keys are normalized requests, so keyword order, case and plurals don't
+    fragment the cache. Writes invalidate precisely: a new fragment drops only entries
+    whose filters would admit it, and forget/link drop only entries that
+    returned the affected fragment ids. The TTL bounds staleness of fields
+    that change without a write through the service (reference counts).
+
+    Every invalidation bumps a generation counter. A recall reads it before
+    computing and passes it to put, which drops the result if a write
+    invalidated the cache in the meantime: the result may predate the write
+    and there is no entry yet for the invalidation to remove.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._by_fragment: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(request: RecallRequest) -> Tuple:
+        return (
+            tuple(sorted({normalize_keyword(k) for k in request.keywords or ()})),
+            request.match_all_keywords,
+            request.prefix_keywords,
+            request.fuzzy_keywords,
+            " ".join((request.text or "").lower().split()),
+            request.topic,
+            request.type.value if request.type else None,
+            request.token_budget,
+            request.threshold,
+            request.include_links,
+            request.link_depth,
+            tuple(sorted(t.value for t in request.link_types)) if request.link_types else None,
+            request.link_fanout,
+            request.include_cold,
+            request.cursor,
+        )
+
+    def get(self, key: Hashable) -> Optional[RecallResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.response
+
+    def generation(self) -> int:
+        """The invalidation counter to pass to put for a result computed from now on."""
+        with self._lock:
+            return self._generation
+
+    def put(
+        self, key: Hashable, request: RecallRequest, response: RecallResult,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Caches a response, unless an invalidation happened after generation was read."""
+        entry = _Entry(request, response, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for frag_id in entry.fragment_ids:
+                self._by_fragment.setdefault(frag_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_new_fragments(self, fragments: Iterable[Tuple[str, str, Iterable[str]]]) -> None:
+        """Drops the entries any of these new (topic, type, keywords) fragments could appear in.
+
+        The batch is first folded into keyword sets per filter an entry can
+        have (topic and type, topic only, type only, neither), so each entry
+        is checked once however many fragments were written.
+        """
+        groups: Dict[Tuple[Optional[str], Optional[str]], Set[str]] = {}
+        for topic, type_value, keywords in fragments:
+            kw_set = {normalize_keyword(k) for k in keywords}
+            for group in ((topic, type_value), (topic, None), (None, type_value), (None, None)):
+                groups.setdefault(group, set()).update(kw_set)
+        if not groups:
+            return
+        with self._lock:
+            self._generation += 1
+            stale = [
+                k for k, e in self._entries.items()
+                if (e.topic or None, e.type) in groups and e.may_admit(groups[(e.topic or None, e.type)])
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def invalidate_fragments(self, fragment_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            stale = set()
+            for frag_id in fragment_ids:
+                stale |= self._by_fragment.get(frag_id, set())
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_fragment.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for frag_id in entry.fragment_ids:
+            keys = self._by_fragment.get(frag_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_fragment[frag_id]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,232 @@
+"""
+Fogsift Memory System - Embedding Index
+Local text encoders and an in-memory cosine index for semantic (L4) recall.
+"""
+
+import heapq
+import math
+import re
+import sys
+import threading
+import zlib
+from array import array
+from operator import mul
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python scan is used instead
+    np = None
+
+from .backend import StorageBackend
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    """Serializes a vector as little-endian float32 (4 bytes per dimension)."""
+    packed = array("f", vector)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(blob: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(blob)
+    if sys.byteorder == "big":
+        vector.byteswap()
+    return vector
+
+
+def normalize(vector: Sequence[float]) -> array:
+    """Scales a vector to unit length so a dot product is a cosine similarity."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return array("f", vector)
+    return array("f", (x / norm for x in vector))
+
+
+class HashingEncoder:
+    """Offline encoder using signed feature hashing of words and character n-grams.
+
+    Needs no model download or vocabulary. Word features match shared terms;
+    character n-grams of each word give partial credit to inflections and
+    typos ("migration" vs "migrations", "postgres" vs "postgress"). Any object
+    with ``name``, ``dim`` and ``encode(texts)`` can replace it, e.g. a local
+    sentence-transformer.
+    """
+
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, dim: int = 256, ngram: int = 3, ngram_weight: float = 0.5):
+        self.dim = dim
+        self.ngram = ngram
+        self.ngram_weight = ngram_weight
+        self.name = f"hashing-{dim}-c{ngram}"
+
+    def encode(self, texts: Sequence[str]) -> List[array]:
+        return [self._encode_one(text) for text in texts]
+
+    def _encode_one(self, text: str) -> array:
+        vector = [0.0] * self.dim
+        for word in self._WORD.findall(text.lower()):
+            self._add(vector, word, 1.0)
+            padded = f"<{word}>"
+            for i in range(len(padded) - self.ngram + 1):
+                self._add(vector, "#" + padded[i:i + self.ngram], self.ngram_weight)
+        return normalize(vector)
+
+    def _add(self, vector: List[float], feature: str, weight: float) -> None:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % self.dim] += weight if h & 0x80000000 else -weight
+
+
+class VectorIndex:
+    """Exact top-k cosine search over unit vectors held in memory.
+
+    With NumPy the vectors live in one contiguous float32 matrix and a query is
+    a single matrix-vector product plus argpartition; without it a pure-Python
+    scan is used. Removal swaps the last row into the freed slot so storage
+    stays dense.
+    """
+
+    def __init__(self, dim: int, use_numpy: Optional[bool] = None):
+        self.dim = dim
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._rows: List[array] = []  # Pure-Python storage
+        self._matrix = np.empty((0, dim), dtype=np.float32) if self.use_numpy else None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, fragment_id: str) -> bool:
+        return fragment_id in self._pos
+
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Adds (or replaces) vectors; they are expected to be unit length."""
+        with self._lock:
+            for frag_id, vector in zip(ids, vectors):
+                if len(vector) != self.dim:
+                    raise ValueError(f"Expected {self.dim} dimensions, got {len(vector)}")
+                pos = self._pos.get(frag_id)
+                if pos is None:
+                    pos = len(self._ids)
+                    if self.use_numpy:
+                        self._reserve(pos + 1)
+                    else:
+                        self._rows.append(array("f"))
+                    self._ids.append(frag_id)
+                    self._pos[frag_id] = pos
+                if self.use_numpy:
+                    self._matrix[pos] = np.asarray(vector, dtype=np.float32)
+                else:
+                    self._rows[pos] = array("f", vector)
+
+    def _reserve(self, rows: int) -> None:
+        if rows > len(self._matrix):
+            grown = np.empty((max(rows, 2 * len(self._matrix), 64), self.dim), dtype=np.float32)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for frag_id in ids:
+                pos = self._pos.pop(frag_id, None)
+                if pos is None:
+                    continue
+                last = len(self._ids) - 1
+                if pos != last:
+                    moved = self._ids[last]
+                    self._ids[pos] = moved
+                    self._pos[moved] = pos
+                    if self.use_numpy:
+                        self._matrix[pos] = self._matrix[last]
+                    else:
+                        self._rows[pos] = self._rows[last]
+                self._ids.pop()
+                if not self.use_numpy:
+                    self._rows.pop()
+
+    def search(
+        self, query: Sequence[float], k: int = 50, min_score: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """Returns up to k (fragment_id, cosine) pairs, best first, scoring >= min_score."""
+        with self._lock:
+            count = len(self._ids)
+            if not count or k <= 0:
+                return []
+            if self.use_numpy:
+                scores = self._matrix[:count] @ np.asarray(query, dtype=np.float32)
+                top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+                top = top[np.argsort(-scores[top])]
+                ranked = [(float(scores[i]), int(i)) for i in top]
+            else:
+                ranked = heapq.nlargest(
+                    k, ((sum(map(mul, query, row)), i) for i, row in enumerate(self._rows))
+                )
+            return [(self._ids[i], score) for score, i in ranked if score >= min_score]
+
+
+class EmbeddingIndex:
+    """Keeps fragment embeddings persisted in SQLite and searchable in memory.
+
+    Vectors are computed once when a fragment is written, stored as float32
+    blobs in the embeddings table, and loaded into a VectorIndex at startup.
+    ``load()`` also embeds any fragment lacking a vector for the current
+    encoder, which covers pre-existing data and encoder changes.
+    """
+
+    def __init__(
+        self,
+        store: StorageBackend,
+        encoder=None,
+        index: Optional[VectorIndex] = None,
+    ):
+        self.store = store
+        self.encoder = encoder or HashingEncoder()
+        self.index = index or VectorIndex(self.encoder.dim)
+
+    def __contains__(self, fragment_id: str) -> bool:
+        return fragment_id in self.index
+
+    def load(self, batch_size: int = 500) -> int:
+        """Loads stored vectors and backfills missing ones; returns the index size."""
+        ids: List[str] = []
+        vectors: List[array] = []
+        for frag_id, blob in self.store.iter_embeddings(self.encoder.name, batch_size):
+            ids.append(frag_id)
+            vectors.append(unpack_vector(blob))
+            if len(ids) >= batch_size:
+                self.index.add(ids, vectors)
+                ids, vectors = [], []
+        self.index.add(ids, vectors)
+
+        pending: List[Tuple[str, str]] = []
+        for fragment in self.store.iter_unembedded(self.encoder.name, batch_size):
+            pending.append(fragment)
+            if len(pending) >= batch_size:
+                self.add(pending)
+                pending = []
+        self.add(pending)
+        return len(self.index)
+
+    def add(self, fragments: Sequence[Tuple[str, str]]) -> None:
+        """Embeds (fragment_id, content) pairs, persists them and indexes them."""
+        if not fragments:
+            return
+        ids = [frag_id for frag_id, _ in fragments]
+        vectors = [normalize(v) for v in self.encoder.encode([content for _, content in fragments])]
+        self.store.save_embeddings(
+            self.encoder.name, [(frag_id, pack_vector(v)) for frag_id, v in zip(ids, vectors)]
+        )
+        self.index.add(ids, vectors)
+
+    def remove(self, fragment_ids: Iterable[str]) -> None:
+        """Drops vectors from memory; stored rows go with their fragment via cascade."""
+        self.index.remove(fragment_ids)
+
+    def search(self, text: str, k: int = 50, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        query = normalize(self.encoder.encode([text])[0])
+        return self.index.search(query, k, min_score)
@@ -0,0 +1,182 @@
+"""
+Fogsift Memory System - Link Graph Cache
+Compact in-memory adjacency (CSR over interned fragment ids) for graph expansion.
+"""
+
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .models import LinkRelationType
+
+RELATIONS = [t.value for t in LinkRelationType]
+_RELATION_CODES = {value: i for i, value in enumerate(RELATIONS)}
+_IN = 1  # Low bit of an entry code: 0 = outgoing link, 1 = incoming link
+
+
+class LinkGraph:
+    """Both directions of every link, held in compressed sparse row form.
+
+    Fragment ids are interned to ints. Each node's row lists its neighbours
+    newest link first, with the relation type and direction packed into one
+    byte per entry, so ~1M links cost ~10 bytes per direction plus the id
+    table. Links added after the build go to a per-node delta; deleted
+    fragments are tombstoned. Both are folded into a fresh CSR once they
+    outgrow ``compact_ratio`` of the base, so writes stay O(1) amortized.
+
+    A fragment id that is deleted and later re-created is interned to a new
+    node, so edges of the old incarnation (cascade-deleted in SQLite) can't
+    resurface.
+    """
+
+    def __init__(self, compact_ratio: float = 0.25, min_compact: int = 1024):
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._dead: Set[int] = set()
+        self._offsets = array("q", [0])
+        self._targets = array("i")
+        self._codes = array("b")
+        self._delta: Dict[int, List[Tuple[int, int]]] = {}
+        self._delta_entries = 0
+
+    @classmethod
+    def from_links(
+        cls, links: Iterable[Tuple[str, str, str]], **kwargs: Any
+    ) -> "LinkGraph":
+        """Builds a graph from (from_id, to_id, relation_type), newest link first."""
+        graph = cls(**kwargs)
+        graph._build(
+            entry
+            for from_id, to_id, relation in links
+            for entry in (
+                (from_id, to_id, _RELATION_CODES[relation] << 1),
+                (to_id, from_id, _RELATION_CODES[relation] << 1 | _IN),
+            )
+        )
+        return graph
+
+    def _intern(self, fragment_id: str) -> int:
+        node = self._index.get(fragment_id)
+        if node is None:
+            node = len(self._ids)
+            self._ids.append(fragment_id)
+            self._index[fragment_id] = node
+        return node
+
+    def _build(self, entries: Iterable[Tuple[str, str, int]]) -> None:
+        """Replaces the graph with (node_id, neighbor_id, code) entries, kept in
+        the given order per node (stable counting sort into CSR)."""
+        self._reset()
+        sources, targets, codes = array("i"), array("i"), array("b")
+        for node_id, neighbor_id, code in entries:
+            sources.append(self._intern(node_id))
+            targets.append(self._intern(neighbor_id))
+            codes.append(code)
+
+        offsets = array("q", bytes(8 * (len(self._ids) + 1)))
+        for node in sources:
+            offsets[node + 1] += 1
+        for node in range(len(self._ids)):
+            offsets[node + 1] += offsets[node]
+
+        cursor = offsets[:-1]
+        self._targets = array("i", bytes(4 * len(sources)))
+        self._codes = array("b", bytes(len(sources)))
+        for node, neighbor, code in zip(sources, targets, codes):
+            pos = cursor[node]
+            self._targets[pos] = neighbor
+            self._codes[pos] = code
+            cursor[node] = pos + 1
+        self._offsets = offsets
+
+    def _row(self, node: int) -> Iterator[Tuple[int, int]]:
+        """(neighbor, code) pairs for a node, newest first, skipping deleted neighbours."""
+        for neighbor, code in reversed(self._delta.get(node, ())):
+            if neighbor not in self._dead:
+                yield neighbor, code
+        if node + 1 < len(self._offsets):
+            for pos in range(self._offsets[node], self._offsets[node + 1]):
+                neighbor = self._targets[pos]
+                if neighbor not in self._dead:
+                    yield neighbor, self._codes[pos]
+
+    def neighbors(
+        self,
+        fragment_ids: List[str],
+        relation_types: Optional[List[str]] = None,
+        fanout: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Same contract as MemoryStore.get_neighbors, answered from memory."""
+        wanted = {_RELATION_CODES[t] for t in relation_types} if relation_types else None
+        edges: List[Dict[str, Any]] = []
+        with self._lock:
+            for fragment_id in fragment_ids:
+                node = self._index.get(fragment_id)
+                if node is None:
+                    continue
+                taken = 0
+                for neighbor, code in self._row(node):
+                    relation = code >> 1
+                    if wanted is not None and relation not in wanted:
+                        continue
+                    edges.append({
+                        "source_id": fragment_id,
+                        "neighbor_id": self._ids[neighbor],
+                        "relation_type": RELATIONS[relation],
+                        "direction": "in" if code & _IN else "out",
+                    })
+                    taken += 1
+                    if taken >= fanout:
+                        break
+        return edges
+
+    def add_link(self, from_id: str, to_id: str, relation_type: str) -> None:
+        code = _RELATION_CODES[relation_type] << 1
+        with self._lock:
+            source, target = self._intern(from_id), self._intern(to_id)
+            self._delta.setdefault(source, []).append((target, code))
+            self._delta.setdefault(target, []).append((source, code | _IN))
+            self._delta_entries += 2
+            self._maybe_compact()
+
+    def remove_fragments(self, fragment_ids: Iterable[str]) -> None:
+        """Tombstones fragments; their links disappear from every row."""
+        with self._lock:
+            for fragment_id in fragment_ids:
+                node = self._index.pop(fragment_id, None)
+                if node is not None:
+                    self._dead.add(node)
+                    self._delta_entries -= len(self._delta.pop(node, ()))
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        base_entries = len(self._targets)
+        limit = max(self.min_compact, self.compact_ratio * base_entries)
+        dead_limit = max(self.min_compact, self.compact_ratio * len(self._ids))
+        if self._delta_entries > limit or len(self._dead) > dead_limit:
+            self.compact()
+
+    def compact(self) -> None:
+        """Folds the delta and tombstones into a freshly built CSR."""
+        with self._lock:
+            live = [
+                (self._ids[node], self._ids[neighbor], code)
+                for node in range(len(self._ids)) if node not in self._dead
+                for neighbor, code in self._row(node)
+            ]
+            self._build(live)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "nodes": len(self._index),
+                "base_entries": len(self._targets),
+                "delta_entries": self._delta_entries,
+                "tombstones": len(self._dead),
+            }
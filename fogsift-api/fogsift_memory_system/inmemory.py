@@ -0,0 +1,616 @@
+"""
+Fogsift Memory System - In-Memory Backend
+Dict and inverted-index storage and search for ephemeral memory and tests; nothing touches disk.
+"""
+
+import heapq
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .backend import Row
+from .graph import LinkGraph
+from .keyword_index import KeywordIndex
+from .keywords import document_terms, keyword_terms
+from .metrics import stage
+from .ranking import parse_timestamp
+from .store import normalize_keywords
+from .vocabulary import KeywordVocabulary
+
+# FTS5's BM25 constants, so text_score is on the same scale as the SQLite engine's
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _now() -> str:
+    """CURRENT_TIMESTAMP in SQLite's format, as the SQL engine would write it."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _tokens(row: Row) -> int:
+    """Token cost as search_l2 computes it in SQL."""
+    return row["token_count"] if row["token_count"] is not None else len(row["content"]) // 4
+
+
+def _reference_bucket(count: Optional[int]) -> str:
+    count = count or 0
+    if count == 0:
+        return "0"
+    return "1-9" if count < 10 else "10-99" if count < 100 else "100+"
+
+
+# get_stats breakdowns, each counted over the value a row maps to
+_STAT_DIMENSIONS = {
+    "by_type": lambda row: row["type"],
+    "by_tier": lambda row: row["ttl_tier"],
+    "by_topic": lambda row: row["topic"],
+    "by_reference_count": lambda row: _reference_bucket(row["reference_count"]),
+}
+
+
+class InMemoryStore:
+    """StorageBackend held entirely in process memory.
+
+    Fragments are dicts keyed by id, with inverted indexes for keywords (L1,
+    a KeywordIndex as MemoryStore can enable), content terms (L3) and topics
+    (L2) kept up to date on every write; links live in a LinkGraph. Stats
+    are counters maintained alongside, as the SQLite schema's triggers
+    maintain fragment_stats. One re-entrant lock serializes access, which is
+    plenty for operations that take microseconds. Nothing survives the
+    process, so this suits session-scoped memory and tests, not the
+    permanent store.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._fragments: Dict[str, Row] = {}
+        self._keywords: Dict[str, List[str]] = {}
+        self._terms: Dict[str, List[str]] = {}  # fragment id -> distinct content terms
+        self._term_postings: Dict[str, Dict[str, int]] = {}  # content term -> {fragment id: frequency}
+        self._lengths: Dict[str, int] = {}  # fragment id -> content length in terms
+        self._term_total = 0  # Sum of document lengths, for BM25's average
+        self._by_topic: Dict[str, Set[str]] = {}
+        self._documents: Dict[str, List[str]] = {}  # fragment id -> keyword.document_terms
+        self._document_frequencies: Counter = Counter()
+        self._counts: Dict[str, Counter] = {dimension: Counter() for dimension in _STAT_DIMENSIONS}
+        self._created: Optional[Tuple[str, str]] = None  # (oldest, newest); None when stale
+        self._links: Dict[str, Row] = {}
+        self._fragment_links: Dict[str, Set[str]] = {}  # fragment id -> ids of its links
+        self._sessions: Dict[str, Optional[str]] = {}  # session id -> ended_at
+        self._embeddings: Dict[str, Tuple[str, bytes]] = {}
+        self._metadata: Dict[str, str] = {"db_initialized": _now()}
+        self.graph = LinkGraph()
+        self.keyword_index = KeywordIndex()
+        self.keyword_index.load(())
+        self.vocabulary = KeywordVocabulary()
+
+    def enable_link_graph(self) -> LinkGraph:
+        return self.graph  # Always on: the graph is the only link index
+
+    def enable_keyword_index(self, background: bool = False) -> KeywordIndex:
+        return self.keyword_index  # Always on and always loaded
+
+    def keyword_vocabulary(self) -> KeywordVocabulary:
+        return self.vocabulary
+
+    # Fragments
+
+    def create_fragment(self, frag_data: Row, keywords: List[str]) -> str:
+        self.create_fragments([frag_data], [keywords])
+        return frag_data["id"]
+
+    def create_fragments(
+        self, fragments: List[Row], keywords: List[List[str]], ignore_existing: bool = False,
+    ) -> int:
+        """Inserts fragments and their keywords all-or-nothing; returns rows written."""
+        with self._lock:
+            if not ignore_existing:
+                ids = [f["id"] for f in fragments]
+                if len(set(ids)) != len(ids) or any(i in self._fragments for i in ids):
+                    raise sqlite3.IntegrityError("UNIQUE constraint failed: fragments.id")
+            written = 0
+            for frag_data, frag_keywords in zip(fragments, keywords):
+                if frag_data["id"] in self._fragments:
+                    continue
+                self._insert(frag_data, frag_keywords)
+                written += 1
+        return written
+
+    def _insert(self, frag_data: Row, keywords: List[str]) -> None:
+        frag_id = frag_data["id"]
+        row = {
+            "id": frag_id,
+            "content": frag_data["content"],
+            "topic": frag_data["topic"],
+            "type": getattr(frag_data["type"], "value", frag_data["type"]),
+            "importance": frag_data["importance"],
+            "scope": frag_data["scope"],
+            "ttl_tier": getattr(frag_data["ttl_tier"], "value", frag_data["ttl_tier"]),
+            "created_at": frag_data["created_at"],
+            "last_referenced": frag_data["last_referenced"],
+            "reference_count": frag_data["reference_count"],
+            "source": frag_data.get("source") or None,
+            "session_id": frag_data.get("session_id"),
+            "token_count": frag_data.get("token_count"),
+        }
+        self._fragments[frag_id] = row
+        self._tally(row, 1)
+        self._by_topic.setdefault(row["topic"], set()).add(frag_id)
+        created = row["created_at"]
+        if self._created is not None and created is not None:
+            oldest, newest = self._created
+            self._created = (min(oldest or created, created), max(newest, created))
+        self._keywords[frag_id] = sorted(normalize_keywords(keywords))
+        terms = keyword_terms(self._keywords[frag_id])
+        self.keyword_index.add(frag_id, row["importance"], row["topic"], row["type"], terms)
+        self.vocabulary.add(terms)
+        counts = Counter(_terms(row["content"]))
+        self._terms[frag_id] = list(counts)
+        self._lengths[frag_id] = sum(counts.values())
+        self._term_total += self._lengths[frag_id]
+        for term in counts:
+            self._term_postings.setdefault(term, {})[frag_id] = counts[term]
+        self._documents[frag_id] = document_terms(row["content"])
+        self._document_frequencies.update(self._documents[frag_id])
+
+    def _remove(self, fragment_ids: Iterable[str]) -> List[str]:
+        """Deletes fragments with their keywords, terms, links and embeddings."""
+        removed = []
+        for frag_id in fragment_ids:
+            row = self._fragments.pop(frag_id, None)
+            if row is None:
+                continue
+            removed.append(frag_id)
+            self._tally(row, -1)
+            self._discard(self._by_topic, row["topic"], frag_id)
+            if self._created is not None and row["created_at"] in self._created:
+                self._created = None
+            del self._keywords[frag_id]
+            self._term_total -= self._lengths.pop(frag_id)
+            for term in self._terms.pop(frag_id):
+                self._discard(self._term_postings, term, frag_id)
+            for term in self._documents.pop(frag_id):
+                self._document_frequencies[term] -= 1
+                if not self._document_frequencies[term]:
+                    del self._document_frequencies[term]
+            for link_id in self._fragment_links.pop(frag_id, ()):
+                link = self._links.pop(link_id, None)
+                if link is not None:
+                    other = link["to_id"] if link["from_id"] == frag_id else link["from_id"]
+                    self._fragment_links.get(other, set()).discard(link_id)
+            self._embeddings.pop(frag_id, None)
+        if removed:
+            self.graph.remove_fragments(removed)
+            self.keyword_index.remove_fragments(removed)
+        return removed
+
+    def _tally(self, row: Row, delta: int) -> None:
+        for dimension, value_of in _STAT_DIMENSIONS.items():
+            counts = self._counts[dimension]
+            value = value_of(row)
+            counts[value] += delta
+            if counts[value] <= 0:
+                del counts[value]
+
+    def _update(self, row: Row, **changes: Any) -> None:
+        """Changes a stored row's columns, keeping the stat counters in step."""
+        self._tally(row, -1)
+        row.update(changes)
+        self._tally(row, 1)
+
+    @staticmethod
+    def _discard(index: Dict[str, Any], key: str, frag_id: str) -> None:
+        """Drops frag_id from a posting set or dict, and the posting itself once empty."""
+        ids = index.get(key)
+        if ids is not None:
+            if isinstance(ids, dict):
+                ids.pop(frag_id, None)
+            else:
+                ids.discard(frag_id)
+            if not ids:
+                del index[key]
+
+    def _row(self, frag_id: str) -> Row:
+        return {**self._fragments[frag_id], "keywords": list(self._keywords[frag_id])}
+
+    def get_fragment(self, fragment_id: str) -> Optional[Row]:
+        with self._lock:
+            return self._row(fragment_id) if fragment_id in self._fragments else None
+
+    def fragment_exists(self, fragment_id: str) -> bool:
+        return fragment_id in self._fragments
+
+    def delete_fragment(self, fragment_id: str) -> bool:
+        with self._lock:
+            return bool(self._remove([fragment_id]))
+
+    def iter_fragments(self, after_id: Optional[str] = None, batch_size: int = 500) -> Iterator[Row]:
+        with self._lock:
+            ids = sorted(i for i in self._fragments if i > (after_id or ""))
+        for start in range(0, len(ids), batch_size):
+            with self._lock:
+                page = [self._row(i) for i in ids[start:start + batch_size] if i in self._fragments]
+            yield from page
+
+    # Search support, used by InMemorySearch
+
+    def term_scores(self, terms: Sequence[str]) -> Dict[str, float]:
+        """BM25 of the fragments containing any of the terms (FTS5's formula and constants)."""
+        scores: Dict[str, float] = {}
+        with self._lock:
+            total = len(self._fragments)
+            if not total:
+                return scores
+            # tf + k1 * (1 - b + b * length / average), with the constant parts hoisted
+            base = _BM25_K1 * (1 - _BM25_B)
+            per_term = _BM25_K1 * _BM25_B / (self._term_total / total or 1.0)
+            lengths = self._lengths
+            for term in set(terms):
+                postings = self._term_postings.get(term)
+                if not postings:
+                    continue
+                idf = max(math.log((total - len(postings) + 0.5) / (len(postings) + 0.5)), 1e-6)
+                weight = idf * (_BM25_K1 + 1)
+                for frag_id, tf in postings.items():
+                    scores[frag_id] = scores.get(frag_id, 0.0) + weight * tf / (
+                        tf + base + per_term * lengths[frag_id]
+                    )
+        return scores
+
+    def matching(
+        self,
+        ids: Optional[Iterable[str]] = None,
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        tiers: Optional[Sequence[str]] = None,
+    ) -> List[Row]:
+        """The stored rows among ``ids`` (all if None) that pass the filters.
+
+        These are the live rows, not copies, so candidates can be ranked
+        without copying each one: treat them as read-only and pass the few
+        that are returned through copies().
+        """
+        with self._lock:
+            if ids is None:
+                ids = self._by_topic.get(topic, ()) if topic else self._fragments
+                topic = None
+            rows = []
+            for frag_id in ids:
+                row = self._fragments.get(frag_id)
+                if (row is None or (topic and row["topic"] != topic)
+                        or (type_filter and row["type"] != type_filter)
+                        or (tiers and row["ttl_tier"] not in tiers)):
+                    continue
+                rows.append(row)
+        return rows
+
+    def copies(self, rows: Iterable[Row]) -> List[Row]:
+        """Detached copies of stored rows, with their keywords, for returning to callers."""
+        with self._lock:
+            return [self._row(row["id"]) for row in rows if row["id"] in self._fragments]
+
+    # References and tiers
+
+    def increment_reference(self, fragment_ids: List[str]) -> None:
+        now = _now()
+        with self._lock:
+            for frag_id in set(fragment_ids):
+                row = self._fragments.get(frag_id)
+                if row is not None:
+                    self._update(row, reference_count=row["reference_count"] + 1, last_referenced=now, ttl_tier="hot")
+
+    def apply_references(self, counts: Dict[str, int], referenced_at: Dict[str, str]) -> None:
+        with self._lock:
+            for frag_id, hits in counts.items():
+                row = self._fragments.get(frag_id)
+                if row is not None:
+                    self._update(
+                        row,
+                        reference_count=row["reference_count"] + hits,
+                        last_referenced=referenced_at[frag_id],
+                        ttl_tier="hot",
+                    )
+
+    def demote_tier(
+        self,
+        from_tier: str,
+        to_tier: str,
+        idle_before: datetime,
+        max_references: Optional[int] = None,
+        batch_size: int = 500,
+    ) -> List[str]:
+        cutoff = idle_before.astimezone(timezone.utc)
+        moved = []
+        with self._lock:
+            for row in self._fragments.values():
+                if len(moved) >= batch_size:
+                    break
+                last = parse_timestamp(row["last_referenced"])
+                if (row["ttl_tier"] == from_tier and last is not None and last < cutoff
+                        and (max_references is None or row["reference_count"] < max_references)):
+                    self._update(row, ttl_tier=to_tier)
+                    moved.append(row["id"])
+        return moved
+
+    # Sessions
+
+    def end_session(self, session_id: str) -> int:
+        with self._lock:
+            self._sessions[session_id] = _now()
+            return sum(1 for row in self._fragments.values() if row["session_id"] == session_id)
+
+    def sweep_ended_sessions(self, batch_size: int = 500) -> List[str]:
+        with self._lock:
+            ended = {s for s, ended_at in self._sessions.items() if ended_at is not None}
+            doomed = [
+                row["id"] for row in self._fragments.values() if row["session_id"] in ended
+            ][:batch_size]
+            deleted = self._remove(doomed)
+            if len(deleted) < batch_size:
+                live = {row["session_id"] for row in self._fragments.values()}
+                for session_id in ended - live:
+                    del self._sessions[session_id]
+        return deleted
+
+    def sweep_idle_sessions(self, active_before: datetime, batch_size: int = 500) -> List[str]:
+        cutoff = active_before.astimezone(timezone.utc)
+        with self._lock:
+            last_active: Dict[str, datetime] = {}
+            for row in self._fragments.values():
+                if row["session_id"] is None:
+                    continue
+                times = [parse_timestamp(row["created_at"]), parse_timestamp(row["last_referenced"])]
+                active = max((t for t in times if t is not None), default=cutoff)
+                last_active[row["session_id"]] = max(active, last_active.get(row["session_id"], active))
+            idle = {session_id for session_id, active in last_active.items() if active < cutoff}
+            doomed = [
+                row["id"] for row in self._fragments.values() if row["session_id"] in idle
+            ][:batch_size]
+            return self._remove(doomed)
+
+    def sweep_orphan_session_fragments(self, created_before: datetime, batch_size: int = 500) -> List[str]:
+        with self._lock:
+            doomed = [
+                row["id"] for row in self._fragments.values()
+                if row["scope"] == "session" and row["session_id"] is None
+                and (parse_timestamp(row["created_at"]) or created_before) < created_before
+            ][:batch_size]
+            return self._remove(doomed)
+
+    # Links
+
+    def create_link(self, link_id: str, from_id: str, to_id: str, relation_type: str) -> str:
+        with self._lock:
+            if from_id not in self._fragments or to_id not in self._fragments:
+                raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+            if link_id in self._links:
+                raise sqlite3.IntegrityError("UNIQUE constraint failed: links.id")
+            self._add_link({
+                "id": link_id, "from_id": from_id, "to_id": to_id,
+                "relation_type": getattr(relation_type, "value", relation_type), "created_at": _now(),
+            })
+        return link_id
+
+    def create_links(self, links: List[Row]) -> int:
+        """Adds links, skipping duplicate ids and links to missing fragments."""
+        written = 0
+        with self._lock:
+            for link in links:
+                if (link["id"] in self._links or link["from_id"] not in self._fragments
+                        or link["to_id"] not in self._fragments):
+                    continue
+                self._add_link({field: link[field] for field in
+                                ("id", "from_id", "to_id", "relation_type", "created_at")})
+                written += 1
+        return written
+
+    def _add_link(self, link: Row) -> None:
+        self._links[link["id"]] = link
+        for frag_id in (link["from_id"], link["to_id"]):
+            self._fragment_links.setdefault(frag_id, set()).add(link["id"])
+        self.graph.add_link(link["from_id"], link["to_id"], link["relation_type"])
+
+    def get_neighbors(
+        self, fragment_ids: List[str], relation_types: Optional[List[str]] = None, fanout: int = 10,
+    ) -> List[Row]:
+        if not fragment_ids:
+            return []
+        return self.graph.neighbors(fragment_ids, relation_types, fanout)
+
+    def iter_links(self, batch_size: int = 500) -> Iterator[Row]:
+        with self._lock:
+            links = [dict(self._links[i]) for i in sorted(self._links)]
+        yield from links
+
+    # Embeddings and token counts
+
+    def save_embeddings(self, model: str, rows: List[Tuple[str, bytes]]) -> None:
+        with self._lock:
+            for frag_id, blob in rows:
+                if frag_id in self._fragments:
+                    self._embeddings[frag_id] = (model, blob)
+
+    def iter_embeddings(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, bytes]]:
+        with self._lock:
+            rows = [(i, blob) for i, (m, blob) in sorted(self._embeddings.items()) if m == model]
+        yield from rows
+
+    def iter_unembedded(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            rows = [
+                (i, row["content"]) for i, row in sorted(self._fragments.items())
+                if self._embeddings.get(i, (None,))[0] != model
+            ]
+        yield from rows
+
+    def iter_missing_token_counts(self, batch_size: int = 500) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            rows = [
+                (i, row["content"]) for i, row in sorted(self._fragments.items())
+                if row["token_count"] is None
+            ]
+        yield from rows
+
+    def set_token_counts(self, rows: List[Tuple[int, str]]) -> int:
+        updated = 0
+        with self._lock:
+            for count, frag_id in rows:
+                row = self._fragments.get(frag_id)
+                if row is not None:
+                    row["token_count"] = count
+                    updated += 1
+        return updated
+
+    def reset_token_counts(self) -> None:
+        with self._lock:
+            for row in self._fragments.values():
+                row["token_count"] = None
+
+    # Metadata, stats and diagnostics
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        return self._metadata.get(key)
+
+    def set_metadata(self, key: str, value: str) -> None:
+        with self._lock:
+            self._metadata[key] = value
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        """Read from the maintained counters; only the created_at range is ever rescanned."""
+        with self._lock:
+            if self._created is None:
+                created = [row["created_at"] for row in self._fragments.values() if row["created_at"] is not None]
+                self._created = (min(created), max(created)) if created else ("", "")
+            oldest, newest = self._created
+            stats: Dict[str, Any] = {
+                "total_fragments": len(self._fragments),
+                "by_type": dict(self._counts["by_type"]),
+                "by_tier": dict(self._counts["by_tier"]),
+                "by_topic": dict(self._counts["by_topic"]),
+                "oldest_fragment": oldest or None,
+                "newest_fragment": newest or None,
+            }
+            if detailed:
+                stats["by_reference_count"] = dict(self._counts["by_reference_count"])
+        return stats
+
+    def term_document_frequencies(self, terms: List[str]) -> Tuple[int, Dict[str, int]]:
+        with self._lock:
+            frequencies = self._document_frequencies
+            return len(self._fragments), {t: frequencies[t] for t in terms if t in frequencies}
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """No connections to pool; reported as an empty pool."""
+        idle = {
+            "checkouts": 0, "timeouts": 0, "wait_ms_avg": 0.0, "wait_ms_max": 0.0,
+            "hold_ms_avg": 0.0, "hold_ms_max": 0.0,
+        }
+        return {"size": 0, "readers_available": 0, "reader": dict(idle), "writer": dict(idle)}
+
+    def explain_query_plan(self, sql: str, params: List[Any]) -> List[str]:
+        return []  # No SQL is ever run, so slow-query logs carry no statements to explain
+
+
+class InMemorySearch:
+    """SearchBackend over an InMemoryStore, matching MemorySearch's results.
+
+    L1 is answered by the store's KeywordIndex; L3 scores content terms with
+    BM25 (terms are matched as words, without the SQL engine's Porter
+    stemming); L2 and L4 filter the fragment dict.
+    """
+
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+
+    def search_l1(
+        self,
+        keywords: List[str],
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[int, float, str]] = None,
+        match_all: bool = False,
+        prefix: bool = False,
+        fuzzy: bool = False,
+    ) -> List[Row]:
+        keywords = keyword_terms(keywords)
+        if not keywords:
+            return []
+        expansions = self.store.vocabulary.expansions(keywords, prefix, fuzzy) if prefix or fuzzy else None
+        with stage("l1_index"):
+            counts = dict(self.store.keyword_index.search(
+                keywords, topic, type_filter, limit, after, match_all, expansions,
+            ))
+            rows = self.store.copies(self.store.matching(counts))
+            for row in rows:
+                row["match_count"] = counts[row["id"]]
+            return rows
+
+    def search_l2(
+        self,
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        limit: int = 50,
+        tiers: Optional[Sequence[str]] = None,
+        token_budget: Optional[int] = None,
+    ) -> List[Row]:
+        with stage("l2_index"):
+            rows = self.store.matching(None, topic, type_filter, tiers)
+            if token_budget is not None:
+                rows = [row for row in rows if _tokens(row) <= token_budget]
+            # importance DESC, last_referenced DESC (NULLs last), as the SQL orders it
+            rows.sort(key=lambda row: row["last_referenced"] or "", reverse=True)
+            rows.sort(key=lambda row: row["importance"], reverse=True)
+            rows = rows[:limit]
+            if token_budget is not None:
+                kept, used = [], 0
+                for row in rows:
+                    if used >= token_budget:
+                        break
+                    kept.append(row)
+                    used += _tokens(row)
+                rows = kept
+        return self.store.copies(rows)
+
+    def search_l3(
+        self,
+        text: str,
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Row]:
+        terms = _terms(text)
+        if not terms:
+            return []
+        with stage("l3_index"):
+            scores = self.store.term_scores(terms)
+            rows = self.store.matching(scores, topic, type_filter)
+            rows = self.store.copies(heapq.nsmallest(limit, rows, key=lambda row: (-scores[row["id"]], row["id"])))
+            for row in rows:
+                row["text_score"] = scores[row["id"]]
+            return rows
+
+    def search_l4(
+        self,
+        matches: Sequence[Tuple[str, float]],
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+    ) -> List[Row]:
+        if not matches:
+            return []
+        scores = dict(matches)
+        rows = self.store.copies(self.store.matching(scores, topic, type_filter))
+        for row in rows:
+            row["vector_score"] = scores[row["id"]]
+        return sorted(rows, key=lambda row: row["vector_score"], reverse=True)
+
+    def get_fragments(self, fragment_ids: Sequence[str]) -> List[Row]:
+        return self.store.copies(self.store.matching(fragment_ids))
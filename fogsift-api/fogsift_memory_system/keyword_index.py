@@ -0,0 +1,267 @@
+"""
+Fogsift Memory System - Keyword Index
+In-memory inverted index (keyword -> sorted posting array of interned fragment ids) for L1.
+"""
+
+import heapq
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+_LOAD_BATCH = 5000
+
+
+class KeywordIndex:
+    """Every keyword's fragments, held as sorted arrays of interned ids.
+
+    Fragment ids are interned to ints in arrival order, so appending a new
+    fragment keeps every posting array sorted and AND queries intersect
+    them by galloping search. Each node also keeps the (-importance, id)
+    half of the L1 order and its topic and type, so ranking, filtering and
+    cursor bounds are answered without touching SQLite; only the returned
+    page is loaded from the database.
+
+    Deleted fragments are tombstoned and a re-created id is interned to a new
+    node, as in LinkGraph. Tombstones are dropped by renumbering the live
+    nodes once they outgrow ``compact_ratio`` of the nodes.
+
+    ``ready`` is False until load() finishes; until then callers answer L1
+    from SQL. Writes made during the load are applied as they arrive, and
+    deletions are remembered so the load can't resurrect them.
+    """
+
+    def __init__(self, compact_ratio: float = 0.25, min_compact: int = 1024):
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self.ready = False
+        self._lock = threading.RLock()
+        self._loading_removed: Optional[Set[str]] = set()  # None once loaded
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._order: List[Tuple[float, str]] = []  # node -> (-importance, fragment id)
+        self._topics: List[str] = []
+        self._types: List[str] = []
+        self._dead: Set[int] = set()
+        self._postings: Dict[str, array] = {}
+        self._ranked: Dict[str, List[int]] = {}  # keyword -> posting in L1 order; see _ranked_view
+
+    def _intern(self, fragment_id: str, importance: float, topic: str, type_value: str) -> int:
+        node = len(self._ids)
+        self._ids.append(fragment_id)
+        self._index[fragment_id] = node
+        self._order.append((-importance, fragment_id))
+        self._topics.append(sys.intern(topic))
+        self._types.append(sys.intern(type_value))
+        return node
+
+    def load(self, rows: Iterable[Tuple[str, float, str, str, str]]) -> None:
+        """Builds the index from (fragment_id, importance, topic, type, keyword)
+        rows, one per keyword, then marks it ready."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, _LOAD_BATCH))
+            if not batch:
+                break
+            with self._lock:  # Held per batch so writes and SQL-served reads interleave
+                skip = self._loading_removed
+                for fragment_id, importance, topic, type_value, keyword in batch:
+                    if fragment_id in skip:
+                        continue
+                    node = self._index.get(fragment_id)
+                    if node is None:
+                        node = self._intern(fragment_id, importance, topic, type_value)
+                    posting = self._postings.get(keyword)
+                    if posting is None:
+                        posting = self._postings[keyword] = array("i")
+                    posting.append(node)
+        with self._lock:
+            # Rows arrive in any order and writes race the load; sort once
+            for keyword, posting in self._postings.items():
+                self._postings[keyword] = array("i", sorted(set(posting)))
+            self._ranked.clear()
+            self._loading_removed = None
+            self.ready = True
+
+    def add(self, fragment_id: str, importance: float, topic: str, type_value: str, keywords: Sequence[str]) -> None:
+        """Indexes a new fragment under its (normalized) keywords; known ids are ignored."""
+        with self._lock:
+            if fragment_id in self._index:
+                return
+            node = self._intern(fragment_id, importance, topic, type_value)
+            for keyword in keywords:
+                posting = self._postings.get(keyword)
+                if posting is None:
+                    posting = self._postings[keyword] = array("i")
+                posting.append(node)
+                ranked = self._ranked.get(keyword)
+                if ranked is not None:
+                    insort(ranked, node, key=self._order.__getitem__)
+
+    def remove_fragments(self, fragment_ids: Iterable[str]) -> None:
+        """Tombstones fragments; they stop matching immediately."""
+        with self._lock:
+            for fragment_id in fragment_ids:
+                if self._loading_removed is not None:
+                    self._loading_removed.add(fragment_id)
+                node = self._index.pop(fragment_id, None)
+                if node is not None:
+                    self._dead.add(node)
+            if self.ready and len(self._dead) > max(self.min_compact, self.compact_ratio * len(self._ids)):
+                self.compact()
+
+    def compact(self) -> None:
+        """Renumbers the live nodes (keeping their order) and drops tombstones."""
+        with self._lock:
+            ids, order, topics, types = self._ids, self._order, self._topics, self._types
+            dead, postings = self._dead, self._postings
+            self._reset()
+            remap = array("i", [-1]) * len(ids)
+            for node, fragment_id in enumerate(ids):
+                if node not in dead:
+                    remap[node] = self._intern(fragment_id, -order[node][0], topics[node], types[node])
+            for keyword, posting in postings.items():
+                live = array("i", [remap[node] for node in posting if remap[node] >= 0])
+                if live:
+                    self._postings[keyword] = live
+
+    def search(
+        self,
+        keywords: Sequence[str],
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[int, float, str]] = None,
+        match_all: bool = False,
+        expansions: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> List[Tuple[str, int]]:
+        """(fragment_id, match_count) pairs in L1 order: match_count desc,
+        importance desc, id. Keywords must already be normalized.
+
+        With match_all only fragments carrying every keyword match (an
+        intersection of the posting arrays); otherwise any keyword does and
+        match_count says how many. ``expansions`` maps a keyword to the
+        indexed keywords it stands for (prefix and fuzzy matching, see
+        KeywordVocabulary.expansions); a fragment carrying any of them
+        matches that keyword once.
+        """
+        with self._lock:
+            order = self._order
+            results: List[Tuple[str, int]] = []
+            top = after[0] if after is not None else len(keywords)
+            groups = [expansions.get(kw, (kw,)) if expansions else (kw,) for kw in keywords]
+            for count, nodes, ranked in self._levels(groups, top, match_all):
+                bound = (-after[1], after[2]) if after is not None and count == after[0] else None
+                wanted = limit - len(results)
+                if ranked:
+                    # Already in L1 order: start past the cursor and stop once the page is full
+                    start = bisect_right(nodes, bound, key=order.__getitem__) if bound else 0
+                    page = list(islice(self._scan(nodes, start, topic, type_filter), wanted))
+                else:
+                    nodes = self._filter(nodes, topic, type_filter)
+                    if bound:
+                        nodes = [node for node in nodes if order[node] > bound]
+                    page = heapq.nsmallest(wanted, nodes, key=order.__getitem__)
+                results.extend((self._ids[node], count) for node in page)
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _levels(
+        self, groups: Sequence[Sequence[str]], top: int, match_all: bool,
+    ) -> Iterator[Tuple[int, Sequence[int], bool]]:
+        """(match_count, nodes, ranked) from the highest count down to 1,
+        skipping counts above ``top``. Each group of keywords counts once.
+        Each level is built only when asked for, so a page filled by the
+        best matches never counts the rest. ``ranked`` says the nodes are
+        already in L1 order."""
+        present = [[kw for kw in group if kw in self._postings] for group in groups]
+        present = [group for group in present if group]
+        if match_all and len(present) < len(groups):
+            return
+        if len(present) <= 1:
+            if present and top >= 1:
+                if len(present[0]) == 1:
+                    yield 1, self._ranked_view(present[0][0]), True
+                else:
+                    yield 1, self._union(present[0]), False
+            return
+        postings = [self._postings[group[0]] if len(group) == 1 else self._union(group) for group in present]
+        if len(present) <= top:
+            yield len(present), self._intersect(postings), False
+        if match_all:
+            return
+        counts: Counter = Counter()
+        for posting in postings:
+            counts.update(posting)
+        items = counts.items()
+        for count in range(min(len(present) - 1, top), 0, -1):
+            yield count, [node for node, hits in items if hits == count], False
+
+    def _union(self, keywords: Sequence[str]) -> List[int]:
+        """The sorted nodes carrying any of the keywords."""
+        return sorted(set().union(*(self._postings[kw] for kw in keywords)))
+
+    def _ranked_view(self, keyword: str) -> List[int]:
+        """The keyword's posting sorted by (-importance, id), built on first
+        use and kept in order by add(); single-keyword levels are then read
+        off the front instead of ranked per query."""
+        ranked = self._ranked.get(keyword)
+        if ranked is None:
+            ranked = self._ranked[keyword] = sorted(self._postings[keyword], key=self._order.__getitem__)
+        return ranked
+
+    def _scan(self, nodes: Sequence[int], start: int, topic: Optional[str], type_filter: Optional[str]) -> Iterator[int]:
+        dead, topics, types = self._dead, self._topics, self._types
+        for pos in range(start, len(nodes)):
+            node = nodes[pos]
+            if (node in dead or (topic and topics[node] != topic)
+                    or (type_filter and types[node] != type_filter)):
+                continue
+            yield node
+
+    def _filter(self, nodes: Iterable[int], topic: Optional[str], type_filter: Optional[str]) -> Iterable[int]:
+        if self._dead:
+            dead = self._dead
+            nodes = [node for node in nodes if node not in dead]
+        if topic:
+            topics = self._topics
+            nodes = [node for node in nodes if topics[node] == topic]
+        if type_filter:
+            types = self._types
+            nodes = [node for node in nodes if types[node] == type_filter]
+        return nodes
+
+    @staticmethod
+    def _intersect(postings: List[Sequence[int]]) -> List[int]:
+        """Nodes present in every posting, galloping the shortest through the rest."""
+        postings = sorted(postings, key=len)
+        result = list(postings[0])
+        for posting in postings[1:]:
+            kept, lo, end = [], 0, len(posting)
+            for node in result:
+                lo = bisect_left(posting, node, lo)
+                if lo == end:
+                    break
+                if posting[lo] == node:
+                    kept.append(node)
+            result = kept
+            if not result:
+                break
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "fragments": len(self._index),
+                "keywords": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "tombstones": len(self._dead),
+            }
@@ -0,0 +1,154 @@
+"""
+Fogsift Memory System - Keyword Extraction
+Tokenizer, stopwords, light stemmer and TF-IDF keyword selection shared by writes and L1 queries.
+"""
+
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .backend import StorageBackend
+
+KEYWORD_MAX_LENGTH = 100
+MIN_TERM_LENGTH = 3  # Shorter tokens are too ambiguous to be useful keywords
+
+# Words joined by - _ . stay one token ("rate-limit", "node.js", "max_memory")
+_TOKEN = re.compile(r"[a-z0-9]+(?:['’][a-z]+|[-_.][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before
+being below between both but by can can't cannot could couldn't did didn't do does doesn't doing
+don't down during each either etc even ever every few for from further get gets got had hadn't has
+hasn't have haven't having he her here hers herself him himself his how however i if in into is
+isn't it it's its itself just let's like may me might more most much must mustn't my myself need
+needs no nor not now of off often on once one only or other our ours ourselves out over own per
+quite rather really same shall shan't she should shouldn't since so some still such than that
+that's the their theirs them themselves then there there's these they this those though through
+thus to too under until up upon us use used uses using very via was wasn't we were weren't what
+when where whether which while who whom whose why will with within without won't would wouldn't
+yet you your yours yourself yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens in order of appearance; possessive 's is dropped."""
+    tokens = _TOKEN.findall(text.lower())
+    return [t[:-2] if t.endswith(("'s", "’s")) else t for t in tokens]
+
+
+# Words ending in s that aren't plurals, and -ies plurals of -ie words
+_NOT_PLURALS = frozenset("""
+always atlas alias bias canvas chaos jenkins kubernetes lens news perhaps postgres series species
+whereas
+""".split())
+_IE_PLURALS = frozenset("cookies freebies goodies hoodies movies rookies selfies zombies".split())
+
+
+def stem(word: str) -> str:
+    """Light plural stemmer: queries -> query, processes -> process, replicas -> replica.
+
+    Only inflectional -s endings are removed, never derivational suffixes.
+    Words ending in -ss, -us and -is (class, status, redis) and known
+    non-plurals (series, postgres) are left alone; -ies becomes -y only past
+    four letters (ties -> tie) and outside a few -ie nouns (movies -> movie).
+    Stems are match terms only: stored keywords keep the caller's spelling.
+    """
+    if len(word) <= 3 or word[-1] != "s" or word in _NOT_PLURALS:
+        return word
+    if word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        if len(word) > 4 and word not in _IE_PLURALS and not word.endswith(("aies", "eies")):
+            return word[:-3] + "y"
+        return word[:-1]
+    if word.endswith("sses"):
+        return word[:-2]
+    return word[:-1]
+
+
+def normalize_keyword(keyword: str) -> str:
+    """The term a keyword is matched on in L1: lowercased, whitespace
+    collapsed, each word stemmed, truncated to the column limit."""
+    return " ".join(stem(word) for word in keyword.lower().split())[:KEYWORD_MAX_LENGTH]
+
+
+def keyword_terms(keywords: Iterable[str]) -> List[str]:
+    """The distinct, non-empty match terms of keywords, in order; L1 queries,
+    the keyword index and ranking all compare keywords through it."""
+    seen: Dict[str, None] = {}
+    for keyword in keywords:
+        term = normalize_keyword(keyword)
+        if term:
+            seen.setdefault(term, None)
+    return list(seen)
+
+
+@lru_cache(maxsize=65536)
+def _term(token: str) -> Optional[str]:
+    """The analyzed term for a token, or None if it can't be a keyword.
+    Cached: vocabularies are small next to the volume of text analyzed."""
+    if len(token) < MIN_TERM_LENGTH or token in STOPWORDS or token.isdigit():
+        return None
+    return stem(token)
+
+
+def analyze(text: str) -> List[str]:
+    """Content terms eligible as keywords, stemmed, in order of appearance."""
+    return [term for term in map(_term, tokenize(text)) if term]
+
+
+def _analyze_with_words(text: str) -> List[Tuple[str, str]]:
+    """(term, word) pairs for analyze(), keeping each term's surface word."""
+    return [(term, token) for token in tokenize(text) if (term := _term(token))]
+
+
+def document_terms(text: str) -> List[str]:
+    """The distinct analyzed terms of a document, sorted; what document frequencies count."""
+    terms = set(map(_term, set(tokenize(text))))
+    terms.discard(None)
+    return sorted(terms)
+
+
+class KeywordExtractor:
+    """Picks a fragment's most distinctive terms as its keywords.
+
+    Terms are scored by TF-IDF: frequency in the content times a smoothed
+    inverse document frequency, log((1 + N) / (1 + df)) + 1, from the
+    store's term statistics. Ties keep the order the terms first appear in,
+    so the same content against the same corpus always yields the same
+    keywords.
+    """
+
+    def __init__(self, store: StorageBackend, max_keywords: int = 5):
+        self.store = store
+        self.max_keywords = max_keywords
+
+    def extract(self, content: str) -> List[str]:
+        return self.extract_batch([content])[0]
+
+    def extract_batch(self, contents: Sequence[str]) -> List[List[str]]:
+        """Keywords for many contents, with one document-frequency lookup.
+
+        Terms are scored, but each keyword is returned as the word first
+        appeared in the content ("replicas", not "replica").
+        """
+        analyzed = [_analyze_with_words(content) for content in contents]
+        vocabulary = sorted({term for terms in analyzed for term, _ in terms})
+        if not vocabulary:
+            return [[] for _ in contents]
+        total, frequencies = self.store.term_document_frequencies(vocabulary)
+        return [self._select(terms, total, frequencies) for terms in analyzed]
+
+    def _select(self, terms: List[Tuple[str, str]], total: int, frequencies: Dict[str, int]) -> List[str]:
+        counts = Counter(term for term, _ in terms)
+        first_seen: Dict[str, Tuple[int, str]] = {}
+        for i, (term, word) in enumerate(terms):
+            first_seen.setdefault(term, (i, word))
+
+        def score(term: str) -> Tuple[float, int]:
+            idf = math.log((1 + total) / (1 + frequencies.get(term, 0))) + 1
+            return -counts[term] * idf, first_seen[term][0]
+
+        return [first_seen[term][1] for term in sorted(counts, key=score)[:self.max_keywords]]
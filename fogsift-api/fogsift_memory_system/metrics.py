@@ -0,0 +1,192 @@
+"""
+Fogsift Memory System - Metrics
+Latency histograms with per-stage recall timings, rendered in Prometheus text format.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; recalls are expected to land in the low milliseconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+RECALL_SECONDS = "fogsift_recall_duration_seconds"
+STAGE_SECONDS = "fogsift_recall_stage_duration_seconds"
+SLOW_RECALLS = "fogsift_recall_slow_total"
+
+_HELP = {
+    RECALL_SECONDS: ("histogram", "Wall-clock time of MemoryService.recall"),
+    STAGE_SECONDS: ("histogram", "Time spent in one stage of a recall"),
+    SLOW_RECALLS: ("counter", "Recalls slower than the slow-query threshold"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus (cumulative, ``le``) semantics."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+class RecallTrace:
+    """Stage timings (and, for the slow-query log, the SQL) of one recall."""
+
+    def __init__(self, capture_sql: bool = False):
+        self.capture_sql = capture_sql
+        self.stages: Dict[str, float] = {}
+        self.queries: List[Tuple[str, str, List[Any]]] = []  # (stage, sql, params)
+
+    def add(self, stage_name: str, seconds: float) -> None:
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+
+_current: ContextVar[Optional[RecallTrace]] = ContextVar("fogsift_recall_trace", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times a block into the current recall's trace; a no-op outside a trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def record_query(stage_name: str, sql: str, params: Sequence[Any]) -> None:
+    """Keeps a statement for EXPLAIN QUERY PLAN if the slow-query log is on."""
+    trace = _current.get()
+    if trace is not None and trace.capture_sql:
+        trace.queries.append((stage_name, sql, list(params)))
+
+
+class Metrics:
+    """Process-wide registry of recall histograms and counters.
+
+    ``slow_query_ms`` > 0 turns on SQL capture so recalls over the threshold
+    can be logged with their statements and query plans (see
+    MemoryService.recall); 0 leaves it off.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, slow_query_ms: float = 0):
+        self.buckets = tuple(buckets)
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    @contextmanager
+    def trace(self) -> Iterator[RecallTrace]:
+        """Makes a fresh RecallTrace current for the enclosed recall."""
+        trace = RecallTrace(capture_sql=self.slow_query_ms > 0)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_recall(self, trace: RecallTrace, seconds: float, cache: str) -> None:
+        self.observe(RECALL_SECONDS, seconds, cache=cache)
+        for stage_name, stage_seconds in trace.stages.items():
+            self.observe(STAGE_SECONDS, stage_seconds, stage=stage_name)
+
+    def is_slow(self, seconds: float) -> bool:
+        return 0 < self.slow_query_ms <= seconds * 1000
+
+    def snapshot(self) -> Dict[str, Dict[Labels, Dict[str, Any]]]:
+        """{name: {labels: {"count", "sum"}}} for histograms, for tests and debugging."""
+        with self._lock:
+            out: Dict[str, Dict[Labels, Dict[str, Any]]] = {}
+            for (name, labels), h in self._histograms.items():
+                out.setdefault(name, {})[labels] = {"count": h.count, "sum": h.sum}
+            return out
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, Dict[Labels, float]]]] = None) -> str:
+        """Prometheus text exposition (format 0.0.4).
+
+        ``gauges`` adds point-in-time values owned elsewhere, as
+        {name: (help, {labels: value})}; names ending in ``_total`` are typed
+        as counters.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({n for n, _ in self._histograms}):
+                kind, text = _HELP.get(name, ("histogram", name))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for (n, labels), h in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, count in zip((*self.buckets, "+Inf"), h.cumulative()):
+                        le = bound if isinstance(bound, str) else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(h.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {h.count}")
+            for name in sorted({n for n, _ in self._counters}):
+                kind, text = _HELP.get(name, ("counter", name))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for name, (text, values) in sorted((gauges or {}).items()):
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = (
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -44,6 +44,7 @@ class FragmentCreate(BaseModel):
     keywords: Optional[List[str]] = Field(default=None, max_length=20)
     importance: Optional[float] = Field(default=None, ge=0.0, le=1.0)
     scope: str = Field(default="permanent", pattern=r"^(permanent|session)$")
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=100)
     source: Optional[Dict[str, Any]] = None
 
     @field_validator("keywords")
@@ -55,6 +56,12 @@ class FragmentCreate(BaseModel):
                     raise ValueError("Each keyword must be 100 characters or fewer")
         return v
 
+    @model_validator(mode="after")
+    def session_id_requires_session_scope(self) -> "FragmentCreate":
+        if self.session_id and self.scope != "session":
+            raise ValueError("session_id is only valid for scope='session'")
+        return self
+
 
 class FragmentResponse(BaseModel):
     """Output model for a fragment"""
@@ -70,11 +77,25 @@ class FragmentResponse(BaseModel):
     last_referenced: Optional[datetime]
     reference_count: int
     source: Optional[Dict[str, Any]]
+    session_id: Optional[str] = None
+    token_count: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class FragmentBatchCreate(BaseModel):
+    """Input model for bulk ingestion"""
+    fragments: List[FragmentCreate] = Field(..., min_length=1, max_length=1_000)
+
+
+class FragmentBatchResponse(BaseModel):
+    """Output model for bulk ingestion"""
+    success: bool
+    count: int
+    fragments: List[FragmentResponse]
+
+
 class LinkCreate(BaseModel):
     """Input model for creating a relationship between fragments"""
     from_id: str = Field(..., min_length=1, max_length=50)
@@ -97,12 +118,20 @@ class LinkResponse(BaseModel):
 class RecallRequest(BaseModel):
     """Input model for searching memories"""
     keywords: Optional[List[str]] = Field(default=None, max_length=20)
+    match_all_keywords: bool = False  # L1 requires every keyword instead of any
+    prefix_keywords: bool = False  # L1 keywords also match stored keywords they begin ("migrat")
+    fuzzy_keywords: bool = False  # L1 keywords also match stored keywords a typo or two away
     text: Optional[str] = Field(default=None, max_length=1_000)
     topic: Optional[str] = Field(default=None, max_length=100)
     type: Optional[FragmentType] = None
     token_budget: int = Field(default=1000, ge=100, le=50_000)
     threshold: float = Field(default=0.5, ge=0.0, le=1.0)
-    include_links: bool = False
+    include_links: bool = False  # Expand results along links (charged to the budget)
+    link_depth: int = Field(default=1, ge=1, le=3)
+    link_types: Optional[List[LinkRelationType]] = Field(default=None, max_length=6)
+    link_fanout: int = Field(default=10, ge=1, le=50)  # Max links followed per fragment per hop
+    include_cold: bool = True  # False limits L2 scans to hot/warm fragments
+    cursor: Optional[str] = Field(default=None, max_length=500)  # next_cursor of a previous page
 
     @model_validator(mode="after")
     def require_search_criterion(self) -> "RecallRequest":
@@ -114,16 +143,46 @@ class RecallRequest(BaseModel):
             raise ValueError(
                 "At least one search criterion is required: keywords, text, topic, or type"
             )
+        if self.cursor and not has_keywords:
+            raise ValueError("cursor pages through keyword (L1) matches and requires keywords")
         return self
 
 
+class GraphEdge(BaseModel):
+    """A link traversed during graph expansion"""
+    from_id: str
+    to_id: str
+    relation_type: LinkRelationType
+    depth: int  # Hop at which the edge was reached
+
+
 class RecallResponse(BaseModel):
     """Output model for search results"""
     success: bool
     fragments: List[FragmentResponse]
-    total_tokens: int
-    search_path: List[str]  # ["L1:3", "L2:2"] shows which layers fired
+    edges: List[GraphEdge] = []  # Links between returned fragments (include_links only)
+    total_tokens: int  # Sum of the fragments' stored token counts
+    search_path: List[str]  # ["L1:3", "L3:2"] shows which layers fired
     query_time_ms: float
+    next_cursor: Optional[str] = None  # Set when more L1 matches remain
+
+
+class GraphResponse(BaseModel):
+    """Neighbourhood of a fragment in the links graph"""
+    success: bool
+    root_id: str
+    fragments: List[FragmentResponse]  # Root first, then neighbours in hop order
+    edges: List[GraphEdge]
+
+
+class CacheStats(BaseModel):
+    """Recall cache effectiveness"""
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    hit_rate: float
 
 
 class FragmentStats(BaseModel):
@@ -134,6 +193,58 @@ class FragmentStats(BaseModel):
     by_topic: Dict[str, int]
     oldest_fragment: Optional[datetime]
     newest_fragment: Optional[datetime]
+    by_reference_count: Optional[Dict[str, int]] = None  # Buckets ("0", "1-9", ...); detailed only
+    recall_cache: Optional[CacheStats] = None  # Present when caching is enabled
+
+
+class SessionEndResponse(BaseModel):
+    """Output model for ending a session"""
+    success: bool
+    session_id: str
+    pending_fragments: int  # Removed by the background sweeper
+
+
+class ImportResponse(BaseModel):
+    """Outcome of an NDJSON import"""
+    success: bool
+    fragments: int
+    links: int
+    skipped: int  # Records already present (or links to missing fragments)
+    last_fragment_id: Optional[str]  # Resume point for a follow-up export/import
+
+
+class PoolRoleStats(BaseModel):
+    """Checkout timings for one connection role"""
+    checkouts: int
+    timeouts: int
+    wait_ms_avg: float
+    wait_ms_max: float
+    hold_ms_avg: float
+    hold_ms_max: float
+
+
+class PoolStats(BaseModel):
+    """Connection pool health"""
+    size: int
+    readers_available: int
+    reader: PoolRoleStats
+    writer: PoolRoleStats
+
+
+class ShardStats(BaseModel):
+    """One shard's database file and connection pool"""
+    name: str
+    path: str
+    total_fragments: int
+    size_bytes: int  # Database file plus its WAL
+    pool: PoolStats
+
+
+class ShardStatsResponse(BaseModel):
+    """Per-shard breakdown of a sharded deployment"""
+    success: bool
+    mode: str  # "tenant" or "topic"
+    shards: List[ShardStats]
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,153 @@
+"""
+Fogsift Memory System - Connection Pool
+One writer connection plus N WAL reader connections, checked out per operation.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from .schema import connect, initialize_database
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class _RoleMetrics:
+    """Wait/hold timings for one connection role (reader or writer)."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.hold_ms_total = 0.0
+        self.hold_ms_max = 0.0
+        self.timeouts = 0
+
+    def record(self, wait_ms: float, hold_ms: float) -> None:
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.hold_ms_total += hold_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self.hold_ms_max = max(self.hold_ms_max, hold_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        n = self.checkouts or 1
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_ms_total / n, 3),
+            "wait_ms_max": round(self.wait_ms_max, 3),
+            "hold_ms_avg": round(self.hold_ms_total / n, 3),
+            "hold_ms_max": round(self.hold_ms_max, 3),
+        }
+
+
+class ConnectionPool:
+    """Bounded SQLite pool: a single serialized writer and a queue of readers.
+
+    SQLite allows one writer at a time regardless of connection count, so
+    writes share one connection behind a lock. Readers are separate WAL
+    connections and run concurrently with the writer and with each other.
+    In-memory databases cannot be shared across connections, so for
+    ``:memory:`` (or a wrapped existing connection) reads fall back to the
+    writer connection.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0):
+        if size < 0:
+            raise ValueError("Pool size must be >= 0")
+        if db_path == ":memory:":
+            size = 0
+        self._setup(initialize_database(db_path), db_path, size, timeout)
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection, timeout: float = 5.0) -> "ConnectionPool":
+        """Wraps an existing initialized connection as a writer-only pool."""
+        pool = cls.__new__(cls)
+        pool._setup(conn, None, 0, timeout)
+        return pool
+
+    def _setup(self, writer: sqlite3.Connection, db_path: Optional[str], size: int, timeout: float):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._writer = writer
+        self._writer_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"reader": _RoleMetrics(), "writer": _RoleMetrics()}
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self._all_readers = []
+        for _ in range(size):
+            reader = connect(db_path, read_only=True)
+            self._all_readers.append(reader)
+            self._readers.put(reader)
+
+    def _record(self, role: str, wait_ms: float, hold_ms: float) -> None:
+        with self._metrics_lock:
+            self._metrics[role].record(wait_ms, hold_ms)
+
+    def _timed_out(self, role: str) -> PoolTimeout:
+        with self._metrics_lock:
+            self._metrics[role].timeouts += 1
+        return PoolTimeout(f"No {role} connection available within {self.timeout}s")
+
+    @contextmanager
+    def _writer_checkout(self, role: str) -> Iterator[sqlite3.Connection]:
+        start = time.perf_counter()
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            raise self._timed_out(role)
+        acquired = time.perf_counter()
+        try:
+            yield self._writer
+        finally:
+            self._writer_lock.release()
+            self._record(role, (acquired - start) * 1000, (time.perf_counter() - acquired) * 1000)
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Checks out a read-only connection for the duration of the block."""
+        if not self.size:
+            with self._writer_checkout("reader") as conn:
+                yield conn
+            return
+
+        start = time.perf_counter()
+        try:
+            conn = self._readers.get(timeout=self.timeout)
+        except queue.Empty:
+            raise self._timed_out("reader") from None
+        acquired = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+            self._record("reader", (acquired - start) * 1000, (time.perf_counter() - acquired) * 1000)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Checks out the writer inside a transaction (rollback on any exception)."""
+        with self._writer_checkout("writer") as conn:
+            with conn:
+                yield conn
+
+    def metrics(self) -> Dict[str, object]:
+        with self._metrics_lock:
+            return {
+                "size": self.size,
+                "readers_available": self._readers.qsize(),
+                "reader": self._metrics["reader"].snapshot(),
+                "writer": self._metrics["writer"].snapshot(),
+            }
+
+    def close(self) -> None:
+        for reader in self._all_readers:
+            reader.close()
+        self._all_readers = []
+        self._writer.close()
@@ -0,0 +1,127 @@
+"""
+Fogsift Memory System - Relevance Ranking
+Scores recall candidates on several signals and packs them into the token budget.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .keywords import keyword_terms
+from .models import RecallRequest
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parses stored timestamps (isoformat or CURRENT_TIMESTAMP) as aware UTC datetimes."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif value:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    else:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class RelevanceScorer:
+    """Combines per-candidate signals into one relevance score in [0, 1].
+
+    Signals, each scaled to [0, 1] before weighting:
+      - keywords:   share of the request's keywords the fragment carries,
+                    compared as match terms (plurals meet singulars)
+      - text:       BM25 score (L3) relative to the best text hit in the batch
+      - vector:     cosine similarity from the semantic layer (L4)
+      - recency:    exponential decay of last_referenced with half_life_days
+      - references: log-scaled reference_count, saturating at reference_cap
+      - importance: the stored importance
+    Signals a request can't produce (no keywords, no text) contribute zero for
+    every candidate, so they don't change the order.
+    """
+
+    DEFAULT_WEIGHTS = {
+        "keywords": 0.30,
+        "text": 0.20,
+        "vector": 0.15,
+        "recency": 0.10,
+        "references": 0.05,
+        "importance": 0.20,
+    }
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        half_life_days: float = 30.0,
+        reference_cap: int = 100,
+    ):
+        unknown = set(weights or {}) - set(self.DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown ranking signals: {sorted(unknown)}")
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.decay_rate = math.log(2) / half_life_days
+        self.reference_scale = math.log1p(reference_cap)
+
+    def score(
+        self,
+        fragment: Dict[str, Any],
+        query_keywords: frozenset,
+        max_text_score: float,
+        now: datetime,
+    ) -> float:
+        w = self.weights
+        total = w["importance"] * fragment["importance"]
+
+        if query_keywords:
+            matched = len(query_keywords.intersection(keyword_terms(fragment.get("keywords", ()))))
+            # L1's match_count also counts prefix and fuzzy matches
+            matched = max(matched, fragment.get("match_count") or 0)
+            total += w["keywords"] * min(matched, len(query_keywords)) / len(query_keywords)
+        if max_text_score > 0:
+            total += w["text"] * max(fragment.get("text_score") or 0.0, 0.0) / max_text_score
+        total += w["vector"] * max(fragment.get("vector_score") or 0.0, 0.0)
+
+        last_referenced = parse_timestamp(fragment.get("last_referenced"))
+        if last_referenced is not None:
+            age_days = max((now - last_referenced).total_seconds() / 86400, 0.0)
+            total += w["recency"] * math.exp(-self.decay_rate * age_days)
+        references = fragment.get("reference_count") or 0
+        total += w["references"] * min(math.log1p(references) / self.reference_scale, 1.0)
+        return total
+
+    def rank(
+        self,
+        fragments: Sequence[Dict[str, Any]],
+        request: RecallRequest,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Returns (score, fragment) pairs, best first; ties go to higher importance."""
+        now = now or datetime.now(timezone.utc)
+        query_keywords = frozenset(keyword_terms(request.keywords or ()))
+        max_text_score = max((f.get("text_score") or 0.0 for f in fragments), default=0.0)
+        scored = [
+            (self.score(f, query_keywords, max_text_score, now), f) for f in fragments
+        ]
+        scored.sort(key=lambda pair: (pair[0], pair[1]["importance"]), reverse=True)
+        return scored
+
+
+def pack_budget(
+    fragments: Sequence[Dict[str, Any]],
+    budget: int,
+    cost: Callable[[Dict[str, Any]], int],
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Greedily fills the budget in rank order, skipping fragments that don't fit.
+
+    Unlike stopping at the first misfit, a large fragment no longer blocks
+    smaller, lower-ranked ones from using the remaining budget.
+    Returns the packed fragments and the tokens they use.
+    """
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for frag in fragments:
+        tokens = cost(frag)
+        if used + tokens <= budget:
+            packed.append(frag)
+            used += tokens
+    return packed, used
@@ -0,0 +1,103 @@
+"""
+Fogsift Memory System - Reference Tracking
+Records recall hits and writes reference counts through or in coalesced batches.
+"""
+
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from .background import PeriodicWorker
+from .backend import StorageBackend
+
+
+class ReferenceTracker:
+    """Applies reference_count/last_referenced bumps for recalled fragments.
+
+    Durability modes:
+      - ``sync``: write through on every recall (the recall pays for a write).
+      - ``buffered``: coalesce hits in memory and flush them in one write
+        transaction every ``flush_interval_ms`` or once ``flush_threshold``
+        hits are pending. Up to one interval of counts can be lost on a crash.
+      - ``off``: don't track references at all.
+    """
+
+    SYNC = "sync"
+    BUFFERED = "buffered"
+    OFF = "off"
+    MODES = (SYNC, BUFFERED, OFF)
+
+    def __init__(
+        self,
+        store: StorageBackend,
+        mode: str = SYNC,
+        flush_interval_ms: int = 500,
+        flush_threshold: int = 1000,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown reference mode {mode!r}; expected one of {self.MODES}")
+        self.store = store
+        self.mode = mode
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_threshold = flush_threshold
+        self._pending: Counter = Counter()
+        self._last_seen: Dict[str, str] = {}
+        self._pending_hits = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = PeriodicWorker("fogsift-reference-flusher", self.flush_interval, self.flush)
+        self.flushes = 0
+
+    def record(self, fragment_ids: List[str]) -> None:
+        if not fragment_ids or self.mode == self.OFF:
+            return
+        if self.mode == self.SYNC:
+            self.store.increment_reference(fragment_ids)
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._pending.update(fragment_ids)
+            for frag_id in fragment_ids:
+                self._last_seen[frag_id] = now
+            self._pending_hits += len(fragment_ids)
+            over_threshold = self._pending_hits >= self.flush_threshold
+        if over_threshold:
+            self._worker.wake()
+
+    def flush(self) -> int:
+        """Writes all pending hits in one transaction; returns fragments updated."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                counts, last_seen = self._pending, self._last_seen
+                self._pending, self._last_seen = Counter(), {}
+                self._pending_hits = 0
+            try:
+                self.store.apply_references(counts, last_seen)
+            except Exception:
+                # Put the hits back so the next flush retries them
+                with self._lock:
+                    self._pending.update(counts)
+                    for frag_id, ts in last_seen.items():
+                        self._last_seen.setdefault(frag_id, ts)
+                    self._pending_hits += sum(counts.values())
+                raise
+            self.flushes += 1
+            return len(counts)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self) -> None:
+        """Starts the background flusher (buffered mode only)."""
+        if self.mode == self.BUFFERED:
+            self._worker.start()
+
+    def close(self) -> None:
+        """Stops the flusher and writes whatever is still pending."""
+        self._worker.close()
+        self.flush()
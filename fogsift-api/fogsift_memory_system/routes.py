@@ -3,21 +3,30 @@ Fogsift Memory System - API Routes
 HTTP Endpoints for FastAPI.
 """
 
+import json
 import logging
 import sqlite3
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import ValidationError
 
 from .models import (
-    FragmentCreate, FragmentResponse, RecallRequest, RecallResponse,
-    LinkCreate, LinkResponse, FragmentStats,
+    FragmentCreate, FragmentResponse, FragmentBatchCreate, FragmentBatchResponse,
+    RecallRequest, RecallResponse, LinkCreate, LinkResponse, FragmentStats, PoolStats,
+    ImportResponse, SessionEndResponse, GraphResponse, LinkRelationType, ShardStatsResponse,
 )
+from .pool import PoolTimeout
+from .sharding import ShardLimitReached, UnknownTenant
 
 logger = logging.getLogger("fogsift_memory.routes")
 
 router = APIRouter(prefix="/api/memory", tags=["Memory"])
+metrics_router = APIRouter(tags=["Metrics"])  # Mounted at the root for Prometheus scrapers
 
-# Injected at startup by main.py
+IMPORT_BATCH_SIZE = 500
+
+# Injected at startup by main.py (an AsyncMemoryService)
 memory_service = None
 
 
@@ -27,11 +36,52 @@ def get_service():
     return memory_service
 
 
+def get_tenant_service(
+    x_fogsift_tenant: Optional[str] = Header(default=None, max_length=64),
+    service=Depends(get_service),
+):
+    """The service scoped to the X-Fogsift-Tenant header's shard, when sharding by tenant.
+
+    For reads: a tenant without a shard is a 404, never a new shard. Without
+    the header, recall fans out across every shard.
+    """
+    if x_fogsift_tenant is None:
+        return service
+    try:
+        return service.for_tenant(x_fogsift_tenant, create=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownTenant as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def get_tenant_writer(
+    x_fogsift_tenant: Optional[str] = Header(default=None, max_length=64),
+    service=Depends(get_service),
+):
+    """Like get_tenant_service, for writes: creates the tenant's shard if it may have one.
+
+    Without the header, writes go to the default shard.
+    """
+    if x_fogsift_tenant is None:
+        return service
+    try:
+        return service.for_tenant(x_fogsift_tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownTenant as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ShardLimitReached as e:
+        raise HTTPException(status_code=507, detail=str(e))
+
+
 @router.post("/remember", response_model=FragmentResponse)
-async def remember(request: FragmentCreate, service=Depends(get_service)):
+async def remember(request: FragmentCreate, service=Depends(get_tenant_writer)):
     """Store a new memory fragment."""
     try:
-        return service.remember(request)
+        return await service.remember(request)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
     except ValidationError as e:
         raise HTTPException(status_code=422, detail="Invalid fragment data")
     except Exception:
@@ -39,62 +89,225 @@ async def remember(request: FragmentCreate, service=Depends(get_service)):
         raise HTTPException(status_code=500, detail="Failed to store fragment")
 
 
+@router.post("/remember/batch", response_model=FragmentBatchResponse)
+async def remember_batch(request: FragmentBatchCreate, service=Depends(get_tenant_writer)):
+    """Store up to 1,000 fragments in a single transaction."""
+    try:
+        fragments = await service.remember_batch(request.fragments)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    except Exception:
+        logger.exception("remember_batch() failed")
+        raise HTTPException(status_code=500, detail="Failed to store fragments")
+    return FragmentBatchResponse(success=True, count=len(fragments), fragments=fragments)
+
+
 @router.post("/recall", response_model=RecallResponse)
-async def recall(request: RecallRequest, service=Depends(get_service)):
-    """Search for relevant memory fragments."""
+async def recall(request: RecallRequest, service=Depends(get_tenant_service)):
+    """Search for relevant memory fragments.
+
+    The body is encoded straight from the result rows (same JSON as
+    RecallResponse, without validating every fragment twice).
+    """
     try:
-        return service.recall(request)
+        content = await service.recall_json(request)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    except ValueError as e:  # Malformed cursor
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         logger.exception("recall() failed")
         raise HTTPException(status_code=500, detail="Search failed")
+    return Response(content, media_type="application/json")
 
 
 @router.delete("/forget/{fragment_id}")
-async def forget(fragment_id: str, service=Depends(get_service)):
+async def forget(fragment_id: str, service=Depends(get_tenant_service)):
     """Delete a memory fragment."""
     if not fragment_id.strip():
         raise HTTPException(status_code=400, detail="Invalid fragment ID")
-    success = service.forget(fragment_id)
+    try:
+        success = await service.forget(fragment_id)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
     if not success:
         raise HTTPException(status_code=404, detail="Fragment not found")
     return {"success": True, "deleted_id": fragment_id}
 
 
+@router.post("/session/{session_id}/end", response_model=SessionEndResponse)
+async def end_session(session_id: str, service=Depends(get_tenant_service)):
+    """End a session; its session-scoped fragments are garbage collected in the background."""
+    if not session_id.strip() or len(session_id) > 100:
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    try:
+        return await service.end_session(session_id)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+
+
 @router.post("/link", response_model=LinkResponse)
-async def link_fragments(request: LinkCreate, service=Depends(get_service)):
+async def link_fragments(request: LinkCreate, service=Depends(get_tenant_service)):
     """Create a relationship graph link between two fragments."""
     try:
-        return service.link(request)
+        return await service.link(request)
     except sqlite3.IntegrityError:
         raise HTTPException(
             status_code=400,
             detail="One or both fragment IDs do not exist",
         )
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
     except Exception:
         logger.exception("link() failed")
         raise HTTPException(status_code=500, detail="Failed to create link")
 
 
+@router.get("/graph/{fragment_id}", response_model=GraphResponse)
+async def get_graph(
+    fragment_id: str,
+    depth: int = Query(1, ge=1, le=3),
+    relation_type: Optional[List[LinkRelationType]] = Query(None),
+    fanout: int = Query(10, ge=1, le=50),
+    service=Depends(get_tenant_service),
+):
+    """Get a fragment's neighbourhood in the links graph, up to ``depth`` hops."""
+    try:
+        graph = await service.graph(fragment_id, depth, relation_type, fanout)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    except Exception:
+        logger.exception("graph() failed")
+        raise HTTPException(status_code=500, detail="Graph traversal failed")
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Fragment not found")
+    return graph
+
+
 @router.get("/stats", response_model=FragmentStats)
-async def get_stats(service=Depends(get_service)):
-    """Get system statistics and knowledge base shape."""
+async def get_stats(detailed: bool = False, service=Depends(get_tenant_service)):
+    """Get system statistics and knowledge base shape.
+
+    Counts are maintained incrementally, so polling this is cheap. Pass
+    ``detailed=true`` for the reference-count distribution as well.
+    """
     try:
-        return service.get_stats()
+        return await service.get_stats(detailed)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
     except Exception:
         logger.exception("get_stats() failed")
         raise HTTPException(status_code=500, detail="Failed to retrieve stats")
 
 
+@router.get("/pool", response_model=PoolStats)
+async def get_pool_stats(service=Depends(get_service)):
+    """Get connection pool checkout counts and wait/hold timings."""
+    return await service.get_pool_stats()
+
+
+@router.get("/shards", response_model=ShardStatsResponse)
+async def get_shard_stats(service=Depends(get_service)):
+    """Get per-shard fragment counts, file sizes and pool timings."""
+    try:
+        stats = await service.shard_stats()
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Sharding is not enabled")
+    return stats
+
+
+@router.get("/export")
+async def export_memory(after: Optional[str] = None, service=Depends(get_tenant_service)):
+    """Stream every fragment (with keywords) and link as NDJSON.
+
+    Pass ``after=<fragment id>`` to resume an interrupted export.
+    """
+    try:
+        lines = service.export_ndjson(after)
+    except ValueError as e:  # Sharded export resuming after an unknown fragment
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_memory(request: Request, service=Depends(get_tenant_writer)):
+    """Import an NDJSON export, streamed and committed in batches.
+
+    Records whose id already exists are skipped, so an interrupted import
+    can simply be re-sent (or resumed from ``last_fragment_id``).
+    """
+    totals = ImportResponse(success=True, fragments=0, links=0, skipped=0, last_fragment_id=None)
+    batch = []
+    line_no = 0
+
+    async def flush():
+        result = await service.import_records(batch)
+        totals.fragments += result.fragments
+        totals.links += result.links
+        totals.skipped += result.skipped
+        totals.last_fragment_id = result.last_fragment_id or totals.last_fragment_id
+        batch.clear()
+
+    async def lines():
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line
+        yield buffer
+
+    try:
+        async for line in lines():
+            line_no += 1
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except (ValueError, KeyError, TypeError):  # Includes JSON and Pydantic errors
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": f"Invalid record at or before line {line_no}",
+                "last_fragment_id": totals.last_fragment_id,
+            },
+        )
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    return totals
+
+
 @router.get("/topic/{topic}", response_model=RecallResponse)
-async def get_by_topic(topic: str, service=Depends(get_service)):
+async def get_by_topic(topic: str, service=Depends(get_tenant_service)):
     """Get all memory fragments for a specific topic."""
     if not topic.strip():
         raise HTTPException(status_code=400, detail="Topic must not be empty")
     req = RecallRequest(topic=topic, token_budget=5000)
-    return service.recall(req)
+    try:
+        content = await service.recall_json(req)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Memory store busy, retry later")
+    return Response(content, media_type="application/json")
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(service=Depends(get_service)):
+    """Recall latency histograms (total and per stage), pool and cache counters,
+    in Prometheus text format."""
+    return PlainTextResponse(
+        await service.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @router.get("/health")
 async def health_check():
     """System health check."""
-    return {"status": "online", "system": "Fogsift Memory L1/L2"}
+    return {"status": "online", "system": "Fogsift Memory L1/L2/L3"}
@@ -3,9 +3,27 @@ Fogsift Memory System - Database Schema
 Initializes SQLite database and handles migrations.
 """
 
+import json
 import sqlite3
 import os
 
+from .keywords import document_terms, normalize_keyword
+
+
+def connect(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """Opens a configured connection to an already-initialized database.
+
+    Connections are handed between worker threads by the pool, so
+    check_same_thread is disabled; the pool guarantees one user at a time.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 5000;")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON;")
+    return conn
+
 
 def initialize_database(db_path: str) -> sqlite3.Connection:
     """Creates tables and indexes if they don't exist and returns a connection."""
@@ -14,15 +32,11 @@ def initialize_database(db_path: str) -> sqlite3.Connection:
     if db_dir:
         os.makedirs(db_dir, exist_ok=True)
 
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-
+    conn = connect(db_path)
     cursor = conn.cursor()
 
-    # Enable foreign keys, WAL mode, and busy timeout
-    cursor.execute("PRAGMA foreign_keys = ON;")
+    # WAL mode lets pooled readers run alongside the single writer
     cursor.execute("PRAGMA journal_mode = WAL;")
-    cursor.execute("PRAGMA busy_timeout = 5000;")
 
     # 1. Fragments Table (Core Data)
     cursor.execute('''
@@ -40,20 +54,32 @@ def initialize_database(db_path: str) -> sqlite3.Connection:
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         last_referenced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         reference_count INTEGER DEFAULT 0 CHECK(reference_count >= 0),
-        source JSON
+        source JSON,
+        session_id TEXT,
+        token_count INTEGER CHECK(token_count >= 0)
     )
     ''')
+    # Migrations: columns added after the initial schema
+    _add_column_if_missing(cursor, "fragments", "session_id", "TEXT")
+    # Filled at write time; older rows are backfilled by tokens.backfill_token_counts()
+    _add_column_if_missing(cursor, "fragments", "token_count", "INTEGER CHECK(token_count >= 0)")
 
-    # 2. Keywords Table (L1 Index) — UNIQUE prevents duplicate keywords per fragment
+    # 2. Keywords Table (L1 Index) — UNIQUE prevents duplicate keywords per fragment.
+    # keyword is what the caller supplied (lowercased); term is the form L1
+    # matches on (keywords.normalize_keyword), so plurals meet singulars
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS keywords (
         fragment_id TEXT NOT NULL,
         keyword TEXT NOT NULL,
+        term TEXT,
         UNIQUE(fragment_id, keyword),
         FOREIGN KEY(fragment_id) REFERENCES fragments(id) ON DELETE CASCADE
     )
     ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_keywords_keyword ON keywords(keyword)')
+    if _add_column_if_missing(cursor, "keywords", "term", "TEXT"):
+        backfill_keyword_terms(conn)  # Keywords written before terms existed
+    cursor.execute('DROP INDEX IF EXISTS idx_keywords_keyword')  # L1 reads terms now
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_keywords_term ON keywords(term)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_keywords_fragment_id ON keywords(fragment_id)')
 
     # 3. Links Table (Graph Relationships)
@@ -82,6 +108,32 @@ def initialize_database(db_path: str) -> sqlite3.Connection:
     )
     ''')
 
+    # 6. Sessions Table (lifecycle of session-scoped fragments)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        ended_at TIMESTAMP
+    )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_fragments_session '
+        'ON fragments(session_id) WHERE session_id IS NOT NULL'
+    )
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_fragments_orphan_session '
+        "ON fragments(created_at) WHERE scope = 'session' AND session_id IS NULL"
+    )
+
+    # 7. Embeddings Table (L4 semantic index), one float32 vector blob per fragment
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS embeddings (
+        fragment_id TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        FOREIGN KEY(fragment_id) REFERENCES fragments(id) ON DELETE CASCADE
+    )
+    ''')
+
     # L2 search support indexes
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_fragments_topic ON fragments(topic)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_fragments_type ON fragments(type)')
@@ -90,6 +142,104 @@ def initialize_database(db_path: str) -> sqlite3.Connection:
         'ON fragments(importance DESC, last_referenced DESC)'
     )
 
+    # TTL tier lifecycle: hot/warm-first scans and idle-fragment demotion
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_fragments_tier_last_ref '
+        'ON fragments(ttl_tier, last_referenced)'
+    )
+
+    # 5. Full-text index (L3) over fragments.content, kept in sync by triggers.
+    # External-content table keyed on the implicit fragments rowid; call
+    # rebuild_fts() after a VACUUM, which may renumber implicit rowids.
+    fts_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fragments_fts'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS fragments_fts USING fts5(
+        content,
+        content='fragments',
+        content_rowid='rowid',
+        tokenize='porter unicode61'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS fragments_fts_insert AFTER INSERT ON fragments BEGIN
+        INSERT INTO fragments_fts (rowid, content) VALUES (new.rowid, new.content);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS fragments_fts_delete AFTER DELETE ON fragments BEGIN
+        INSERT INTO fragments_fts (fragments_fts, rowid, content)
+        VALUES ('delete', old.rowid, old.content);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS fragments_fts_update AFTER UPDATE OF content ON fragments BEGIN
+        INSERT INTO fragments_fts (fragments_fts, rowid, content)
+        VALUES ('delete', old.rowid, old.content);
+        INSERT INTO fragments_fts (rowid, content) VALUES (new.rowid, new.content);
+    END
+    ''')
+    if not fts_exists:
+        rebuild_fts(conn)  # Backfill fragments written before the index existed
+
+    # 8. Fragment Stats (counters behind /stats), kept in sync by triggers so
+    # reading them never scans fragments. Rows are (dimension, value, count).
+    stats_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fragment_stats'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fragment_stats (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+    ''')
+    for statement in _stats_triggers():
+        cursor.execute(statement)
+    if not stats_exist:
+        rebuild_stats(conn)  # Count fragments written before the counters existed
+    # oldest/newest fragment via index min/max instead of a scan
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_fragments_created_at ON fragments(created_at)')
+
+    # 9. Term Stats (document frequencies behind keyword extraction). Each
+    # fragment's distinct analyzed terms are stored once, as a JSON array, and
+    # triggers count them into term_stats; deletes cascade from fragments.
+    terms_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fragment_terms'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fragment_terms (
+        fragment_id TEXT PRIMARY KEY,
+        terms JSON NOT NULL,
+        FOREIGN KEY(fragment_id) REFERENCES fragments(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS term_stats (
+        term TEXT PRIMARY KEY,
+        doc_count INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS term_stats_insert AFTER INSERT ON fragment_terms BEGIN
+        INSERT INTO term_stats (term, doc_count)
+        SELECT value, 1 FROM json_each(new.terms) WHERE true
+        ON CONFLICT (term) DO UPDATE SET doc_count = doc_count + 1;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS term_stats_delete AFTER DELETE ON fragment_terms BEGIN
+        UPDATE term_stats SET doc_count = doc_count - 1
+        WHERE term IN (SELECT value FROM json_each(old.terms));
+        DELETE FROM term_stats
+        WHERE doc_count <= 0 AND term IN (SELECT value FROM json_each(old.terms));
+    END
+    ''')
+    if not terms_exist:
+        backfill_terms(conn)  # Analyze fragments written before the statistics existed
+
     cursor.execute('''
         INSERT OR IGNORE INTO metadata (key, value)
         VALUES ('db_initialized', CURRENT_TIMESTAMP)
@@ -97,3 +247,130 @@ def initialize_database(db_path: str) -> sqlite3.Connection:
 
     conn.commit()
     return conn
+
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, decl: str) -> bool:
+    """Adds the column unless the table has it; returns whether it was added."""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+# Counted dimensions of a fragment row; {row} is "new" or "old" inside triggers
+STAT_DIMENSIONS = {
+    "total": "''",
+    "type": "{row}.type",
+    "tier": "{row}.ttl_tier",
+    "topic": "{row}.topic",
+    "references": (
+        "CASE WHEN COALESCE({row}.reference_count, 0) = 0 THEN '0'"
+        " WHEN {row}.reference_count < 10 THEN '1-9'"
+        " WHEN {row}.reference_count < 100 THEN '10-99' ELSE '100+' END"
+    ),
+}
+# Columns whose updates move a fragment between values of a dimension
+_STAT_COLUMNS = {"type": "type", "tier": "ttl_tier", "topic": "topic", "references": "reference_count"}
+
+
+def _stat_delta(dimension: str, row: str, delta: int) -> str:
+    value = STAT_DIMENSIONS[dimension].format(row=row)
+    if delta > 0:
+        return (
+            f"INSERT INTO fragment_stats (dimension, value, count) VALUES ('{dimension}', {value}, 1) "
+            "ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;"
+        )
+    return (
+        f"UPDATE fragment_stats SET count = count - 1 WHERE dimension = '{dimension}' AND value = {value}; "
+        f"DELETE FROM fragment_stats WHERE dimension = '{dimension}' AND value = {value} AND count <= 0;"
+    )
+
+
+def _stats_triggers():
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS fragment_stats_insert AFTER INSERT ON fragments BEGIN "
+        + " ".join(_stat_delta(d, "new", 1) for d in STAT_DIMENSIONS) + " END"
+    )
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS fragment_stats_delete AFTER DELETE ON fragments BEGIN "
+        + " ".join(_stat_delta(d, "old", -1) for d in STAT_DIMENSIONS) + " END"
+    )
+    for dimension, column in _STAT_COLUMNS.items():
+        old, new = (STAT_DIMENSIONS[dimension].format(row=r) for r in ("old", "new"))
+        yield (
+            f"CREATE TRIGGER IF NOT EXISTS fragment_stats_update_{dimension} "
+            f"AFTER UPDATE OF {column} ON fragments WHEN ({old}) IS NOT ({new}) BEGIN "
+            f"{_stat_delta(dimension, 'old', -1)} {_stat_delta(dimension, 'new', 1)} END"
+        )
+
+
+def rebuild_stats(conn: sqlite3.Connection) -> None:
+    """Recounts the fragment_stats counters from the fragments table."""
+    conn.execute("DELETE FROM fragment_stats")
+    for dimension, expr in STAT_DIMENSIONS.items():
+        value = expr.format(row="fragments")
+        conn.execute(f'''
+            INSERT INTO fragment_stats (dimension, value, count)
+            SELECT '{dimension}', {value}, COUNT(*) FROM fragments GROUP BY 2
+        ''')
+
+
+def backfill_terms(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """Stores the analyzed terms of fragments that have none; returns rows written.
+
+    Fragments are read in rowid order, batch_size at a time, so the corpus
+    is never held in memory at once. The term_stats triggers count each
+    row as it is inserted.
+    """
+    written, last_rowid = 0, 0
+    while True:
+        rows = conn.execute('''
+            SELECT rowid, id, content FROM fragments
+            WHERE rowid > ?
+              AND NOT EXISTS (SELECT 1 FROM fragment_terms t WHERE t.fragment_id = fragments.id)
+            ORDER BY rowid LIMIT ?
+        ''', (last_rowid, batch_size)).fetchall()
+        if not rows:
+            return written
+        conn.executemany(
+            'INSERT INTO fragment_terms (fragment_id, terms) VALUES (?, ?)',
+            [(row["id"], json.dumps(document_terms(row["content"]))) for row in rows],
+        )
+        written += len(rows)
+        last_rowid = rows[-1]["rowid"]
+
+
+def rebuild_term_stats(conn: sqlite3.Connection) -> None:
+    """Recounts term_stats from fragment_terms."""
+    conn.execute("DELETE FROM term_stats")
+    conn.execute('''
+        INSERT INTO term_stats (term, doc_count)
+        SELECT value, COUNT(*) FROM fragment_terms, json_each(fragment_terms.terms) GROUP BY value
+    ''')
+
+
+def backfill_keyword_terms(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """Fills the match term of keyword rows that have none; returns rows updated.
+
+    The stored keyword itself is left as written.
+    """
+    updated, last_rowid = 0, 0
+    while True:
+        rows = conn.execute(
+            'SELECT rowid, keyword FROM keywords WHERE rowid > ? AND term IS NULL ORDER BY rowid LIMIT ?',
+            (last_rowid, batch_size),
+        ).fetchall()
+        if not rows:
+            return updated
+        conn.executemany(
+            'UPDATE keywords SET term = ? WHERE rowid = ?',
+            [(normalize_keyword(keyword), rowid) for rowid, keyword in rows],
+        )
+        updated += len(rows)
+        last_rowid = rows[-1][0]
+
+
+def rebuild_fts(conn: sqlite3.Connection) -> None:
+    """Regenerates the L3 full-text index from the fragments table."""
+    conn.execute("INSERT INTO fragments_fts (fragments_fts) VALUES ('rebuild')")
@@ -1,10 +1,36 @@
 """
 Fogsift Memory System - Search Engine
-Handles L1 (Keyword) and L2 (Metadata) search logic.
+Handles L1 (Keyword), L2 (Metadata), L3 (Full-text) and L4 (Semantic) search logic.
 """
 
-from typing import List, Dict, Any, Optional
-from .store import MemoryStore
+import base64
+import binascii
+import json
+import re
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from .keywords import keyword_terms
+from .store import MemoryStore, parse_source
+from .metrics import record_query, stage
+from .vocabulary import MIN_PREFIX_LENGTH, PREFIX_END
+
+# Token cost of a row; rows written before token counting fall back to the estimate
+_TOKENS = "COALESCE(token_count, length(content) / 4)"
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque continuation token for the L1 row order (match_count, importance, id)."""
+    key = json.dumps([row["match_count"], row["importance"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[int, float, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it didn't produce."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        match_count, importance, frag_id = json.loads(raw)
+        return int(match_count), float(importance), str(frag_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
 
 
 class MemorySearch:
@@ -16,41 +42,133 @@ class MemorySearch:
         keywords: List[str],
         topic: Optional[str] = None,
         type_filter: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[int, float, str]] = None,
+        match_all: bool = False,
+        prefix: bool = False,
+        fuzzy: bool = False,
     ) -> List[Dict]:
-        """L1 Search: Exact keyword matching. Fastest retrieval."""
+        """L1 Search: Exact keyword matching. Fastest retrieval.
+
+        Fragments are ranked by how many of the keywords they carry
+        (match_count), then importance, then id, and limited in SQL. ``after``
+        is the (match_count, importance, id) of the last row of the previous
+        page (see decode_cursor) for keyset pagination. With match_all only
+        fragments carrying every keyword are returned.
+
+        With prefix a keyword also matches stored keywords it begins, and
+        with fuzzy those within a few edits of it (see vocabulary.max_edits);
+        either way it adds at most 1 to match_count.
+
+        Once the store's keyword index is loaded the page is ranked in memory
+        and only its rows are read from SQLite.
+        """
+        keywords = keyword_terms(keywords)
         if not keywords:
             return []
 
-        cursor = self.store.conn.cursor()
-        placeholders = ','.join(['?'] * len(keywords))
-        query = f'''
-            SELECT DISTINCT f.* FROM fragments f
-            JOIN keywords k ON f.id = k.fragment_id
-            WHERE k.keyword IN ({placeholders})
-        '''
-        params: List[Any] = [k.lower() for k in keywords]
+        index = self.store.keyword_index
+        if index is not None and index.ready:
+            expansions = None
+            if prefix or fuzzy:
+                with stage("l1_expand"):
+                    expansions = self.store.keyword_vocabulary().expansions(keywords, prefix, fuzzy)
+            with stage("l1_index"):
+                hits = index.search(keywords, topic, type_filter, limit, after, match_all, expansions)
+            counts = dict(hits)
+            results = self.get_fragments(list(counts))
+            for r in results:
+                r["match_count"] = counts[r["id"]]
+            return results
+
+        if prefix or fuzzy:
+            matched, params = self._keyword_matches(keywords, prefix, fuzzy)
+            query = f'''
+                SELECT f.*, COUNT(DISTINCT m.slot) AS match_count FROM ({matched}) m
+                JOIN fragments f ON f.id = m.fragment_id
+            '''
+            conditions: List[str] = []
+        else:
+            placeholders = ','.join(['?'] * len(keywords))
+            query = '''
+                SELECT f.*, COUNT(DISTINCT k.term) AS match_count FROM keywords k
+                JOIN fragments f ON f.id = k.fragment_id
+            '''
+            conditions = [f"k.term IN ({placeholders})"]
+            params = list(keywords)
 
         if topic:
-            query += " AND f.topic = ?"
+            conditions.append("f.topic = ?")
             params.append(topic)
         if type_filter:
-            query += " AND f.type = ?"
+            conditions.append("f.type = ?")
             params.append(type_filter)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        query += " GROUP BY f.id"
+        having = []
+        if match_all:
+            having.append("match_count = ?")
+            params.append(len(keywords))
+        if after is not None:
+            match_count, importance, last_id = after
+            having.append('''(match_count < ?
+                OR (match_count = ? AND (f.importance < ?
+                    OR (f.importance = ? AND f.id > ?))))''')
+            params.extend([match_count, match_count, importance, importance, last_id])
+        if having:
+            query += " HAVING " + " AND ".join(having)
+
+        query += " ORDER BY match_count DESC, f.importance DESC, f.id LIMIT ?"
+        params.append(limit)
 
-        cursor.execute(query, params)
-        return self._format_results(cursor.fetchall())
+        with self.store.pool.reader() as conn:
+            return self._format_results(conn, self._execute(conn, "l1_sql", query, params))
+
+    def _keyword_matches(self, keywords: List[str], prefix: bool, fuzzy: bool) -> Tuple[str, List[Any]]:
+        """A subquery of (fragment_id, slot) rows, slot being the position of
+        the query keyword a stored keyword matched.
+
+        Prefixes are range scans on idx_keywords_term; fuzzy keywords are
+        expanded to exact terms through the store's vocabulary.
+        """
+        vocabulary = self.store.keyword_vocabulary() if fuzzy else None
+        selects, params = [], []
+        for slot, keyword in enumerate(keywords):
+            terms = set(vocabulary.similar(keyword)) if vocabulary is not None else set()
+            if prefix and len(keyword) >= MIN_PREFIX_LENGTH:
+                selects.append("SELECT fragment_id, ? AS slot FROM keywords WHERE term >= ? AND term < ?")
+                params.extend([slot, keyword, keyword + PREFIX_END])
+                terms = {term for term in terms if not term.startswith(keyword)}  # Already in the range
+            else:
+                terms.add(keyword)
+            if terms:
+                placeholders = ','.join(['?'] * len(terms))
+                selects.append(f"SELECT fragment_id, ? AS slot FROM keywords WHERE term IN ({placeholders})")
+                params.extend([slot, *sorted(terms)])
+        return " UNION ALL ".join(selects), params
 
     def search_l2(
         self,
         topic: Optional[str] = None,
         type_filter: Optional[str] = None,
         limit: int = 50,
+        tiers: Optional[Sequence[str]] = None,
+        token_budget: Optional[int] = None,
     ) -> List[Dict]:
-        """L2 Search: Metadata filtering. Used when L1 is insufficient or empty."""
-        cursor = self.store.conn.cursor()
+        """L2 Search: Metadata filtering. Used when L1 is insufficient or empty.
+
+        With token_budget, rows are cut in SQL once the budget is spent, so
+        large topics don't ship rows the budget packer would discard.
+        """
         query = "SELECT * FROM fragments WHERE 1=1"
         params: List[Any] = []
 
+        if tiers:
+            query += f" AND ttl_tier IN ({','.join(['?'] * len(tiers))})"
+            params.extend(tiers)
+
         if topic:
             query += " AND topic = ?"
             params.append(topic)
@@ -58,32 +176,138 @@ class MemorySearch:
             query += " AND type = ?"
             params.append(type_filter)
 
+        if token_budget is not None:
+            query += f" AND {_TOKENS} <= ?"  # Fragments that can never fit are skipped
+            params.append(token_budget)
+
         query += " ORDER BY importance DESC, last_referenced DESC LIMIT ?"
         params.append(limit)
 
-        cursor.execute(query, params)
-        return self._format_results(cursor.fetchall())
+        if token_budget is not None:
+            # Cut at the budget server-side: stop at the first row whose running
+            # total (in scan order) starts beyond the budget.
+            query = f'''
+                SELECT * FROM (
+                    SELECT *, SUM({_TOKENS}) OVER (
+                        ORDER BY importance DESC, last_referenced DESC
+                        ROWS UNBOUNDED PRECEDING
+                    ) - {_TOKENS} AS tokens_before
+                    FROM ({query})
+                )
+                WHERE tokens_before < ?
+                ORDER BY importance DESC, last_referenced DESC
+            '''
+            params.append(token_budget)
+
+        with self.store.pool.reader() as conn:
+            return self._format_results(conn, self._execute(conn, "l2_sql", query, params))
+
+    def search_l3(
+        self,
+        text: str,
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """L3 Search: FTS5 full-text match over content, ranked by BM25."""
+        match = self._fts_query(text)
+        if not match:
+            return []
+
+        query = '''
+            SELECT f.*, -bm25(fragments_fts) AS text_score
+            FROM fragments_fts
+            JOIN fragments f ON f.rowid = fragments_fts.rowid
+            WHERE fragments_fts MATCH ?
+        '''
+        params: List[Any] = [match]
+
+        if topic:
+            query += " AND f.topic = ?"
+            params.append(topic)
+        if type_filter:
+            query += " AND f.type = ?"
+            params.append(type_filter)
+
+        query += " ORDER BY bm25(fragments_fts) LIMIT ?"
+        params.append(limit)
+
+        with self.store.pool.reader() as conn:
+            return self._format_results(conn, self._execute(conn, "l3_sql", query, params))
+
+    def search_l4(
+        self,
+        matches: Sequence[Tuple[str, float]],
+        topic: Optional[str] = None,
+        type_filter: Optional[str] = None,
+    ) -> List[Dict]:
+        """L4 Search: loads semantic matches ((id, cosine) from the embedding
+        index), applies the metadata filters and keeps similarity order."""
+        if not matches:
+            return []
 
-    def _format_results(self, rows) -> List[Dict]:
+        scores = dict(matches)
+        query = f"SELECT * FROM fragments WHERE id IN ({','.join(['?'] * len(scores))})"
+        params: List[Any] = list(scores)
+
+        if topic:
+            query += " AND topic = ?"
+            params.append(topic)
+        if type_filter:
+            query += " AND type = ?"
+            params.append(type_filter)
+
+        with self.store.pool.reader() as conn:
+            results = self._format_results(conn, self._execute(conn, "l4_sql", query, params))
+        for r in results:
+            r["vector_score"] = scores[r["id"]]
+        return sorted(results, key=lambda r: r["vector_score"], reverse=True)
+
+    def get_fragments(self, fragment_ids: Sequence[str]) -> List[Dict]:
+        """Loads fragments by id, returned in the order given (missing ids are skipped)."""
+        if not fragment_ids:
+            return []
+        query = f"SELECT * FROM fragments WHERE id IN ({','.join(['?'] * len(fragment_ids))})"
+        with self.store.pool.reader() as conn:
+            rows = self._format_results(conn, self._execute(conn, "fetch_sql", query, list(fragment_ids)))
+        by_id = {r["id"]: r for r in rows}
+        return [by_id[i] for i in fragment_ids if i in by_id]
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Turns free text into an OR of quoted terms so FTS5 syntax can't leak in."""
+        terms = re.findall(r"\w+", text.lower())
+        return " OR ".join(f'"{t}"' for t in terms)
+
+    @staticmethod
+    def _execute(conn, stage_name: str, query: str, params: List[Any]) -> List[Any]:
+        """Runs a search query, timed as one recall stage (see metrics)."""
+        with stage(stage_name):
+            rows = conn.execute(query, params).fetchall()
+        record_query(stage_name, query, params)
+        return rows
+
+    def _format_results(self, conn, rows) -> List[Dict]:
         """Batch-load keywords to avoid N+1 queries."""
         if not rows:
             return []
 
-        results = [dict(row) for row in rows]
-        fragment_ids = [r["id"] for r in results]
-        placeholders = ','.join(['?'] * len(fragment_ids))
+        with stage("format"):
+            results = [dict(row) for row in rows]
+            fragment_ids = [r["id"] for r in results]
+            placeholders = ','.join(['?'] * len(fragment_ids))
 
-        cursor = self.store.conn.cursor()
-        kw_rows = cursor.execute(
-            f'SELECT fragment_id, keyword FROM keywords WHERE fragment_id IN ({placeholders})',
-            fragment_ids,
-        ).fetchall()
+            kw_rows = conn.execute(
+                f'SELECT fragment_id, keyword FROM keywords WHERE fragment_id IN ({placeholders})',
+                fragment_ids,
+            ).fetchall()
 
-        kw_map: Dict[str, List[str]] = {}
-        for kw_row in kw_rows:
-            kw_map.setdefault(kw_row["fragment_id"], []).append(kw_row["keyword"])
+            kw_map: Dict[str, List[str]] = {}
+            for kw_row in kw_rows:
+                kw_map.setdefault(kw_row["fragment_id"], []).append(kw_row["keyword"])
 
-        for r in results:
-            r["keywords"] = kw_map.get(r["id"], [])
+            for r in results:
+                r["keywords"] = kw_map.get(r["id"], [])
+                r["source"] = parse_source(r.get("source"))
 
         return results
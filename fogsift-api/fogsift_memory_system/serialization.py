@@ -0,0 +1,103 @@
+"""
+Fogsift Memory System - Response Serialization
+Recall results held as plain row dicts, encoded straight to JSON or validated into models on demand.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from pydantic_core import to_json
+
+from .models import FragmentResponse, GraphEdge, RecallResponse
+
+# Output order of a fragment object, as FragmentResponse declares it
+FRAGMENT_FIELDS = tuple(FragmentResponse.model_fields)
+_DATETIME_FIELDS = ("created_at", "last_referenced")
+
+
+def fragment_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    """The FragmentResponse fields of a stored row, ready for to_json.
+
+    Timestamps are parsed with datetime.fromisoformat, which agrees with
+    Pydantic for every format the store writes; anything else falls back to
+    full FragmentResponse validation, so the JSON is always what the model
+    would produce.
+    """
+    payload = {name: row.get(name) for name in FRAGMENT_FIELDS}
+    try:
+        for name in _DATETIME_FIELDS:
+            value = payload[name]
+            if value is not None and not isinstance(value, datetime):
+                payload[name] = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return FragmentResponse(**row).model_dump()
+    return payload
+
+
+class RecallResult:
+    """Everything a recall produced, before it becomes a RecallResponse.
+
+    ``to_json`` encodes the row dicts directly with pydantic-core's JSON
+    encoder (the one FastAPI uses for response models), skipping per-fragment
+    model validation; the bytes are identical to
+    ``to_response().model_dump_json()``. Cached results are shared between
+    requests and must not be mutated; ``with_query_time`` makes a copy.
+    """
+
+    __slots__ = ("fragments", "edges", "total_tokens", "search_path", "query_time_ms",
+                 "next_cursor", "fragment_ids", "_origin", "_response")
+
+    def __init__(
+        self,
+        fragments: List[Dict[str, Any]],
+        edges: List[GraphEdge],
+        total_tokens: int,
+        search_path: List[str],
+        query_time_ms: float,
+        next_cursor: Optional[str] = None,
+    ):
+        self.fragments = fragments
+        self.edges = edges
+        self.total_tokens = total_tokens
+        self.search_path = search_path
+        self.query_time_ms = query_time_ms
+        self.next_cursor = next_cursor
+        self.fragment_ids: FrozenSet[str] = frozenset(f["id"] for f in fragments)
+        self._origin: Optional["RecallResult"] = None  # Set on copies
+        self._response: Optional[RecallResponse] = None
+
+    def with_query_time(self, query_time_ms: float) -> "RecallResult":
+        copy = RecallResult.__new__(RecallResult)
+        for name in self.__slots__:
+            setattr(copy, name, getattr(self, name))
+        copy.query_time_ms = query_time_ms
+        copy._origin = self._origin or self
+        return copy
+
+    def to_response(self) -> RecallResponse:
+        """Validated model, built once per result and shared with its copies."""
+        origin = self._origin or self
+        if origin._response is None:
+            origin._response = RecallResponse(
+                success=True,
+                fragments=[FragmentResponse(**f) for f in origin.fragments],
+                edges=origin.edges,
+                total_tokens=origin.total_tokens,
+                search_path=origin.search_path,
+                query_time_ms=origin.query_time_ms,
+                next_cursor=origin.next_cursor,
+            )
+        if origin._response.query_time_ms != self.query_time_ms:
+            return origin._response.model_copy(update={"query_time_ms": self.query_time_ms})
+        return origin._response
+
+    def to_json(self) -> bytes:
+        return to_json({
+            "success": True,
+            "fragments": [fragment_payload(f) for f in self.fragments],
+            "edges": self.edges,
+            "total_tokens": self.total_tokens,
+            "search_path": self.search_path,
+            "query_time_ms": self.query_time_ms,
+            "next_cursor": self.next_cursor,
+        })
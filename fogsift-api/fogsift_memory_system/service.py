@@ -3,23 +3,71 @@ Fogsift Memory System - Business Logic Service
 Orchestrates storage, search, ranking, and handles Pydantic models.
 """
 
+import json
+import logging
+import sqlite3
 import uuid
 import time
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from .models import (
     FragmentCreate, FragmentResponse, LinkCreate, LinkResponse,
-    RecallRequest, RecallResponse, FragmentStats, TTLTier, FragmentType
+    RecallRequest, RecallResponse, FragmentStats, PoolStats, ImportResponse,
+    SessionEndResponse, TTLTier, FragmentType, GraphEdge, GraphResponse,
+    LinkRelationType,
 )
-from .store import MemoryStore
-from .search import MemorySearch
+from .backend import SearchBackend, StorageBackend
+from .store import normalize_keywords
+from .search import decode_cursor, encode_cursor
+from .cache import RecallCache
+from .references import ReferenceTracker
+from .embeddings import EmbeddingIndex
+from .keywords import KeywordExtractor
+from .ranking import RelevanceScorer, pack_budget
+from .tokens import ApproxTokenizer
+from .serialization import RecallResult
+from .metrics import Metrics, RecallTrace, SLOW_RECALLS, stage
+from .pool import PoolTimeout
+
+slow_query_logger = logging.getLogger("fogsift_memory.slow_query")
+
+_FRAGMENT_FIELDS = (
+    "id", "content", "topic", "type", "importance", "scope", "ttl_tier",
+    "created_at", "last_referenced", "reference_count", "source", "session_id",
+    "token_count",
+)
+_LINK_FIELDS = ("id", "from_id", "to_id", "relation_type", "created_at")
+_ACTIVE_TIERS = [TTLTier.HOT.value, TTLTier.WARM.value]
+
+L1_LIMIT = 50
+L2_LIMIT = 50
+L4_LIMIT = 50
+LINK_MAX_NODES = 200  # Upper bound on fragments discovered by one graph expansion
 
 
 class MemoryService:
-    def __init__(self, store: MemoryStore, search: MemorySearch):
+    def __init__(
+        self,
+        store: StorageBackend,
+        search: SearchBackend,
+        cache: Optional[RecallCache] = None,
+        references: Optional[ReferenceTracker] = None,
+        embeddings: Optional[EmbeddingIndex] = None,
+        scorer: Optional[RelevanceScorer] = None,
+        tokenizer=None,
+        metrics: Optional[Metrics] = None,
+        extractor: Optional[KeywordExtractor] = None,
+    ):
         self.store = store
         self.search = search
+        self.cache = cache  # None disables recall caching
+        self.references = references or ReferenceTracker(store)
+        self.embeddings = embeddings  # None disables L4 semantic recall
+        self.scorer = scorer or RelevanceScorer()
+        self.tokenizer = tokenizer or ApproxTokenizer()
+        self.metrics = metrics  # None disables recall timing histograms
+        self.extractor = extractor or KeywordExtractor(store)
 
     def _get_default_importance(self, type_val: FragmentType) -> float:
         """Applies importance rules from the Architecture Doc"""
@@ -33,91 +81,342 @@ class MemoryService:
         }
         return mapping.get(type_val, 0.5)
 
-    def _extract_keywords(self, content: str) -> List[str]:
-        """Basic keyword extraction (simulated for standalone use)"""
-        words = content.lower().replace('.', '').replace(',', '').split()
-        return list(set(w for w in words if len(w) > 3))[:5]
-
-    def remember(self, request: FragmentCreate) -> FragmentResponse:
-        frag_id = f"frag_{uuid.uuid4().hex[:12]}"
+    def _build_fragment(self, request: FragmentCreate) -> Dict[str, Any]:
         now = datetime.now(timezone.utc).isoformat()
-
-        keywords = request.keywords or self._extract_keywords(request.content)
-        importance = request.importance or self._get_default_importance(request.type)
-
-        frag_data = {
-            "id": frag_id,
+        return {
+            "id": f"frag_{uuid.uuid4().hex[:12]}",
             "content": request.content,
             "topic": request.topic,
             "type": request.type,
-            "importance": importance,
+            "importance": request.importance or self._get_default_importance(request.type),
             "scope": request.scope,
             "ttl_tier": TTLTier.HOT,
             "created_at": now,
             "last_referenced": now,
             "reference_count": 0,
-            "source": request.source
+            "source": request.source,
+            "session_id": request.session_id,
+            "token_count": self.tokenizer.count(request.content),
         }
 
-        self.store.create_fragment(frag_data, keywords)
+    def remember(self, request: FragmentCreate) -> FragmentResponse:
+        return self.remember_batch([request])[0]
+
+    def remember_batch(self, requests: List[FragmentCreate]) -> List[FragmentResponse]:
+        """Stores many fragments in one transaction; responses are built from the inserted data."""
+        fragments = [self._build_fragment(r) for r in requests]
+        # Fragments sent without keywords get the most distinctive terms of their content
+        extracted = iter(self.extractor.extract_batch([r.content for r in requests if not r.keywords]))
+        keywords = [r.keywords or next(extracted) for r in requests]
+
+        self.store.create_fragments(fragments, keywords)
+        if self.embeddings:
+            self.embeddings.add([(f["id"], f["content"]) for f in fragments])
+        if self.cache:
+            self.cache.invalidate_new_fragments(
+                (req.topic, req.type.value, frag_keywords) for req, frag_keywords in zip(requests, keywords)
+            )
 
-        stored_data = self.store.get_fragment(frag_id)
-        return FragmentResponse(**stored_data)
+        # Every column is written explicitly, so the inserted data is exactly
+        # what a read-back would return: an empty source is stored as NULL and
+        # keywords come back in index (alphabetical) order.
+        return [
+            FragmentResponse(**{
+                **frag_data,
+                "source": frag_data["source"] or None,
+                "keywords": sorted(normalize_keywords(frag_keywords)),
+            })
+            for frag_data, frag_keywords in zip(fragments, keywords)
+        ]
 
     def recall(self, request: RecallRequest) -> RecallResponse:
+        return self._recall_rendered(request, "response_build", RecallResult.to_response)
+
+    def recall_json(self, request: RecallRequest) -> bytes:
+        """recall() encoded as RecallResponse JSON without building the models."""
+        return self._recall_rendered(request, "serialization", RecallResult.to_json)
+
+    def recall_unreferenced(self, request: RecallRequest) -> RecallResult:
+        """recall()'s result (through the cache) without counting its fragments
+        as referenced: for callers that return only some of them and record
+        those through ``references`` themselves, as fan-out recall does."""
+        return self._recall_cached(request, record_references=False)[0]
+
+    def _recall_rendered(self, request: RecallRequest, stage_name: str, render: Callable[[RecallResult], Any]) -> Any:
+        if self.metrics is None:
+            return render(self._recall_cached(request)[0])
+
+        started = time.perf_counter()
+        with self.metrics.trace() as trace:
+            result, cache = self._recall_cached(request)
+            with stage(stage_name):
+                output = render(result)
+        elapsed = time.perf_counter() - started
+        self.metrics.record_recall(trace, elapsed, cache)
+        if self.metrics.is_slow(elapsed):
+            self._log_slow_recall(request, trace, elapsed)
+        return output
+
+    def _recall_cached(
+        self, request: RecallRequest, record_references: bool = True,
+    ) -> Tuple[RecallResult, str]:
+        """Recall through the cache; also reports "hit", "miss" or "off" for metrics.
+
+        The returned fragments are counted as referenced unless
+        record_references is False, for callers that only record what they
+        end up returning (fan-out recall keeps a subset of each shard's).
+        """
+        if not self.cache:
+            result, cache = self._recall(request), "off"
+        else:
+            start_time = time.time()
+            key = self.cache.key_for(request)
+            cached = self.cache.get(key)
+            if cached is not None:
+                result, cache = cached.with_query_time(round((time.time() - start_time) * 1000, 2)), "hit"
+            else:
+                generation = self.cache.generation()
+                result, cache = self._recall(request), "miss"
+                self.cache.put(key, request, result, generation)
+
+        # Update references (write-through or buffered, per tracker mode)
+        if record_references:
+            with stage("references"):
+                self.references.record([f["id"] for f in result.fragments])
+        return result, cache
+
+    def _recall(self, request: RecallRequest) -> RecallResult:
         start_time = time.time()
         search_path = []
         found_fragments = []
+        next_cursor = None
+        # A cursor continues the L1 ranking only; the other layers ran on the first page
+        after = decode_cursor(request.cursor) if request.cursor else None
 
-        # L1 Search (Keyword exact match)
+        # L1 Search (Keyword exact match, ranked by match count, one page at a time)
         if request.keywords:
-            l1_results = self.search.search_l1(request.keywords, request.topic, request.type)
+            l1_results = self.search.search_l1(
+                request.keywords, request.topic, request.type, limit=L1_LIMIT + 1, after=after,
+                match_all=request.match_all_keywords, prefix=request.prefix_keywords,
+                fuzzy=request.fuzzy_keywords,
+            )
+            if len(l1_results) > L1_LIMIT:
+                l1_results = l1_results[:L1_LIMIT]
+                next_cursor = encode_cursor(l1_results[-1])
             if l1_results:
                 search_path.append(f"L1:{len(l1_results)}")
                 found_fragments.extend(l1_results)
 
-        # L2 Search (Fallback/Expansion metadata search)
-        if not found_fragments and (request.topic or request.type):
-            l2_results = self.search.search_l2(request.topic, request.type)
+        # L3 Search (Full-text BM25 over content)
+        if request.text and after is None:
+            l3_results = self.search.search_l3(request.text, request.topic, request.type)
+            if l3_results:
+                search_path.append(f"L3:{len(l3_results)}")
+                found_fragments.extend(l3_results)
+
+        # L4 Search (Semantic similarity; threshold is the minimum cosine)
+        if request.text and self.embeddings and after is None:
+            # Over-fetch when filtering so topic/type don't starve the layer
+            k = L4_LIMIT * 4 if request.topic or request.type else L4_LIMIT
+            with stage("l4_vector"):
+                matches = self.embeddings.search(request.text, k=k, min_score=request.threshold)
+            l4_results = self.search.search_l4(matches, request.topic, request.type)[:L4_LIMIT]
+            if l4_results:
+                search_path.append(f"L4:{len(l4_results)}")
+                found_fragments.extend(l4_results)
+
+        # L2 Search (Fallback/Expansion metadata search), hot/warm tiers first
+        if not found_fragments and (request.topic or request.type) and after is None:
+            l2_results = self.search.search_l2(
+                request.topic, request.type, limit=L2_LIMIT, tiers=_ACTIVE_TIERS,
+                token_budget=request.token_budget,
+            )
+            l2_tokens = sum(self._token_cost(f) for f in l2_results)
+            if (len(l2_results) < L2_LIMIT and l2_tokens < request.token_budget
+                    and request.include_cold):
+                l2_results += self.search.search_l2(
+                    request.topic, request.type,
+                    limit=L2_LIMIT - len(l2_results), tiers=[TTLTier.COLD.value],
+                    token_budget=request.token_budget - l2_tokens,
+                )
             if l2_results:
                 search_path.append(f"L2:{len(l2_results)}")
                 found_fragments.extend(l2_results)
 
-        # Deduplicate and sort by importance
-        unique_frags = {f["id"]: f for f in found_fragments}.values()
-        sorted_frags = sorted(unique_frags, key=lambda x: x["importance"], reverse=True)
-
-        # Enforce naive token budget (approx 1 token = 4 chars)
-        final_results = []
-        current_tokens = 0
-        for frag in sorted_frags:
-            est_tokens = len(frag["content"]) // 4
-            if current_tokens + est_tokens <= request.token_budget:
-                final_results.append(frag)
-                current_tokens += est_tokens
-            else:
-                break
+        with stage("ranking"):
+            # Deduplicate, merging per-layer scores for fragments found by several layers
+            unique_frags: Dict[str, Dict[str, Any]] = {}
+            for frag in found_fragments:
+                unique_frags.setdefault(frag["id"], {}).update(frag)
+
+            # Rank on combined relevance, then pack the budget using stored token counts
+            ranked = [frag for _, frag in self.scorer.rank(list(unique_frags.values()), request)]
+            final_results, current_tokens = pack_budget(
+                ranked, request.token_budget, self._token_cost
+            )
 
-        # Update references
-        if final_results:
-            self.store.increment_reference([f["id"] for f in final_results])
+        # Link expansion: neighbours of the packed results, charged to what's left of the budget
+        edges: List[GraphEdge] = []
+        if request.include_links and final_results:
+            with stage("links"):
+                linked_ids, edges = self._traverse(
+                    [f["id"] for f in final_results], request.link_depth,
+                    request.link_types, request.link_fanout,
+                )
+            linked, link_tokens = pack_budget(
+                self.search.get_fragments(linked_ids),
+                request.token_budget - current_tokens, self._token_cost,
+            )
+            if linked:
+                search_path.append(f"LINK:{len(linked)}")
+                final_results.extend(linked)
+                current_tokens += link_tokens
+            included = {f["id"] for f in final_results}
+            edges = [e for e in edges if e.from_id in included and e.to_id in included]
 
         end_time = time.time()
 
-        return RecallResponse(
-            success=True,
-            fragments=[FragmentResponse(**f) for f in final_results],
+        return RecallResult(
+            fragments=final_results,
+            edges=edges,
             total_tokens=current_tokens,
             search_path=search_path,
-            query_time_ms=round((end_time - start_time) * 1000, 2)
+            query_time_ms=round((end_time - start_time) * 1000, 2),
+            next_cursor=next_cursor,
+        )
+
+    def _log_slow_recall(self, request: RecallRequest, trace: RecallTrace, seconds: float) -> None:
+        """Logs a slow recall with its stage breakdown, SQL and query plans."""
+        self.metrics.inc(SLOW_RECALLS)
+        lines = [
+            f"slow recall {seconds * 1000:.1f}ms (threshold {self.metrics.slow_query_ms:g}ms) "
+            f"request={request.model_dump_json(exclude_defaults=True)}",
+            "stages: " + ", ".join(
+                f"{name}={secs * 1000:.2f}ms" for name, secs in trace.stages.items()
+            ),
+        ]
+        for stage_name, sql, params in trace.queries:
+            lines.append(f"[{stage_name}] {' '.join(sql.split())} params={params!r}")
+            try:
+                lines.extend("    " + step for step in self.store.explain_query_plan(sql, params))
+            except (sqlite3.Error, PoolTimeout) as e:
+                lines.append(f"    (no plan: {e})")
+        slow_query_logger.warning("\n".join(lines))
+
+    def render_metrics(self) -> str:
+        """Prometheus text for recall histograms plus pool and cache counters."""
+        pool = self.store.pool_metrics()
+        roles = ("reader", "writer")
+        gauges = {
+            "fogsift_pool_checkouts_total": (
+                "Connection pool checkouts",
+                {(("role", r),): pool[r]["checkouts"] for r in roles},
+            ),
+            "fogsift_pool_timeouts_total": (
+                "Connection pool checkouts that timed out",
+                {(("role", r),): pool[r]["timeouts"] for r in roles},
+            ),
+            "fogsift_pool_readers_available": (
+                "Idle reader connections", {(): pool["readers_available"]},
+            ),
+        }
+        if self.cache:
+            cache = self.cache.stats()
+            gauges["fogsift_recall_cache_hits_total"] = ("Recall cache hits", {(): cache["hits"]})
+            gauges["fogsift_recall_cache_misses_total"] = ("Recall cache misses", {(): cache["misses"]})
+            gauges["fogsift_recall_cache_entries"] = ("Cached recall responses", {(): cache["size"]})
+        return (self.metrics or Metrics()).render(gauges)
+
+    def _traverse(
+        self,
+        seed_ids: List[str],
+        depth: int,
+        relation_types: Optional[List[LinkRelationType]] = None,
+        fanout: int = 10,
+    ) -> Tuple[List[str], List[GraphEdge]]:
+        """Breadth-first expansion over links, one capped query per hop.
+
+        Returns the newly discovered fragment ids in hop order and the edges
+        among seeds and discovered fragments. Discovery stops at LINK_MAX_NODES.
+        """
+        types = [t.value for t in relation_types] if relation_types else None
+        visited = set(seed_ids)
+        discovered: List[str] = []
+        edges: List[GraphEdge] = []
+        frontier = list(seed_ids)
+        for hop in range(1, depth + 1):
+            next_frontier = []
+            for edge in self.store.get_neighbors(frontier, types, fanout):
+                neighbor = edge["neighbor_id"]
+                if neighbor not in visited and len(discovered) < LINK_MAX_NODES:
+                    visited.add(neighbor)
+                    discovered.append(neighbor)
+                    next_frontier.append(neighbor)
+                if neighbor in visited:
+                    outgoing = edge["direction"] == "out"
+                    edges.append(GraphEdge(
+                        from_id=edge["source_id"] if outgoing else neighbor,
+                        to_id=neighbor if outgoing else edge["source_id"],
+                        relation_type=edge["relation_type"],
+                        depth=hop,
+                    ))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        # An edge between two frontier nodes is reported once per endpoint; keep one
+        unique = {(e.from_id, e.to_id, e.relation_type): e for e in reversed(edges)}
+        return discovered, sorted(unique.values(), key=lambda e: e.depth)
+
+    def graph(
+        self,
+        fragment_id: str,
+        depth: int = 1,
+        relation_types: Optional[List[LinkRelationType]] = None,
+        fanout: int = 10,
+    ) -> Optional[GraphResponse]:
+        """Neighbourhood of one fragment; None if it doesn't exist."""
+        root = self.store.get_fragment(fragment_id)
+        if root is None:
+            return None
+        linked_ids, edges = self._traverse([fragment_id], depth, relation_types, fanout)
+        neighbours = self.search.get_fragments(linked_ids)
+        present = {fragment_id, *(f["id"] for f in neighbours)}
+        return GraphResponse(
+            success=True,
+            root_id=fragment_id,
+            fragments=[FragmentResponse(**f) for f in [root, *neighbours]],
+            edges=[e for e in edges if e.from_id in present and e.to_id in present],
         )
 
+    def _token_cost(self, frag: Dict[str, Any]) -> int:
+        """Stored token count; rows not yet backfilled are counted on the fly."""
+        if frag.get("token_count") is None:
+            frag["token_count"] = self.tokenizer.count(frag["content"])
+        return frag["token_count"]
+
     def forget(self, fragment_id: str) -> bool:
-        return self.store.delete_fragment(fragment_id)
+        deleted = self.store.delete_fragment(fragment_id)
+        if deleted:
+            self.fragments_deleted([fragment_id])
+        return deleted
+
+    def fragments_deleted(self, fragment_ids: List[str]) -> None:
+        """Drops derived state for fragments deleted outside forget() (e.g. by the sweeper)."""
+        if self.embeddings:
+            self.embeddings.remove(fragment_ids)
+        if self.cache:
+            self.cache.invalidate_fragments(fragment_ids)
+
+    def end_session(self, session_id: str) -> SessionEndResponse:
+        """Ends a session; its fragments are deleted by the SessionSweeper."""
+        pending = self.store.end_session(session_id)
+        return SessionEndResponse(success=True, session_id=session_id, pending_fragments=pending)
 
     def link(self, request: LinkCreate) -> LinkResponse:
         link_id = f"link_{uuid.uuid4().hex[:8]}"
         self.store.create_link(link_id, request.from_id, request.to_id, request.relation_type)
+        if self.cache:
+            self.cache.invalidate_fragments([request.from_id, request.to_id])
         return LinkResponse(
             id=link_id,
             from_id=request.from_id,
@@ -126,5 +425,58 @@ class MemoryService:
             created_at=datetime.now(timezone.utc)
         )
 
-    def get_stats(self) -> FragmentStats:
-        return FragmentStats(**self.store.get_stats())
+    def export_ndjson(self, after_id: Optional[str] = None) -> Iterator[str]:
+        """Streams the memory base as NDJSON: every fragment (id order), then every link.
+
+        Fragment records carry their keywords inline. Passing the last exported
+        fragment id as after_id resumes the fragment section; the link section
+        is always emitted in full since imports skip links they already have.
+        """
+        for frag in self.store.iter_fragments(after_id):
+            yield json.dumps({"kind": "fragment", **frag}, separators=(",", ":")) + "\n"
+        for link in self.store.iter_links():
+            yield json.dumps({"kind": "link", **link}, separators=(",", ":")) + "\n"
+
+    def import_records(self, records: List[Dict[str, Any]]) -> ImportResponse:
+        """Imports one batch of export records. Existing ids are skipped, so replays are safe."""
+        fragments, keywords, links = [], [], []
+        for record in records:
+            kind = record.get("kind")
+            if kind == "fragment":
+                FragmentResponse.model_validate(record)
+                fragment = {field: record.get(field) for field in _FRAGMENT_FIELDS}
+                # Exports may predate token counting or come from another tokenizer
+                fragment["token_count"] = self.tokenizer.count(fragment["content"])
+                fragments.append(fragment)
+                keywords.append(record["keywords"])
+            elif kind == "link":
+                LinkResponse.model_validate(record)
+                links.append({field: record[field] for field in _LINK_FIELDS})
+            else:
+                raise ValueError(f"Unknown record kind: {kind!r}")
+
+        written = self.store.create_fragments(fragments, keywords, ignore_existing=True) if fragments else 0
+        linked = self.store.create_links(links) if links else 0
+        if self.embeddings and written:
+            # Skipped ids are already indexed with their stored content
+            self.embeddings.add([
+                (f["id"], f["content"]) for f in fragments if f["id"] not in self.embeddings
+            ])
+        if self.cache and (written or linked):
+            self.cache.clear()
+        return ImportResponse(
+            success=True,
+            fragments=written,
+            links=linked,
+            skipped=len(fragments) + len(links) - written - linked,
+            last_fragment_id=fragments[-1]["id"] if fragments else None,
+        )
+
+    def get_stats(self, detailed: bool = False) -> FragmentStats:
+        stats = self.store.get_stats(detailed)
+        if self.cache:
+            stats["recall_cache"] = self.cache.stats()
+        return FragmentStats(**stats)
+
+    def get_pool_stats(self) -> PoolStats:
+        return PoolStats(**self.store.pool_metrics())
@@ -0,0 +1,69 @@
+"""
+Fogsift Memory System - Session Garbage Collection
+Incrementally deletes fragments that belong to ended, idle or abandoned sessions.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from .background import PeriodicWorker
+from .backend import StorageBackend
+
+
+class SessionSweeper:
+    """Deletes expired session fragments in bounded batches.
+
+    Fragments of sessions ended through the API go first. Sessions that are
+    never ended expire once idle_ttl_hours pass without any of their
+    fragments being written or recalled. Session-scoped fragments stored
+    without a session_id can't be ended explicitly, so they expire
+    orphan_ttl_hours after creation. Every batch is its own short write
+    transaction; ``max_batches`` caps the work done per run so a large backlog
+    is spread across runs instead of monopolizing the writer.
+    """
+
+    def __init__(
+        self,
+        store: StorageBackend,
+        interval_seconds: float = 60,
+        batch_size: int = 500,
+        max_batches: int = 20,
+        idle_ttl_hours: float = 24,
+        orphan_ttl_hours: float = 24,
+        on_delete: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.idle_ttl_hours = idle_ttl_hours
+        self.orphan_ttl_hours = orphan_ttl_hours
+        self.on_delete = on_delete
+        self._worker = PeriodicWorker("fogsift-session-sweeper", interval_seconds, self.run_once)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.now(timezone.utc)
+        idle_cutoff = now - timedelta(hours=self.idle_ttl_hours)
+        orphan_cutoff = now - timedelta(hours=self.orphan_ttl_hours)
+        ended = self._sweep(lambda: self.store.sweep_ended_sessions(self.batch_size))
+        idle = self._sweep(lambda: self.store.sweep_idle_sessions(idle_cutoff, self.batch_size))
+        orphaned = self._sweep(
+            lambda: self.store.sweep_orphan_session_fragments(orphan_cutoff, self.batch_size)
+        )
+        return {"ended_sessions": ended, "idle_sessions": idle, "orphaned": orphaned}
+
+    def _sweep(self, delete_batch: Callable[[], List[str]]) -> int:
+        deleted = 0
+        for _ in range(self.max_batches):
+            ids = delete_batch()
+            if ids and self.on_delete:
+                self.on_delete(ids)
+            deleted += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        return deleted
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def close(self) -> None:
+        self._worker.close()
@@ -0,0 +1,534 @@
+"""
+Fogsift Memory System - Sharding
+Routes fragments to per-tenant (or per-topic-hash) database files and fans recall out across them.
+"""
+
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple, Union
+
+from .models import (
+    FragmentCreate, FragmentResponse, LinkCreate, LinkResponse,
+    RecallRequest, RecallResponse, FragmentStats, PoolStats, ImportResponse,
+    SessionEndResponse, GraphResponse, LinkRelationType, ShardStats, ShardStatsResponse,
+)
+from .pool import ConnectionPool
+from .store import MemoryStore
+from .search import MemorySearch, decode_cursor
+from .service import MemoryService
+from .ranking import RelevanceScorer, pack_budget
+from .serialization import RecallResult
+from .metrics import Metrics, stage
+
+DEFAULT_SHARD = "default"  # Tenant-mode home of fragments written without a tenant; no tenant may use it
+SHARD_MODES = ("tenant", "topic")
+_SHARD_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Builds the service stack over one database file with a pool of the given
+# number of readers; returns it with the callables that shut it down
+# (background jobs first, the pool last)
+ShardFactory = Callable[[str, int], Tuple[MemoryService, List[Callable[[], None]]]]
+
+
+class UnknownTenant(LookupError):
+    """Raised for a tenant without a shard where none may be created (reads,
+    or a tenant missing from the router's allow-list)."""
+
+
+class ShardLimitReached(Exception):
+    """Raised when a new tenant would open more shards than the router allows."""
+
+
+def _open_shard(path: str, pool_size: int) -> Tuple[MemoryService, List[Callable[[], None]]]:
+    pool = ConnectionPool(path, size=pool_size)
+    store = MemoryStore(pool)
+    return MemoryService(store, MemorySearch(store)), [pool.close]
+
+
+class Shard:
+    """One database file with its own connection pool and MemoryService."""
+
+    def __init__(self, name: str, path: str, service: MemoryService, closers: List[Callable[[], None]]):
+        self.name = name
+        self.path = path
+        self.service = service
+        self._closers = closers
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+
+    def close(self) -> None:
+        for close in self._closers:
+            close()
+
+
+class ShardRouter:
+    """Maps tenants, or topic hashes, to their own SQLite files.
+
+    Each shard has its own pool and therefore its own writer lock, so writes
+    to different shards no longer serialize behind one another.
+
+    ``mode="tenant"``: every tenant gets ``<directory>/<tenant>.db``, created
+    by its first write; fragments written without a tenant land in the
+    "default" shard. Shard files already in the directory are opened at
+    start-up so fan-out recall sees them. ``tenants`` restricts which
+    tenants may have a shard at all, and ``max_shards`` caps how many
+    shards new tenants may bring the router to.
+
+    ``mode="topic"``: fragments are spread over ``topic_shards`` files by the
+    CRC32 of their topic, so a topic lives in exactly one shard and topic
+    recalls touch one file. Changing ``topic_shards`` moves topics between
+    files; re-import an export after doing so.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        mode: str = "tenant",
+        topic_shards: int = 8,
+        pool_size: int = 2,
+        factory: Optional[ShardFactory] = None,
+        tenants: Optional[Collection[str]] = None,
+        max_shards: Optional[int] = None,
+    ):
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode {mode!r}; expected one of {SHARD_MODES}")
+        if topic_shards < 1:
+            raise ValueError("topic_shards must be at least 1")
+        if max_shards is not None and max_shards < 1:
+            raise ValueError("max_shards must be at least 1")
+        self.directory = directory
+        self.mode = mode
+        self.topic_shards = topic_shards
+        self.pool_size = pool_size  # Readers per shard
+        self.tenants = frozenset(tenants) if tenants is not None else None  # None allows any tenant
+        self.max_shards = max_shards  # None for no limit
+        self._factory = factory or _open_shard
+        self._shards: Dict[str, Shard] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        if mode == "topic":
+            names = [self._topic_shard_name(i) for i in range(topic_shards)]
+        else:
+            names = sorted(
+                f[:-3] for f in os.listdir(directory)
+                if f.endswith(".db") and _SHARD_NAME.match(f[:-3])
+            )
+        for name in names:
+            self.shard(name)
+
+    @staticmethod
+    def _topic_shard_name(index: int) -> str:
+        return f"topic-{index:03d}"
+
+    def shard(self, name: str) -> Shard:
+        """The named shard, opening (and creating) its database on first use."""
+        shard = self._shards.get(name)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(name) or self._open(name)
+        return shard
+
+    def _open(self, name: str) -> Shard:
+        # Called with self._lock held
+        path = os.path.join(self.directory, f"{name}.db")
+        service, closers = self._factory(path, self.pool_size)
+        shard = self._shards[name] = Shard(name, path, service, closers)
+        return shard
+
+    def for_tenant(self, tenant: str, create: bool = True) -> Shard:
+        """The tenant's shard.
+
+        Only writes should pass create=True: a tenant without a shard raises
+        UnknownTenant otherwise, so reads under arbitrary tenant ids never
+        create files. Raises ValueError for a malformed id or the reserved
+        "default", UnknownTenant for one outside the allow-list and
+        ShardLimitReached when creating the shard would exceed max_shards.
+        """
+        if not _SHARD_NAME.match(tenant):
+            raise ValueError("Tenant ids are 1-64 letters, digits, '-' or '_'")
+        if tenant == DEFAULT_SHARD:
+            raise ValueError(f"Tenant id {DEFAULT_SHARD!r} is reserved for fragments written without a tenant")
+        if self.tenants is not None and tenant not in self.tenants:
+            raise UnknownTenant(f"Unknown tenant: {tenant}")
+        shard = self._shards.get(tenant)
+        if shard is None:
+            if not create:
+                raise UnknownTenant(f"Unknown tenant: {tenant}")
+            with self._lock:
+                shard = self._shards.get(tenant)
+                if shard is None:
+                    if self.max_shards is not None and len(self._shards) >= self.max_shards:
+                        raise ShardLimitReached(f"Shard limit of {self.max_shards} reached")
+                    shard = self._open(tenant)
+        return shard
+
+    def for_topic(self, topic: str) -> Shard:
+        index = zlib.crc32(topic.encode("utf-8")) % self.topic_shards
+        return self.shard(self._topic_shard_name(index))
+
+    def for_fragment(self, topic: str) -> Shard:
+        """Where a fragment written without a tenant goes."""
+        return self.for_topic(topic) if self.mode == "topic" else self.shard(DEFAULT_SHARD)
+
+    def shards(self) -> List[Shard]:
+        """Open shards in name order (the order exports and fan-outs use)."""
+        return [self._shards[name] for name in sorted(self._shards)]
+
+    def close(self) -> None:
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards.clear()
+
+
+def _l1_key(match_count: int, importance: float, fragment_id: str) -> Tuple[int, float, str]:
+    """Sort key of the L1 row order (match_count desc, importance desc, id asc)."""
+    return -match_count, -importance, fragment_id
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _merge_stats(stats: List[FragmentStats], detailed: bool) -> Dict[str, Any]:
+    def add(field: str) -> Dict[str, int]:
+        total: Dict[str, int] = {}
+        for s in stats:
+            for key, count in (getattr(s, field) or {}).items():
+                total[key] = total.get(key, 0) + count
+        return total
+
+    created = [_aware(t) for s in stats for t in (s.oldest_fragment, s.newest_fragment) if t]
+    merged: Dict[str, Any] = {
+        "total_fragments": sum(s.total_fragments for s in stats),
+        "by_type": add("by_type"),
+        "by_tier": add("by_tier"),
+        "by_topic": add("by_topic"),
+        "oldest_fragment": min(created, default=None),
+        "newest_fragment": max(created, default=None),
+    }
+    if detailed:
+        merged["by_reference_count"] = add("by_reference_count")
+    caches = [s.recall_cache for s in stats if s.recall_cache]
+    if caches:
+        cache = {
+            field: sum(getattr(c, field) for c in caches)
+            for field in ("size", "hits", "misses", "evictions", "invalidations")
+        }
+        lookups = cache["hits"] + cache["misses"]
+        cache["hit_rate"] = round(cache["hits"] / lookups, 4) if lookups else 0.0
+        merged["recall_cache"] = cache
+    return merged
+
+
+def _merge_pools(pools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def role(name: str) -> Dict[str, float]:
+        snaps = [p[name] for p in pools]
+        checkouts = sum(s["checkouts"] for s in snaps)
+
+        def avg(field: str) -> float:
+            weighted = sum(s[field] * s["checkouts"] for s in snaps)
+            return round(weighted / checkouts, 3) if checkouts else 0.0
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": sum(s["timeouts"] for s in snaps),
+            "wait_ms_avg": avg("wait_ms_avg"),
+            "wait_ms_max": max((s["wait_ms_max"] for s in snaps), default=0.0),
+            "hold_ms_avg": avg("hold_ms_avg"),
+            "hold_ms_max": max((s["hold_ms_max"] for s in snaps), default=0.0),
+        }
+
+    return {
+        "size": sum(p["size"] for p in pools),
+        "readers_available": sum(p["readers_available"] for p in pools),
+        "reader": role("reader"),
+        "writer": role("writer"),
+    }
+
+
+class ShardedMemoryService:
+    """The MemoryService API over a ShardRouter.
+
+    Writes go to the shard the router picks for their topic. Recalls that
+    can be answered by one shard (a topic recall in topic mode) are passed
+    straight through; all others fan out to every shard in parallel and the
+    results are merged as one recall would rank them. Operations on a
+    fragment id probe the shards for it. ``for_tenant`` returns the plain
+    MemoryService of a tenant's shard (tenant mode only).
+    """
+
+    def __init__(
+        self,
+        router: ShardRouter,
+        scorer: Optional[RelevanceScorer] = None,
+        metrics: Optional[Metrics] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.router = router
+        self.scorer = scorer or RelevanceScorer()
+        self.metrics = metrics  # None disables fan-out recall timing
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fogsift-shard")
+
+    def for_tenant(self, tenant: str, create: bool = True) -> Union[MemoryService, "ShardedMemoryService"]:
+        """See ShardRouter.for_tenant; reads should pass create=False."""
+        if self.router.mode != "tenant":
+            return self  # Topic shards hold every tenant's fragments
+        return self.router.for_tenant(tenant, create).service
+
+    def _locate(self, fragment_id: str) -> Optional[Shard]:
+        for shard in self.router.shards():
+            if shard.service.store.fragment_exists(fragment_id):
+                return shard
+        return None
+
+    def remember(self, request: FragmentCreate) -> FragmentResponse:
+        return self.router.for_fragment(request.topic).service.remember(request)
+
+    def remember_batch(self, requests: List[FragmentCreate]) -> List[FragmentResponse]:
+        """One transaction per shard touched; the batch is not atomic across shards."""
+        groups: Dict[str, List[int]] = {}
+        for i, request in enumerate(requests):
+            groups.setdefault(self.router.for_fragment(request.topic).name, []).append(i)
+        responses: List[Optional[FragmentResponse]] = [None] * len(requests)
+        for name, indexes in groups.items():
+            written = self.router.shard(name).service.remember_batch([requests[i] for i in indexes])
+            for i, response in zip(indexes, written):
+                responses[i] = response
+        return responses
+
+    def _recall_shards(self, request: RecallRequest) -> List[Shard]:
+        if self.router.mode == "topic" and request.topic:
+            return [self.router.for_topic(request.topic)]
+        return self.router.shards()
+
+    def recall(self, request: RecallRequest) -> RecallResponse:
+        shards = self._recall_shards(request)
+        if len(shards) == 1:
+            return shards[0].service.recall(request)
+        return self._fan_out_rendered(request, shards, "response_build", RecallResult.to_response)
+
+    def recall_json(self, request: RecallRequest) -> bytes:
+        shards = self._recall_shards(request)
+        if len(shards) == 1:
+            return shards[0].service.recall_json(request)
+        return self._fan_out_rendered(request, shards, "serialization", RecallResult.to_json)
+
+    def _fan_out_rendered(
+        self, request: RecallRequest, shards: List[Shard], stage_name: str,
+        render: Callable[[RecallResult], Any],
+    ) -> Any:
+        if self.metrics is None:
+            return render(self._fan_out(request, shards))
+
+        started = time.perf_counter()
+        with self.metrics.trace() as trace:
+            result = self._fan_out(request, shards)
+            with stage(stage_name):
+                output = render(result)
+        self.metrics.record_recall(trace, time.perf_counter() - started, "fanout")
+        return output
+
+    def _fan_out(self, request: RecallRequest, shards: List[Shard]) -> RecallResult:
+        """Recalls every shard in parallel and merges the results.
+
+        Each shard ranks and packs its own candidates (through its cache);
+        the union is ranked and packed again so the response fits the budget.
+        The L1 page ends at the earliest of the shards' cursors: rows ordered
+        after it are dropped here and come back on the next page. Only the
+        fragments in the merged response count as referenced, each on the
+        shard that holds it.
+        """
+        start_time = time.time()
+        with stage("fan_out"):
+            results = list(self._executor.map(
+                lambda shard: shard.service.recall_unreferenced(request), shards,
+            ))
+
+        with stage("merge"):
+            cursors = [r.next_cursor for r in results if r.next_cursor]
+            next_cursor = min(cursors, key=lambda c: _l1_key(*decode_cursor(c)), default=None)
+            boundary = _l1_key(*decode_cursor(next_cursor)) if next_cursor else None
+
+            layers: Dict[str, int] = {}
+            candidates: Dict[str, Dict[str, Any]] = {}
+            owners: Dict[str, Shard] = {}
+            for shard, result in zip(shards, results):
+                for entry in result.search_path:
+                    layer, count = entry.split(":")
+                    layers[layer] = layers.get(layer, 0) + int(count)
+                for frag in result.fragments:
+                    if (boundary is not None and frag.get("match_count") is not None
+                            and _l1_key(frag["match_count"], frag["importance"], frag["id"]) > boundary):
+                        continue
+                    candidates[frag["id"]] = frag
+                    owners[frag["id"]] = shard
+
+            ranked = [frag for _, frag in self.scorer.rank(list(candidates.values()), request)]
+            fragments, total_tokens = pack_budget(
+                ranked, request.token_budget, lambda frag: frag["token_count"],
+            )
+            included = {f["id"] for f in fragments}
+            edges = [
+                e for r in results for e in r.edges
+                if e.from_id in included and e.to_id in included
+            ]
+
+        with stage("references"):
+            by_shard: Dict[str, List[str]] = {}
+            for frag in fragments:
+                by_shard.setdefault(owners[frag["id"]].name, []).append(frag["id"])
+            for shard in shards:
+                if shard.name in by_shard:
+                    shard.service.references.record(by_shard[shard.name])
+
+        return RecallResult(
+            fragments=fragments,
+            edges=edges,
+            total_tokens=total_tokens,
+            search_path=[f"{layer}:{count}" for layer, count in layers.items()],
+            query_time_ms=round((time.time() - start_time) * 1000, 2),
+            next_cursor=next_cursor,
+        )
+
+    def forget(self, fragment_id: str) -> bool:
+        return any(shard.service.forget(fragment_id) for shard in self.router.shards())
+
+    def end_session(self, session_id: str) -> SessionEndResponse:
+        pending = sum(
+            shard.service.end_session(session_id).pending_fragments for shard in self.router.shards()
+        )
+        return SessionEndResponse(success=True, session_id=session_id, pending_fragments=pending)
+
+    def link(self, request: LinkCreate) -> LinkResponse:
+        """Links live in the source fragment's shard; cross-shard links are rejected."""
+        shard = self._locate(request.from_id)
+        if shard is None:
+            raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+        return shard.service.link(request)
+
+    def graph(
+        self,
+        fragment_id: str,
+        depth: int = 1,
+        relation_types: Optional[List[LinkRelationType]] = None,
+        fanout: int = 10,
+    ) -> Optional[GraphResponse]:
+        shard = self._locate(fragment_id)
+        if shard is None:
+            return None
+        return shard.service.graph(fragment_id, depth, relation_types, fanout)
+
+    def export_ndjson(self, after_id: Optional[str] = None) -> Iterator[str]:
+        """Every shard's export, one after the other in shard-name order.
+
+        ``after_id`` resumes inside the shard holding that fragment; later
+        shards are exported in full. Raises ValueError if no shard has it.
+        """
+        shards = self.router.shards()
+        if after_id is not None:
+            shard = self._locate(after_id)
+            if shard is None:
+                raise ValueError(f"Unknown fragment id to resume after: {after_id}")
+            shards = shards[shards.index(shard):]
+        return itertools.chain.from_iterable(
+            shard.service.export_ndjson(after_id if i == 0 else None)
+            for i, shard in enumerate(shards)
+        )
+
+    def import_records(self, records: List[Dict[str, Any]]) -> ImportResponse:
+        """Imports fragments into their topic's shard, then links into their source's shard."""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        links: Dict[str, List[Dict[str, Any]]] = {}
+        last_fragment_id = None
+        for record in records:
+            if record.get("kind") == "link":
+                continue
+            shard = self.router.for_fragment(str(record.get("topic", "")))
+            groups.setdefault(shard.name, []).append(record)
+            last_fragment_id = record.get("id", last_fragment_id)
+        results = [self.router.shard(name).service.import_records(group) for name, group in groups.items()]
+
+        # Sources may have been imported by an earlier batch; links to unknown
+        # fragments still go through a shard so they are validated and skipped
+        for record in records:
+            if record.get("kind") == "link":
+                shard = self._locate(str(record.get("from_id"))) or self.router.for_fragment("")
+                links.setdefault(shard.name, []).append(record)
+        results += [self.router.shard(name).service.import_records(group) for name, group in links.items()]
+
+        return ImportResponse(
+            success=True,
+            fragments=sum(r.fragments for r in results),
+            links=sum(r.links for r in results),
+            skipped=sum(r.skipped for r in results),
+            last_fragment_id=last_fragment_id,
+        )
+
+    def get_stats(self, detailed: bool = False) -> FragmentStats:
+        stats = [shard.service.get_stats(detailed) for shard in self.router.shards()]
+        return FragmentStats(**_merge_stats(stats, detailed))
+
+    def get_pool_stats(self) -> PoolStats:
+        """All shards' pools summed; timing averages are weighted by checkouts."""
+        return PoolStats(**_merge_pools([s.service.store.pool_metrics() for s in self.router.shards()]))
+
+    def shard_stats(self) -> ShardStatsResponse:
+        return ShardStatsResponse(
+            success=True,
+            mode=self.router.mode,
+            shards=[
+                ShardStats(
+                    name=shard.name,
+                    path=shard.path,
+                    total_fragments=shard.service.store.get_stats()["total_fragments"],
+                    size_bytes=shard.size_bytes(),
+                    pool=shard.service.get_pool_stats(),
+                )
+                for shard in self.router.shards()
+            ],
+        )
+
+    def render_metrics(self) -> str:
+        """Prometheus text for recall histograms plus per-shard pool and cache counters."""
+        roles = ("reader", "writer")
+        checkouts: Dict[Any, float] = {}
+        timeouts: Dict[Any, float] = {}
+        readers: Dict[Any, float] = {}
+        cache_hits: Dict[Any, float] = {}
+        cache_misses: Dict[Any, float] = {}
+        cache_entries: Dict[Any, float] = {}
+        for shard in self.router.shards():
+            pool = shard.service.store.pool_metrics()
+            for r in roles:
+                checkouts[(("role", r), ("shard", shard.name))] = pool[r]["checkouts"]
+                timeouts[(("role", r), ("shard", shard.name))] = pool[r]["timeouts"]
+            readers[(("shard", shard.name),)] = pool["readers_available"]
+            if shard.service.cache:
+                cache = shard.service.cache.stats()
+                cache_hits[(("shard", shard.name),)] = cache["hits"]
+                cache_misses[(("shard", shard.name),)] = cache["misses"]
+                cache_entries[(("shard", shard.name),)] = cache["size"]
+        gauges = {
+            "fogsift_pool_checkouts_total": ("Connection pool checkouts", checkouts),
+            "fogsift_pool_timeouts_total": ("Connection pool checkouts that timed out", timeouts),
+            "fogsift_pool_readers_available": ("Idle reader connections", readers),
+        }
+        if cache_hits:
+            gauges["fogsift_recall_cache_hits_total"] = ("Recall cache hits", cache_hits)
+            gauges["fogsift_recall_cache_misses_total"] = ("Recall cache misses", cache_misses)
+            gauges["fogsift_recall_cache_entries"] = ("Cached recall responses", cache_entries)
+        return (self.metrics or Metrics()).render(gauges)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.router.close()
@@ -5,111 +5,663 @@ Handles direct SQLite CRUD operations.
 
 import sqlite3
 import json
-from typing import List, Dict, Any, Optional
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+from .pool import ConnectionPool
+from .graph import LinkGraph
+from .keyword_index import KeywordIndex
+from .keywords import KEYWORD_MAX_LENGTH, document_terms, keyword_terms, normalize_keyword
+from .schema import rebuild_stats, rebuild_term_stats
+from .vocabulary import KeywordVocabulary
+
+
+def normalize_keywords(keywords: List[str]) -> List[str]:
+    """Lowercases, truncates and de-duplicates keywords exactly as they are stored.
+
+    L1 matches on each keyword's term (keywords.keyword_terms) instead.
+    """
+    seen: Dict[str, None] = {}
+    for kw in keywords:
+        seen.setdefault(kw.lower()[:KEYWORD_MAX_LENGTH], None)  # enforce keyword length
+    return list(seen)
+
+
+def parse_source(value: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decodes the stored source JSON, tolerating corrupt values."""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def _fragment_row(frag_data: Dict[str, Any]) -> tuple:
+    source_json = json.dumps(frag_data.get("source")) if frag_data.get("source") else None
+    return (
+        frag_data["id"], frag_data["content"], frag_data["topic"],
+        frag_data["type"], frag_data["importance"], frag_data["scope"],
+        frag_data["ttl_tier"], frag_data["created_at"],
+        frag_data["last_referenced"], frag_data["reference_count"],
+        source_json, frag_data.get("session_id"), frag_data.get("token_count"),
+    )
 
 
 class MemoryStore:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def __init__(self, db: Union[ConnectionPool, sqlite3.Connection]):
+        if isinstance(db, sqlite3.Connection):
+            db = ConnectionPool.from_connection(db)
+        self.pool = db
+        self.graph: Optional[LinkGraph] = None  # See enable_link_graph()
+        self.keyword_index: Optional[KeywordIndex] = None  # See enable_keyword_index()
+        self.vocabulary: Optional[KeywordVocabulary] = None  # See keyword_vocabulary()
+        self._vocabulary_lock = threading.Lock()
+
+    def enable_link_graph(self) -> LinkGraph:
+        """Loads the links table into an in-memory LinkGraph and keeps it in sync.
+
+        From then on get_neighbors is answered from memory, and every write
+        path that adds links or deletes fragments updates the graph after
+        its transaction commits.
+        """
+        self.graph = LinkGraph.from_links(self.iter_link_edges())
+        return self.graph
+
+    def enable_keyword_index(self, background: bool = False) -> KeywordIndex:
+        """Loads the keywords table into an in-memory KeywordIndex and keeps it in sync.
+
+        The index is attached before it loads, so writes during the load
+        reach it; with background the load runs on a daemon thread and L1
+        is answered from SQL until it finishes (see KeywordIndex.ready).
+        """
+        self.keyword_index = KeywordIndex()
+        if background:
+            threading.Thread(
+                target=self._load_keyword_index, name="fogsift-keyword-index", daemon=True,
+            ).start()
+        else:
+            self._load_keyword_index()
+        return self.keyword_index
+
+    def _load_keyword_index(self) -> None:
+        self.keyword_index.load(self.iter_keyword_postings())
+
+    def keyword_vocabulary(self) -> KeywordVocabulary:
+        """The distinct keyword terms, for prefix and fuzzy L1 matching.
+
+        Loaded on first use and kept in sync by writes from then on; like
+        the keyword index it is attached before it loads, so keywords
+        written during the load reach it.
+        """
+        with self._vocabulary_lock:
+            if self.vocabulary is None:
+                self.vocabulary = KeywordVocabulary()
+                with self.pool.reader() as conn:
+                    rows = conn.execute('SELECT DISTINCT term FROM keywords').fetchall()
+                self.vocabulary.add(row[0] for row in rows)
+            return self.vocabulary
+
+    def _fragments_created(self, fragments: List[Dict[str, Any]], keywords: List[List[str]]) -> None:
+        if self.vocabulary is not None:
+            self.vocabulary.add(term for frag_keywords in keywords for term in keyword_terms(frag_keywords))
+        if self.keyword_index is not None:
+            for frag_data, frag_keywords in zip(fragments, keywords):
+                self.keyword_index.add(
+                    frag_data["id"], frag_data["importance"], frag_data["topic"],
+                    getattr(frag_data["type"], "value", frag_data["type"]),
+                    keyword_terms(frag_keywords),
+                )
+
+    def _fragments_deleted(self, fragment_ids: List[str]) -> None:
+        if self.graph is not None and fragment_ids:
+            self.graph.remove_fragments(fragment_ids)
+        if self.keyword_index is not None and fragment_ids:
+            self.keyword_index.remove_fragments(fragment_ids)
 
     def create_fragment(self, frag_data: Dict[str, Any], keywords: List[str]) -> str:
-        source_json = json.dumps(frag_data.get("source")) if frag_data.get("source") else None
+        self.create_fragments([frag_data], [keywords])
+        return frag_data["id"]
 
-        with self.conn:  # Automatic rollback on any exception
-            self.conn.execute('''
+    def create_fragments(
+        self,
+        fragments: List[Dict[str, Any]],
+        keywords: List[List[str]],
+        ignore_existing: bool = False,
+    ) -> int:
+        """Inserts many fragments and their keywords in a single transaction.
+
+        Returns the number of fragment rows written. With ignore_existing,
+        fragments whose id is already present (or repeats an earlier one in
+        the batch) are skipped along with their keywords (idempotent import).
+        """
+        with self.pool.writer() as conn:  # Automatic rollback on any exception
+            if ignore_existing:
+                # Decided under the writer lock, so nothing can insert these ids meanwhile
+                seen = {row[0] for row in conn.execute(
+                    'SELECT id FROM fragments WHERE id IN (SELECT value FROM json_each(?))',
+                    (json.dumps([f["id"] for f in fragments]),),
+                )}
+                new = []
+                for frag_data, frag_keywords in zip(fragments, keywords):
+                    if frag_data["id"] not in seen:
+                        seen.add(frag_data["id"])
+                        new.append((frag_data, frag_keywords))
+                fragments, keywords = [f for f, _ in new], [k for _, k in new]
+
+            keyword_rows = [
+                (frag_data["id"], kw, normalize_keyword(kw))
+                for frag_data, frag_keywords in zip(fragments, keywords)
+                for kw in normalize_keywords(frag_keywords)
+            ]
+            conn.executemany('''
                 INSERT INTO fragments
                 (id, content, topic, type, importance, scope, ttl_tier,
-                 created_at, last_referenced, reference_count, source)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                frag_data["id"], frag_data["content"], frag_data["topic"],
-                frag_data["type"], frag_data["importance"], frag_data["scope"],
-                frag_data["ttl_tier"], frag_data["created_at"],
-                frag_data["last_referenced"], frag_data["reference_count"],
-                source_json,
-            ))
+                 created_at, last_referenced, reference_count, source, session_id,
+                 token_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [_fragment_row(f) for f in fragments])
 
             # INSERT OR IGNORE because schema now has UNIQUE(fragment_id, keyword)
-            for kw in keywords:
-                self.conn.execute(
-                    'INSERT OR IGNORE INTO keywords (fragment_id, keyword) VALUES (?, ?)',
-                    (frag_data["id"], kw.lower()[:100]),  # enforce keyword length
-                )
+            conn.executemany(
+                'INSERT OR IGNORE INTO keywords (fragment_id, keyword, term) VALUES (?, ?, ?)',
+                keyword_rows,
+            )
+            # Document frequencies for keyword extraction (counted by triggers)
+            conn.executemany(
+                'INSERT OR IGNORE INTO fragment_terms (fragment_id, terms) VALUES (?, ?)',
+                [(f["id"], json.dumps(document_terms(f["content"]))) for f in fragments],
+            )
 
-        return frag_data["id"]
+        self._fragments_created(fragments, keywords)
+        return len(fragments)
 
     def get_fragment(self, fragment_id: str) -> Optional[Dict[str, Any]]:
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM fragments WHERE id = ?', (fragment_id,))
-        row = cursor.fetchone()
-        if not row:
-            return None
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT * FROM fragments WHERE id = ?', (fragment_id,)).fetchone()
+            if not row:
+                return None
+            kw_rows = conn.execute(
+                'SELECT keyword FROM keywords WHERE fragment_id = ?', (fragment_id,)
+            ).fetchall()
 
         frag_dict = dict(row)
-        if frag_dict.get("source"):
-            try:
-                frag_dict["source"] = json.loads(frag_dict["source"])
-            except (json.JSONDecodeError, TypeError):
-                frag_dict["source"] = None
-
-        cursor.execute(
-            'SELECT keyword FROM keywords WHERE fragment_id = ?', (fragment_id,)
-        )
-        frag_dict["keywords"] = [k["keyword"] for k in cursor.fetchall()]
+        frag_dict["source"] = parse_source(frag_dict.get("source"))
+
+        frag_dict["keywords"] = [k["keyword"] for k in kw_rows]
         return frag_dict
 
     def delete_fragment(self, fragment_id: str) -> bool:
-        with self.conn:
-            cursor = self.conn.execute(
+        with self.pool.writer() as conn:
+            cursor = conn.execute(
                 'DELETE FROM fragments WHERE id = ?', (fragment_id,)
             )
+        if cursor.rowcount > 0:
+            self._fragments_deleted([fragment_id])
         return cursor.rowcount > 0
 
     def increment_reference(self, fragment_ids: List[str]) -> None:
         if not fragment_ids:
             return
         placeholders = ','.join(['?'] * len(fragment_ids))
-        with self.conn:
-            self.conn.execute(f'''
+        with self.pool.writer() as conn:
+            conn.execute(f'''
                 UPDATE fragments
                 SET reference_count = reference_count + 1,
-                    last_referenced = CURRENT_TIMESTAMP
+                    last_referenced = CURRENT_TIMESTAMP,
+                    ttl_tier = 'hot'
                 WHERE id IN ({placeholders})
             ''', fragment_ids)
 
+    def apply_references(self, counts: Dict[str, int], referenced_at: Dict[str, str]) -> None:
+        """Applies coalesced reference bumps (id -> hits) in a single transaction.
+
+        Any access promotes the fragment back to the hot tier.
+        """
+        if not counts:
+            return
+        with self.pool.writer() as conn:
+            conn.executemany('''
+                UPDATE fragments
+                SET reference_count = reference_count + ?,
+                    last_referenced = ?,
+                    ttl_tier = 'hot'
+                WHERE id = ?
+            ''', [(hits, referenced_at[frag_id], frag_id) for frag_id, hits in counts.items()])
+
+    def demote_tier(
+        self,
+        from_tier: str,
+        to_tier: str,
+        idle_before: datetime,
+        max_references: Optional[int] = None,
+        batch_size: int = 500,
+    ) -> List[str]:
+        """Moves up to batch_size fragments idle since idle_before down one tier.
+
+        Returns the ids that moved so callers can loop in short transactions.
+        last_referenced holds mixed timestamp formats, so julianday() does the
+        exact comparison; the plain string bound (the day after the cutoff)
+        is a superset that lets idx_fragments_tier_last_ref narrow the scan.
+        """
+        cutoff = idle_before.astimezone(timezone.utc)
+        query = '''
+            UPDATE fragments SET ttl_tier = ?
+            WHERE rowid IN (
+                SELECT rowid FROM fragments
+                WHERE ttl_tier = ?
+                  AND last_referenced < ?
+                  AND julianday(last_referenced) < julianday(?)
+        '''
+        params: List[Any] = [
+            to_tier, from_tier,
+            (cutoff + timedelta(days=1)).strftime("%Y-%m-%d"),
+            cutoff.strftime("%Y-%m-%d %H:%M:%S"),
+        ]
+        if max_references is not None:
+            query += " AND reference_count < ?"
+            params.append(max_references)
+        query += " LIMIT ?) RETURNING id"
+        params.append(batch_size)
+
+        with self.pool.writer() as conn:
+            return [row["id"] for row in conn.execute(query, params).fetchall()]
+
+    def end_session(self, session_id: str) -> int:
+        """Marks a session ended; returns how many of its fragments await sweeping."""
+        with self.pool.writer() as conn:
+            conn.execute('''
+                INSERT INTO sessions (id, ended_at) VALUES (?, CURRENT_TIMESTAMP)
+                ON CONFLICT(id) DO UPDATE SET ended_at = excluded.ended_at
+            ''', (session_id,))
+            return conn.execute(
+                'SELECT COUNT(*) FROM fragments WHERE session_id = ?', (session_id,)
+            ).fetchone()[0]
+
+    def sweep_ended_sessions(self, batch_size: int = 500) -> List[str]:
+        """Deletes up to batch_size fragments belonging to ended sessions.
+
+        Keywords, links and FTS rows go with them via cascades/triggers. Once
+        an ended session has no fragments left its sessions row is removed.
+        """
+        with self.pool.writer() as conn:
+            deleted = [row["id"] for row in conn.execute('''
+                DELETE FROM fragments WHERE rowid IN (
+                    SELECT f.rowid FROM sessions s
+                    JOIN fragments f ON f.session_id = s.id
+                    WHERE s.ended_at IS NOT NULL
+                    LIMIT ?
+                ) RETURNING id
+            ''', (batch_size,)).fetchall()]
+            if len(deleted) < batch_size:
+                conn.execute('''
+                    DELETE FROM sessions
+                    WHERE ended_at IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM fragments WHERE session_id = sessions.id)
+                ''')
+        self._fragments_deleted(deleted)
+        return deleted
+
+    def sweep_idle_sessions(self, active_before: datetime, batch_size: int = 500) -> List[str]:
+        """Deletes up to batch_size fragments of sessions that were never ended
+        and have had no activity since active_before.
+
+        A session's last activity is the latest created_at or last_referenced
+        of its fragments, so one recently written or recalled fragment keeps
+        the whole session alive.
+        """
+        with self.pool.writer() as conn:
+            deleted = [row["id"] for row in conn.execute('''
+                DELETE FROM fragments WHERE rowid IN (
+                    SELECT f.rowid FROM fragments f
+                    JOIN (
+                        SELECT session_id FROM fragments
+                        WHERE session_id IS NOT NULL
+                        GROUP BY session_id
+                        HAVING MAX(MAX(julianday(created_at),
+                                       julianday(COALESCE(last_referenced, created_at)))) < julianday(?)
+                    ) idle ON f.session_id = idle.session_id
+                    LIMIT ?
+                ) RETURNING id
+            ''', (
+                active_before.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                batch_size,
+            )).fetchall()]
+        self._fragments_deleted(deleted)
+        return deleted
+
+    def sweep_orphan_session_fragments(
+        self, created_before: datetime, batch_size: int = 500
+    ) -> List[str]:
+        """Deletes up to batch_size session-scoped fragments with no session id
+        that were created before the cutoff."""
+        with self.pool.writer() as conn:
+            deleted = [row["id"] for row in conn.execute('''
+                DELETE FROM fragments WHERE rowid IN (
+                    SELECT rowid FROM fragments
+                    WHERE scope = 'session' AND session_id IS NULL
+                      AND julianday(created_at) < julianday(?)
+                    LIMIT ?
+                ) RETURNING id
+            ''', (
+                created_before.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                batch_size,
+            )).fetchall()]
+        self._fragments_deleted(deleted)
+        return deleted
+
     def create_link(self, link_id: str, from_id: str, to_id: str, relation_type: str) -> str:
-        with self.conn:
-            self.conn.execute('''
+        with self.pool.writer() as conn:
+            conn.execute('''
                 INSERT INTO links (id, from_id, to_id, relation_type)
                 VALUES (?, ?, ?, ?)
             ''', (link_id, from_id, to_id, relation_type))
+        if self.graph is not None:
+            self.graph.add_link(from_id, to_id, relation_type)
         return link_id
 
+    def create_links(self, links: List[Dict[str, Any]]) -> int:
+        """Bulk-inserts links, skipping duplicates and links to missing fragments."""
+        rows = [
+            (l["id"], l["from_id"], l["to_id"], l["relation_type"], l["created_at"],
+             l["from_id"], l["to_id"])
+            for l in links
+        ]
+        inserted = []
+        with self.pool.writer() as conn:
+            # Row by row (still one transaction) so RETURNING reports what was written
+            for row in rows:
+                inserted.extend(conn.execute('''
+                    INSERT OR IGNORE INTO links (id, from_id, to_id, relation_type, created_at)
+                    SELECT ?, ?, ?, ?, ?
+                    WHERE EXISTS (SELECT 1 FROM fragments WHERE id = ?)
+                      AND EXISTS (SELECT 1 FROM fragments WHERE id = ?)
+                    RETURNING from_id, to_id, relation_type
+                ''', row).fetchall())
+        if self.graph is not None:
+            for link in inserted:
+                self.graph.add_link(link["from_id"], link["to_id"], link["relation_type"])
+        return len(inserted)
+
+    def get_neighbors(
+        self,
+        fragment_ids: List[str],
+        relation_types: Optional[List[str]] = None,
+        fanout: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """One hop of graph expansion in both link directions.
+
+        Returns edges as dicts (source_id, neighbor_id, relation_type,
+        direction), keeping at most ``fanout`` of the most recent links per
+        source fragment. Each direction is an indexed IN lookup
+        (idx_links_from / idx_links_to); the cap is a window over the union.
+        """
+        if not fragment_ids:
+            return []
+        if self.graph is not None:
+            return self.graph.neighbors(fragment_ids, relation_types, fanout)
+        placeholders = ','.join(['?'] * len(fragment_ids))
+        type_clause = ""
+        type_params: List[Any] = []
+        if relation_types:
+            type_clause = f" AND relation_type IN ({','.join(['?'] * len(relation_types))})"
+            type_params = list(relation_types)
+
+        query = f'''
+            SELECT source_id, neighbor_id, relation_type, direction FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY source_id ORDER BY created_at DESC, link_id
+                ) AS rn
+                FROM (
+                    SELECT from_id AS source_id, to_id AS neighbor_id, relation_type,
+                           'out' AS direction, created_at, id AS link_id
+                    FROM links WHERE from_id IN ({placeholders}){type_clause}
+                    UNION ALL
+                    SELECT to_id, from_id, relation_type, 'in', created_at, id
+                    FROM links WHERE to_id IN ({placeholders}){type_clause}
+                )
+            )
+            WHERE rn <= ?
+            ORDER BY source_id, rn
+        '''
+        params = [*fragment_ids, *type_params, *fragment_ids, *type_params, fanout]
+        with self.pool.reader() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def iter_keyword_postings(self, batch_size: int = 5000) -> Iterator[Tuple[str, float, str, str, str]]:
+        """Yields (fragment_id, importance, topic, type, term) for every keyword row.
+
+        One statement on one reader connection, so the rows are a consistent
+        snapshot; it is meant for the startup keyword index load.
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute('''
+                SELECT f.id, f.importance, f.topic, f.type, k.term
+                FROM keywords k JOIN fragments f ON f.id = k.fragment_id
+            ''')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from (tuple(row) for row in rows)
+
+    def iter_link_edges(self, batch_size: int = 5000) -> Iterator[Tuple[str, str, str]]:
+        """Yields (from_id, to_id, relation_type) for every link, newest first.
+
+        Unlike the paginated iterators this holds one reader connection for
+        the whole scan; it is meant for the startup graph load.
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                'SELECT from_id, to_id, relation_type FROM links ORDER BY created_at DESC, id'
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row["from_id"], row["to_id"], row["relation_type"]
+
+    def iter_fragments(
+        self, after_id: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every fragment (with keywords) in id order, one page at a time.
+
+        Memory use is bounded by batch_size, and a reader connection is only
+        held while a page is fetched, never across yields.
+        """
+        last_id = after_id or ""
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    'SELECT * FROM fragments WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size),
+                ).fetchall()
+                if not rows:
+                    return
+                kw_rows = conn.execute(
+                    'SELECT fragment_id, keyword FROM keywords WHERE fragment_id BETWEEN ? AND ?',
+                    (rows[0]["id"], rows[-1]["id"]),
+                ).fetchall()
+
+            kw_map: Dict[str, List[str]] = {}
+            for kw_row in kw_rows:
+                kw_map.setdefault(kw_row["fragment_id"], []).append(kw_row["keyword"])
+
+            for row in rows:
+                frag_dict = dict(row)
+                frag_dict["source"] = parse_source(frag_dict.get("source"))
+                frag_dict["keywords"] = kw_map.get(frag_dict["id"], [])
+                yield frag_dict
+            last_id = rows[-1]["id"]
+
+    def iter_links(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yields every link in id order, one page at a time."""
+        last_id = ""
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    'SELECT * FROM links WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+    def save_embeddings(self, model: str, rows: List[Tuple[str, bytes]]) -> None:
+        """Upserts (fragment_id, vector blob) rows; ids of missing fragments are skipped."""
+        with self.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO embeddings (fragment_id, model, vector)
+                SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM fragments WHERE id = ?)
+                ON CONFLICT(fragment_id) DO UPDATE SET
+                    model = excluded.model, vector = excluded.vector
+            ''', [(frag_id, model, blob, frag_id) for frag_id, blob in rows])
+
+    def iter_embeddings(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, bytes]]:
+        """Yields (fragment_id, vector blob) for every embedding made by model."""
+        last_id = ""
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    'SELECT fragment_id, vector FROM embeddings '
+                    'WHERE fragment_id > ? AND model = ? ORDER BY fragment_id LIMIT ?',
+                    (last_id, model, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["fragment_id"], row["vector"]
+            last_id = rows[-1]["fragment_id"]
+
+    def iter_unembedded(self, model: str, batch_size: int = 500) -> Iterator[Tuple[str, str]]:
+        """Yields (id, content) for fragments with no embedding from model."""
+        last_id = ""
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute('''
+                    SELECT f.id, f.content FROM fragments f
+                    LEFT JOIN embeddings e ON e.fragment_id = f.id AND e.model = ?
+                    WHERE f.id > ? AND e.fragment_id IS NULL
+                    ORDER BY f.id LIMIT ?
+                ''', (model, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["id"], row["content"]
+            last_id = rows[-1]["id"]
+
+    def iter_missing_token_counts(self, batch_size: int = 500) -> Iterator[Tuple[str, str]]:
+        """Yields (id, content) for fragments whose token_count hasn't been computed."""
+        last_id = ""
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    'SELECT id, content FROM fragments '
+                    'WHERE id > ? AND token_count IS NULL ORDER BY id LIMIT ?',
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["id"], row["content"]
+            last_id = rows[-1]["id"]
+
+    def set_token_counts(self, rows: List[Tuple[int, str]]) -> int:
+        """Applies (token_count, fragment_id) pairs in one transaction."""
+        with self.pool.writer() as conn:
+            cursor = conn.executemany(
+                'UPDATE fragments SET token_count = ? WHERE id = ?', rows
+            )
+        return cursor.rowcount
+
+    def reset_token_counts(self) -> None:
+        with self.pool.writer() as conn:
+            conn.execute('UPDATE fragments SET token_count = NULL WHERE token_count IS NOT NULL')
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_metadata(self, key: str, value: str) -> None:
+        with self.pool.writer() as conn:
+            conn.execute('''
+                INSERT INTO metadata (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value, updated_at = excluded.updated_at
+            ''', (key, value))
+
     def fragment_exists(self, fragment_id: str) -> bool:
-        row = self.conn.execute(
-            'SELECT 1 FROM fragments WHERE id = ? LIMIT 1', (fragment_id,)
-        ).fetchone()
+        with self.pool.reader() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM fragments WHERE id = ? LIMIT 1', (fragment_id,)
+            ).fetchone()
         return row is not None
 
-    def get_stats(self) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        return {
-            "total_fragments": cursor.execute(
-                'SELECT COUNT(*) FROM fragments'
-            ).fetchone()[0],
-            "by_type": dict(cursor.execute(
-                'SELECT type, COUNT(*) FROM fragments GROUP BY type'
-            ).fetchall()),
-            "by_tier": dict(cursor.execute(
-                'SELECT ttl_tier, COUNT(*) FROM fragments GROUP BY ttl_tier'
-            ).fetchall()),
-            "by_topic": dict(cursor.execute(
-                'SELECT topic, COUNT(*) FROM fragments GROUP BY topic'
-            ).fetchall()),
-            "oldest_fragment": cursor.execute(
-                'SELECT MIN(created_at) FROM fragments'
-            ).fetchone()[0],
-            "newest_fragment": cursor.execute(
-                'SELECT MAX(created_at) FROM fragments'
-            ).fetchone()[0],
-        }
+    def pool_metrics(self) -> Dict[str, Any]:
+        return self.pool.metrics()
+
+    def explain_query_plan(self, sql: str, params: List[Any]) -> List[str]:
+        """EXPLAIN QUERY PLAN steps for a read query, indented by nesting depth."""
+        with self.pool.reader() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        depth: Dict[int, int] = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        """Fragment counts from the trigger-maintained fragment_stats table.
+
+        Cost grows with the number of distinct topics, not fragments;
+        oldest/newest are index lookups. ``detailed`` adds the
+        reference_count distribution.
+        """
+        with self.pool.reader() as conn:
+            counts: Dict[str, Dict[str, int]] = {}
+            for row in conn.execute("SELECT dimension, value, count FROM fragment_stats"):
+                counts.setdefault(row["dimension"], {})[row["value"]] = row["count"]
+            stats = {
+                "total_fragments": counts.get("total", {}).get("", 0),
+                "by_type": counts.get("type", {}),
+                "by_tier": counts.get("tier", {}),
+                "by_topic": counts.get("topic", {}),
+                "oldest_fragment": conn.execute(
+                    'SELECT MIN(created_at) FROM fragments'
+                ).fetchone()[0],
+                "newest_fragment": conn.execute(
+                    'SELECT MAX(created_at) FROM fragments'
+                ).fetchone()[0],
+            }
+        if detailed:
+            stats["by_reference_count"] = counts.get("references", {})
+        return stats
+
+    def rebuild_stats(self) -> None:
+        """Recounts fragment_stats and term_stats from scratch (repair; normally never needed)."""
+        with self.pool.writer() as conn:
+            rebuild_stats(conn)
+            rebuild_term_stats(conn)
+
+    def term_document_frequencies(self, terms: List[str]) -> Tuple[int, Dict[str, int]]:
+        """(number of fragments, {term: fragments containing it}) for keyword
+        extraction; terms no fragment contains are left out."""
+        frequencies: Dict[str, int] = {}
+        with self.pool.reader() as conn:
+            total = conn.execute(
+                "SELECT count FROM fragment_stats WHERE dimension = 'total'"
+            ).fetchone()
+            for start in range(0, len(terms), 500):  # Stay under SQLite's variable limit
+                chunk = terms[start:start + 500]
+                for row in conn.execute(
+                    f"SELECT term, doc_count FROM term_stats WHERE term IN ({','.join(['?'] * len(chunk))})",
+                    chunk,
+                ):
+                    frequencies[row["term"]] = row["doc_count"]
+        return (total[0] if total else 0), frequencies
@@ -0,0 +1,96 @@
+"""
+Fogsift Memory System - TTL Tier Lifecycle
+Demotes idle fragments hot -> warm -> cold on a schedule; access promotes them back.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from .background import PeriodicWorker
+from .models import TTLTier
+from .backend import StorageBackend
+
+
+class TierPolicy:
+    """Thresholds for tier demotion.
+
+    - hot -> warm once a fragment hasn't been referenced for warm_after_days.
+    - warm -> cold after cold_after_days idle, unless it has been referenced
+      at least keep_warm_references times (proven-useful fragments never go
+      fully cold).
+    Promotion back to hot happens on access, in the reference write path.
+    """
+
+    def __init__(
+        self,
+        warm_after_days: float = 7,
+        cold_after_days: float = 30,
+        keep_warm_references: int = 10,
+    ):
+        if cold_after_days < warm_after_days:
+            raise ValueError("cold_after_days must be >= warm_after_days")
+        self.warm_after_days = warm_after_days
+        self.cold_after_days = cold_after_days
+        self.keep_warm_references = keep_warm_references
+
+
+class TieringJob:
+    """Applies a TierPolicy in bounded batches, optionally on a background thread.
+
+    Each batch is its own short write transaction so the writer lock is never
+    held for a whole-table pass. ``on_change`` receives the ids that moved
+    (e.g. to invalidate cached recalls).
+    """
+
+    def __init__(
+        self,
+        store: StorageBackend,
+        policy: Optional[TierPolicy] = None,
+        interval_seconds: float = 3600,
+        batch_size: int = 500,
+        on_change: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self.store = store
+        self.policy = policy or TierPolicy()
+        self.batch_size = batch_size
+        self.on_change = on_change
+        self._worker = PeriodicWorker("fogsift-tiering", interval_seconds, self.run_once)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.now(timezone.utc)
+        return {
+            "hot->warm": self._demote(
+                TTLTier.HOT, TTLTier.WARM,
+                now - timedelta(days=self.policy.warm_after_days),
+            ),
+            "warm->cold": self._demote(
+                TTLTier.WARM, TTLTier.COLD,
+                now - timedelta(days=self.policy.cold_after_days),
+                max_references=self.policy.keep_warm_references,
+            ),
+        }
+
+    def _demote(
+        self,
+        from_tier: TTLTier,
+        to_tier: TTLTier,
+        idle_before: datetime,
+        max_references: Optional[int] = None,
+    ) -> int:
+        moved = 0
+        while True:
+            ids = self.store.demote_tier(
+                from_tier.value, to_tier.value, idle_before,
+                max_references=max_references, batch_size=self.batch_size,
+            )
+            if ids and self.on_change:
+                self.on_change(ids)
+            moved += len(ids)
+            if len(ids) < self.batch_size:
+                return moved
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def close(self) -> None:
+        self._worker.close()
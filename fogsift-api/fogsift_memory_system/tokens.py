@@ -0,0 +1,72 @@
+"""
+Fogsift Memory System - Token Counting
+Pluggable local tokenizers; counts are computed once at write time and persisted.
+"""
+
+import re
+from typing import List, Tuple
+
+from .backend import StorageBackend
+
+TOKENIZER_METADATA_KEY = "tokenizer"
+
+
+class ApproxTokenizer:
+    """Dependency-free approximation of a BPE tokenizer.
+
+    Words cost one token per ~6 characters, digit runs one per 3 digits and
+    every punctuation/symbol character one token. Unlike len(content) // 4
+    this tracks symbol-dense text (code, JSON, stack traces), which real
+    tokenizers split much more finely than prose.
+    """
+
+    name = "approx-v1"
+    _TOKENS = re.compile(r"[^\W\d_]+|\d+|_+|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        total = 0
+        for piece in self._TOKENS.findall(text):
+            if piece[0].isdigit():
+                total += (len(piece) + 2) // 3
+            elif piece[0].isalpha() or piece[0] == "_":
+                total += (len(piece) + 5) // 6
+            else:
+                total += 1
+        return total
+
+
+class TiktokenTokenizer:
+    """Exact counts from a local tiktoken encoding (requires the tiktoken package)."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        try:
+            import tiktoken
+        except ImportError as exc:
+            raise ImportError("TiktokenTokenizer requires the 'tiktoken' package") from exc
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken-{encoding}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def backfill_token_counts(store: StorageBackend, tokenizer, batch_size: int = 500) -> int:
+    """Fills fragments.token_count for rows that lack it; returns rows updated.
+
+    If the stored counts were produced by a different tokenizer they are all
+    recomputed, so the budget is always enforced in one consistent unit.
+    """
+    if store.get_metadata(TOKENIZER_METADATA_KEY) != tokenizer.name:
+        store.reset_token_counts()
+        store.set_metadata(TOKENIZER_METADATA_KEY, tokenizer.name)
+
+    updated = 0
+    pending: List[Tuple[int, str]] = []
+    for frag_id, content in store.iter_missing_token_counts(batch_size):
+        pending.append((tokenizer.count(content), frag_id))
+        if len(pending) >= batch_size:
+            updated += store.set_token_counts(pending)
+            pending = []
+    if pending:
+        updated += store.set_token_counts(pending)
+    return updated
@@ -0,0 +1,164 @@
+"""
+Fogsift Memory System - Keyword Vocabulary
+Distinct stored keywords, sorted for prefix matching and trigram-indexed for fuzzy matching in L1.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Set
+
+MIN_PREFIX_LENGTH = 3  # Shorter keywords only match exactly, even with prefix matching on
+MAX_FUZZY_EXPANSIONS = 50  # Closest vocabulary keywords a fuzzy keyword may stand for
+PREFIX_END = "\U0010ffff"  # Sorts after any keyword that starts with the prefix
+
+
+def max_edits(keyword: str) -> int:
+    """Edits a fuzzy keyword tolerates: none up to 3 characters, 1 up to 8, then 2.
+
+    Stricter than the usual 3/6 cut-offs: two edits in a six-letter keyword
+    match too many unrelated keywords to be worth expanding to.
+    """
+    if len(keyword) <= 3:
+        return 0
+    return 1 if len(keyword) <= 8 else 2
+
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or bound + 1 as soon as it must exceed bound.
+
+    Bit-parallel (Myers' algorithm with Hyyrö's transposition term): a
+    column of the DP matrix is one int, so a comparison costs len(b) rounds
+    of integer operations instead of len(a) * len(b) cell updates.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if not a or not b:
+        return min(len(a) + len(b), bound + 1)
+    full, last = (1 << len(a)) - 1, 1 << (len(a) - 1)
+    masks: Dict[str, int] = {}
+    for i, ch in enumerate(a):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    vp, vn, d0, prev_eq, score = full, 0, 0, 0, len(a)
+    for j, ch in enumerate(b):
+        eq = masks.get(ch, 0)
+        transposed = ((~d0 & eq) << 1) & prev_eq
+        d0 = ((((eq & vp) + vp) ^ vp) | eq | vn | transposed) & full
+        hp = (vn | ~(d0 | vp)) & full
+        hn = d0 & vp
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        x = ((hp << 1) | 1) & full
+        vn = x & d0
+        vp = ((hn << 1) | ~(x | d0)) & full
+        prev_eq = eq
+        if score - (len(b) - j - 1) > bound:  # Even matching every remaining character can't recover
+            return bound + 1
+    return min(score, bound + 1)
+
+
+def keyword_matches(query: str, keyword: str, prefix: bool, fuzzy: bool) -> bool:
+    """Does a stored keyword match a (normalized) query keyword under these flags?"""
+    if keyword == query:
+        return True
+    if prefix and len(query) >= MIN_PREFIX_LENGTH and keyword.startswith(query):
+        return True
+    if fuzzy:
+        bound = max_edits(query)
+        return bound > 0 and edit_distance(query, keyword, bound) <= bound
+    return False
+
+
+def _trigrams(keyword: str) -> Set[str]:
+    padded = f"$${keyword}$$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class KeywordVocabulary:
+    """The distinct keywords L1 can match, for expanding prefix and fuzzy keywords.
+
+    Keywords are kept sorted, so a prefix is a bisect to the start of its
+    range. Fuzzy candidates come from a trigram index: an edit touches at
+    most 3 of a keyword's trigrams and a transposition 4, so within k edits
+    a keyword shares all but 4k of the query's distinct trigrams, and only
+    keywords sharing that many are checked with edit_distance.
+
+    The vocabulary only grows. A keyword whose last fragment was deleted
+    stays until the vocabulary is rebuilt; expanding to it is harmless, as
+    it matches no fragments.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sorted: List[str] = []
+        self._known: Set[str] = set()
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._by_length: Dict[int, Set[str]] = {}  # For queries too short for the trigram bound
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, keywords: Iterable[str]) -> None:
+        """Adds (normalized) keywords; known ones are ignored."""
+        with self._lock:
+            new = {kw for kw in keywords if kw and kw not in self._known}
+            if not new:
+                return
+            if len(new) > 64:
+                self._sorted = sorted(self._sorted + list(new))
+            else:
+                for kw in new:
+                    insort(self._sorted, kw)
+            self._known |= new
+            for kw in new:
+                self._by_length.setdefault(len(kw), set()).add(kw)
+                for gram in _trigrams(kw):
+                    self._trigrams.setdefault(gram, set()).add(kw)
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Known keywords starting with prefix, in sorted order."""
+        with self._lock:
+            start = bisect_left(self._sorted, prefix)
+            end = bisect_left(self._sorted, prefix + PREFIX_END, start)
+            return self._sorted[start:end]
+
+    def similar(self, keyword: str) -> List[str]:
+        """Known keywords within max_edits(keyword) edits, closest first
+        (ties by keyword), at most MAX_FUZZY_EXPANSIONS of them."""
+        bound = max_edits(keyword)
+        if not bound:
+            return [keyword] if keyword in self._known else []
+        lengths = range(len(keyword) - bound, len(keyword) + bound + 1)
+        with self._lock:
+            postings = sorted((self._trigrams.get(gram, set()) for gram in _trigrams(keyword)), key=len)
+            needed = len(postings) - 4 * bound
+            if needed > 0:
+                # A keyword sharing `needed` of the trigrams has one of the
+                # len - needed + 1 rarest, so only their postings are read
+                candidates = [
+                    kw for kw in set().union(*postings[:len(postings) - needed + 1])
+                    if len(kw) in lengths and sum(kw in posting for posting in postings) >= needed
+                ]
+            else:
+                candidates = [kw for length in lengths for kw in self._by_length.get(length, ())]
+        scored = sorted(
+            (distance, kw) for kw in candidates
+            if (distance := edit_distance(keyword, kw, bound)) <= bound
+        )
+        return [kw for _, kw in scored[:MAX_FUZZY_EXPANSIONS]]
+
+    def expansions(self, keywords: Iterable[str], prefix: bool, fuzzy: bool) -> Dict[str, List[str]]:
+        """For each (normalized) query keyword, the sorted keywords it stands
+        for: itself, known or not, plus the known keywords it prefixes or is
+        similar to, as the flags ask (see keyword_matches)."""
+        expanded = {}
+        for keyword in keywords:
+            terms = {keyword}
+            if prefix and len(keyword) >= MIN_PREFIX_LENGTH:
+                terms.update(self.with_prefix(keyword))
+            if fuzzy:
+                terms.update(self.similar(keyword))
+            expanded[keyword] = sorted(terms)
+        return expanded
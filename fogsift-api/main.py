@@ -1,32 +1,115 @@
+import os
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fogsift_memory_system import (
-    initialize_database,
+    ConnectionPool,
     MemoryStore,
     MemorySearch,
     MemoryService,
+    AsyncMemoryService,
+    RecallCache,
+    ReferenceTracker,
+    TieringJob,
+    SessionSweeper,
+    EmbeddingIndex,
+    ApproxTokenizer,
+    TiktokenTokenizer,
+    backfill_token_counts,
+    Metrics,
+    ShardRouter,
+    ShardedMemoryService,
 )
-from fogsift_memory_system.routes import router as memory_router
+from fogsift_memory_system.routes import router as memory_router, metrics_router
 import fogsift_memory_system.routes as memory_routes
 
-db_connection = None
+DB_PATH = os.environ.get("FOGSIFT_DB_PATH", "fogsift_memory.db")  # Unsharded deployments
+POOL_SIZE = int(os.environ.get("FOGSIFT_MEMORY_POOL_SIZE", "4"))
+RECALL_CACHE_SIZE = int(os.environ.get("FOGSIFT_RECALL_CACHE_SIZE", "1024"))  # 0 disables
+RECALL_CACHE_TTL = float(os.environ.get("FOGSIFT_RECALL_CACHE_TTL", "60"))
+REFERENCE_MODE = os.environ.get("FOGSIFT_REFERENCE_MODE", "buffered")  # sync | buffered | off
+REFERENCE_FLUSH_MS = int(os.environ.get("FOGSIFT_REFERENCE_FLUSH_MS", "500"))
+TIERING_INTERVAL_S = float(os.environ.get("FOGSIFT_TIERING_INTERVAL_S", "3600"))
+SESSION_SWEEP_INTERVAL_S = float(os.environ.get("FOGSIFT_SESSION_SWEEP_INTERVAL_S", "60"))
+SESSION_IDLE_TTL_HOURS = float(os.environ.get("FOGSIFT_SESSION_IDLE_TTL_HOURS", "24"))  # Sessions never ended
+EMBEDDINGS_ENABLED = os.environ.get("FOGSIFT_EMBEDDINGS", "1") != "0"
+TOKENIZER = os.environ.get("FOGSIFT_TOKENIZER", "approx")  # approx | tiktoken
+LINK_GRAPH_ENABLED = os.environ.get("FOGSIFT_LINK_GRAPH", "1") != "0"
+KEYWORD_INDEX_ENABLED = os.environ.get("FOGSIFT_KEYWORD_INDEX", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("FOGSIFT_SLOW_QUERY_MS", "0"))  # 0 disables the slow-query log
+SHARDING = os.environ.get("FOGSIFT_SHARDING", "off")  # off | tenant | topic
+SHARD_DIR = os.environ.get("FOGSIFT_SHARD_DIR", "fogsift_shards")
+TOPIC_SHARDS = int(os.environ.get("FOGSIFT_TOPIC_SHARDS", "8"))
+SHARD_POOL_SIZE = int(os.environ.get("FOGSIFT_SHARD_POOL_SIZE", "2"))  # Readers per shard
+MAX_SHARDS = int(os.environ.get("FOGSIFT_MAX_SHARDS", "256"))  # Tenant mode; 0 for no limit
+TENANTS = [t for t in os.environ.get("FOGSIFT_TENANTS", "").split(",") if t]  # Allow-list; empty allows any
+
+
+def open_memory(path: str, pool_size: int, metrics: Metrics):
+    """The full service stack over one database file, with its background jobs started.
+
+    Returns the service and the callables that stop it, pool last.
+    """
+    pool = ConnectionPool(path, size=pool_size)
+    store = MemoryStore(pool)
+    if LINK_GRAPH_ENABLED:
+        store.enable_link_graph()  # In-memory adjacency for link expansion
+    if KEYWORD_INDEX_ENABLED:
+        store.enable_keyword_index(background=True)  # L1 uses SQL until it has loaded
+    search = MemorySearch(store)
+    cache = RecallCache(RECALL_CACHE_SIZE, RECALL_CACHE_TTL) if RECALL_CACHE_SIZE else None
+    references = ReferenceTracker(store, REFERENCE_MODE, flush_interval_ms=REFERENCE_FLUSH_MS)
+    references.start()
+    tokenizer = TiktokenTokenizer() if TOKENIZER == "tiktoken" else ApproxTokenizer()
+    backfill_token_counts(store, tokenizer)
+    embeddings = EmbeddingIndex(store) if EMBEDDINGS_ENABLED else None
+    if embeddings:
+        embeddings.load()
+    service = MemoryService(
+        store, search, cache, references, embeddings, tokenizer=tokenizer, metrics=metrics,
+    )
+    tiering = TieringJob(
+        store,
+        interval_seconds=TIERING_INTERVAL_S,
+        on_change=cache.invalidate_fragments if cache else None,
+    )
+    tiering.start()
+    sweeper = SessionSweeper(
+        store,
+        interval_seconds=SESSION_SWEEP_INTERVAL_S,
+        idle_ttl_hours=SESSION_IDLE_TTL_HOURS,
+        on_delete=service.fragments_deleted,
+    )
+    sweeper.start()
+    return service, [tiering.close, sweeper.close, references.close, pool.close]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global db_connection
-    db_connection = initialize_database("fogsift_memory.db")
-    store = MemoryStore(db_connection)
-    search = MemorySearch(store)
-    service = MemoryService(store, search)
-    memory_routes.memory_service = service
+    metrics = Metrics(slow_query_ms=SLOW_QUERY_MS)
+    if SHARDING == "off":
+        service, closers = open_memory(DB_PATH, POOL_SIZE, metrics)
+        location = f"{DB_PATH} (1 writer, {POOL_SIZE} readers)"
+    else:
+        shard_router = ShardRouter(
+            SHARD_DIR, SHARDING, TOPIC_SHARDS, SHARD_POOL_SIZE,
+            factory=lambda path, pool_size: open_memory(path, pool_size, metrics),
+            tenants=TENANTS or None,
+            max_shards=MAX_SHARDS or None,
+        )
+        service = ShardedMemoryService(shard_router, metrics=metrics)
+        closers = [service.close]
+        location = (f"{SHARD_DIR}/ ({len(shard_router.shards())} {SHARDING} shards, "
+                    f"1 writer and {SHARD_POOL_SIZE} readers each)")
+    async_service = AsyncMemoryService(service, max_workers=POOL_SIZE + 1)
+    memory_routes.memory_service = async_service
     print("\n[✔] Fogsift Memory System Online")
-    print("[✔] Database connected: fogsift_memory.db")
+    print(f"[✔] Database connected: {location}")
     print("[✔] Docs available at: http://localhost:8000/docs\n")
     yield
-    if db_connection:
-        db_connection.close()
-        print("[!] Database connection closed.")
+    async_service.shutdown()
+    for close in closers:
+        close()
+    print("[!] Database connections closed.")
 
 
 app = FastAPI(
@@ -36,6 +119,7 @@ app = FastAPI(
     lifespan=lifespan,
 )
 app.include_router(memory_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
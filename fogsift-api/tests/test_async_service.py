@@ -0,0 +1,77 @@
+"""Tests for the AsyncMemoryService thread-pool facade."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fogsift_memory_system.async_service import AsyncMemoryService
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, RecallRequest, RecallResponse,
+)
+
+
+@pytest.fixture
+def async_service(service):
+    facade = AsyncMemoryService(service, max_workers=2)
+    yield facade
+    facade.shutdown()
+
+
+class TestAsyncMemoryService:
+    def test_remember_and_recall_roundtrip(self, async_service):
+        async def scenario():
+            frag = await async_service.remember(FragmentCreate(
+                content="Async roundtrip.", topic="async", type=FragmentType.DECISION,
+                keywords=["async"],
+            ))
+            result = await async_service.recall(RecallRequest(keywords=["async"]))
+            return frag, result
+
+        frag, result = asyncio.run(scenario())
+        assert isinstance(result, RecallResponse)
+        assert [f.id for f in result.fragments] == [frag.id]
+
+    def test_calls_run_off_the_event_loop_thread(self, async_service, service, monkeypatch):
+        seen = {}
+        original = service.get_stats
+
+        def spy(detailed=False):
+            seen["thread"] = threading.get_ident()
+            return original(detailed)
+
+        monkeypatch.setattr(service, "get_stats", spy)
+
+        async def scenario():
+            await async_service.get_stats()
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(scenario())
+        assert seen["thread"] != loop_thread
+
+    def test_slow_call_does_not_stall_loop(self, async_service, service, monkeypatch):
+        monkeypatch.setattr(service, "get_stats", lambda detailed=False: time.sleep(0.3))
+
+        async def scenario():
+            ticks = 0
+            slow = asyncio.ensure_future(async_service.get_stats())
+            while not slow.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+            return ticks
+
+        # A blocking call on the loop would let the heartbeat tick at most once
+        assert asyncio.run(scenario()) > 5
+
+    def test_forget_returns_bool(self, async_service, error_fragment):
+        assert asyncio.run(async_service.forget(error_fragment.id)) is True
+        assert asyncio.run(async_service.forget(error_fragment.id)) is False
+
+
+class TestRecallLoadBenchmark:
+    @pytest.mark.parametrize("mode", [[], ["--inline"]])
+    def test_runs_in_both_modes(self, mode, capsys):
+        pytest.importorskip("httpx")
+        from benchmarks import recall_load
+        recall_load.main(["--fragments", "20", "--requests", "10", "--concurrency", "2", *mode])
+        assert "throughput:" in capsys.readouterr().out
@@ -0,0 +1,205 @@
+"""Tests for the RecallCache and its integration with MemoryService."""
+
+import threading
+import time
+
+import pytest
+from fogsift_memory_system.cache import RecallCache
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.serialization import RecallResult
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, RecallRequest, LinkCreate, LinkRelationType,
+)
+
+
+@pytest.fixture
+def cache():
+    return RecallCache(max_entries=8, ttl_seconds=60)
+
+
+@pytest.fixture
+def cached_service(store, search, cache):
+    return MemoryService(store, search, cache)
+
+
+def _remember(service, content, topic="infra", ftype=FragmentType.ERROR, keywords=None):
+    return service.remember(FragmentCreate(content=content, topic=topic, type=ftype, keywords=keywords))
+
+
+class TestRecallCacheKeys:
+    def test_key_ignores_keyword_order_and_case(self):
+        a = RecallCache.key_for(RecallRequest(keywords=["Redis", "cluster"]))
+        b = RecallCache.key_for(RecallRequest(keywords=["cluster", "redis"]))
+        assert a == b
+
+    def test_key_distinguishes_keyword_expansion(self):
+        keys = {
+            RecallCache.key_for(RecallRequest(keywords=["redis"], **flags))
+            for flags in ({}, {"prefix_keywords": True}, {"fuzzy_keywords": True})
+        }
+        assert len(keys) == 3
+
+    def test_key_distinguishes_budget(self):
+        a = RecallCache.key_for(RecallRequest(keywords=["redis"], token_budget=500))
+        b = RecallCache.key_for(RecallRequest(keywords=["redis"], token_budget=600))
+        assert a != b
+
+
+class TestRecallCacheGeneration:
+    def test_put_after_invalidation_is_dropped(self, cache):
+        req = RecallRequest(keywords=["redis"])
+        key, result = cache.key_for(req), RecallResult([], [], 0, [], 0.0)
+        generation = cache.generation()
+        cache.invalidate_fragments(["unrelated"])
+        cache.put(key, req, result, generation)
+        assert cache.get(key) is None
+        cache.put(key, req, result, cache.generation())
+        assert cache.get(key) is result
+
+
+class TestBatchInvalidation:
+    def _cached(self, cache, **fields):
+        req = RecallRequest(**fields)
+        cache.put(cache.key_for(req), req, RecallResult([], [], 0, ["L1:1"], 0.0))
+        return cache.key_for(req)
+
+    def test_filters_apply_per_fragment(self, cache):
+        infra_redis = self._cached(cache, keywords=["redis"], topic="infra")
+        infra_kafka = self._cached(cache, keywords=["kafka"], topic="infra")
+        any_kafka = self._cached(cache, keywords=["kafka"])
+        cache.invalidate_new_fragments([("infra", "error", ["redis"]), ("ops", "error", ["kafka"])])
+        assert cache.get(infra_redis) is None and cache.get(any_kafka) is None
+        assert cache.get(infra_kafka) is not None  # Kafka was written under another topic
+
+    def test_each_entry_is_checked_once(self, cache, monkeypatch):
+        from fogsift_memory_system import cache as cache_module
+        for i in range(4):
+            self._cached(cache, keywords=[f"kw{i}"])
+        checks = []
+        may_admit = cache_module._Entry.may_admit
+        monkeypatch.setattr(cache_module._Entry, "may_admit", lambda e, kws: checks.append(1) or may_admit(e, kws))
+        cache.invalidate_new_fragments([("infra", "error", [f"new{i}"]) for i in range(100)])
+        assert len(checks) == 4
+
+
+class TestRecallCaching:
+    def test_repeat_recall_hits_cache(self, cached_service, cache):
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        first = cached_service.recall(req)
+        second = cached_service.recall(req)
+        assert [f.id for f in first.fragments] == [f.id for f in second.fragments]
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_hit_still_counts_references(self, cached_service, store):
+        frag = _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        cached_service.recall(req)
+        assert store.get_fragment(frag.id)["reference_count"] == 2
+
+    def test_remember_invalidates_matching_keyword(self, cached_service, cache):
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        _remember(cached_service, "Redis again.", keywords=["redis"])
+        assert len(cached_service.recall(req).fragments) == 2
+
+    def test_remember_invalidates_expanded_keyword_entries(self, cached_service, cache):
+        _remember(cached_service, "Migration ran.", keywords=["migration"])
+        prefix = RecallRequest(keywords=["migra"], prefix_keywords=True)
+        fuzzy = RecallRequest(keywords=["migratoin"], fuzzy_keywords=True)
+        cached_service.recall(prefix)
+        cached_service.recall(fuzzy)
+        _remember(cached_service, "Migrate again.", keywords=["migrate", "migrations"])
+        assert len(cached_service.recall(prefix).fragments) == 2
+        assert len(cached_service.recall(fuzzy).fragments) == 2
+        assert cache.hits == 0
+
+    def test_remember_keeps_unrelated_entries(self, cached_service, cache):
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        _remember(cached_service, "Kafka lag.", keywords=["kafka"])
+        cached_service.recall(req)
+        assert cache.hits == 1
+
+    def test_remember_respects_topic_filter(self, cached_service, cache):
+        _remember(cached_service, "Redis OOM.", topic="infra", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"], topic="infra")
+        cached_service.recall(req)
+        _remember(cached_service, "Redis on auth.", topic="auth", keywords=["redis"])
+        cached_service.recall(req)
+        assert cache.hits == 1
+
+    def test_l2_entries_invalidated_by_any_admissible_fragment(self, cached_service):
+        _remember(cached_service, "Auth failing.", topic="auth")
+        req = RecallRequest(topic="auth")
+        cached_service.recall(req)
+        _remember(cached_service, "Auth slow.", topic="auth", keywords=["unrelated"])
+        assert len(cached_service.recall(req).fragments) == 2
+
+    def test_forget_invalidates_entries_containing_fragment(self, cached_service):
+        frag = _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        cached_service.forget(frag.id)
+        assert cached_service.recall(req).fragments == []
+
+    def test_link_invalidates_endpoints(self, cached_service, cache):
+        a = _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        b = _remember(cached_service, "Raise maxmemory.", ftype=FragmentType.SOLUTION_APPROACH, keywords=["lru"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        cached_service.link(LinkCreate(from_id=a.id, to_id=b.id, relation_type=LinkRelationType.RESOLVED_BY))
+        cached_service.recall(req)
+        assert cache.hits == 0
+
+    def test_write_during_recall_is_not_cached_stale(self, cached_service, search, monkeypatch):
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        computed, written = threading.Event(), threading.Event()
+        search_l1 = search.search_l1
+
+        def slow_search_l1(*args, **kwargs):
+            rows = search_l1(*args, **kwargs)
+            computed.set()
+            written.wait(5)  # The result is now older than the write below
+            return rows
+
+        monkeypatch.setattr(search, "search_l1", slow_search_l1)
+        req = RecallRequest(keywords=["redis"])
+        recall = threading.Thread(target=cached_service.recall, args=(req,))
+        recall.start()
+        assert computed.wait(5)
+        monkeypatch.setattr(search, "search_l1", search_l1)
+        _remember(cached_service, "Redis evictions.", keywords=["redis"])
+        written.set()
+        recall.join(5)
+        assert len(cached_service.recall(req).fragments) == 2
+
+    def test_ttl_expiry(self, cached_service, cache):
+        cache.ttl_seconds = 0.01
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        time.sleep(0.02)
+        cached_service.recall(req)
+        assert cache.hits == 0
+
+    def test_lru_eviction(self, cached_service, cache):
+        for i in range(10):
+            cached_service.recall(RecallRequest(keywords=[f"kw{i}"]))
+        assert cache.stats()["size"] == 8
+        assert cache.evictions == 2
+
+    def test_stats_report_cache_counters(self, cached_service):
+        _remember(cached_service, "Redis OOM.", keywords=["redis"])
+        req = RecallRequest(keywords=["redis"])
+        cached_service.recall(req)
+        cached_service.recall(req)
+        stats = cached_service.get_stats()
+        assert stats.recall_cache.hits == 1
+        assert stats.recall_cache.hit_rate == 0.5
+
+    def test_stats_omit_cache_when_disabled(self, service):
+        assert service.get_stats().recall_cache is None
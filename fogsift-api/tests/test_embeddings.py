@@ -0,0 +1,129 @@
+"""Tests for the embedding index and L4 semantic recall."""
+
+import math
+
+import pytest
+from fogsift_memory_system.embeddings import (
+    EmbeddingIndex, HashingEncoder, VectorIndex, pack_vector, unpack_vector,
+)
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+@pytest.fixture
+def embeddings(store):
+    return EmbeddingIndex(store, HashingEncoder(dim=128))
+
+
+@pytest.fixture
+def semantic_service(store, search, embeddings):
+    return MemoryService(store, search, embeddings=embeddings)
+
+
+def _remember(service, content, topic="databases"):
+    return service.remember(FragmentCreate(
+        content=content, topic=topic, type=FragmentType.SOLUTION_APPROACH, keywords=["x"],
+    ))
+
+
+class TestHashingEncoder:
+    def test_deterministic_unit_vectors(self):
+        encoder = HashingEncoder(dim=64)
+        a, b = encoder.encode(["Postgres migration", "Postgres migration"])
+        assert list(a) == list(b)
+        assert len(a) == 64
+        assert math.isclose(_dot(a, a), 1.0, rel_tol=1e-5)
+
+    def test_variants_score_above_unrelated_text(self):
+        a, b, c = HashingEncoder().encode([
+            "Postgres migration locks the table", "postgress migrations", "frontend css styling",
+        ])
+        assert _dot(a, b) > _dot(a, c)
+
+    def test_pack_roundtrip(self):
+        vector = HashingEncoder(dim=32).encode(["roundtrip"])[0]
+        blob = pack_vector(vector)
+        assert len(blob) == 32 * 4
+        assert list(unpack_vector(blob)) == list(vector)
+
+
+class TestVectorIndex:
+    def test_top_k_order_and_min_score(self):
+        index = VectorIndex(2)
+        index.add(["a", "b", "c"], [[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]])
+        assert [i for i, _ in index.search([1.0, 0.0], k=2)] == ["a", "b"]
+        assert [i for i, _ in index.search([1.0, 0.0], k=3, min_score=0.5)] == ["a", "b"]
+
+    def test_replace_and_remove(self):
+        index = VectorIndex(2)
+        index.add(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]])
+        index.add(["a"], [[0.0, 1.0]])
+        index.remove(["b"])
+        assert len(index) == 2 and "b" not in index
+        assert [i for i, _ in index.search([0.0, 1.0], k=3)] == ["a", "c"]
+
+    def test_rejects_wrong_dimension(self):
+        with pytest.raises(ValueError):
+            VectorIndex(3).add(["a"], [[1.0, 0.0]])
+
+
+class TestEmbeddingIndex:
+    def test_vectors_persist_and_reload(self, store, semantic_service, db):
+        frag = _remember(semantic_service, "Vacuum the database weekly.")
+        row = db.execute("SELECT model, length(vector) FROM embeddings WHERE fragment_id = ?",
+                         (frag.id,)).fetchone()
+        assert tuple(row) == ("hashing-128-c3", 128 * 4)
+
+        reloaded = EmbeddingIndex(store, HashingEncoder(dim=128))
+        assert reloaded.load() == 1
+        assert frag.id in reloaded
+
+    def test_load_backfills_missing_vectors(self, store, service, db):
+        frag = _remember(service, "Stored before embeddings were enabled.")
+        embeddings = EmbeddingIndex(store, HashingEncoder(dim=128))
+        assert embeddings.load(batch_size=1) == 1
+        assert frag.id in embeddings
+        assert db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 1
+
+    def test_encoder_change_reembeds(self, store, semantic_service):
+        frag = _remember(semantic_service, "Reindex after changing encoders.")
+        other = EmbeddingIndex(store, HashingEncoder(dim=64))
+        assert other.load() == 1
+        assert len(other.index.search(other.encoder.encode(["reindex"])[0], k=1)) == 1
+        assert frag.id in other
+
+
+class TestSemanticRecall:
+    def test_l4_finds_typo_that_fts_misses(self, semantic_service):
+        frag = _remember(semantic_service, "Postgres migration locks the table")
+        _remember(semantic_service, "Frontend css styling guide")
+
+        result = semantic_service.recall(RecallRequest(text="postgress migrations", threshold=0.3))
+        assert any(p.startswith("L4:") for p in result.search_path)
+        assert [f.id for f in result.fragments] == [frag.id]
+
+    def test_threshold_filters_weak_matches(self, semantic_service):
+        _remember(semantic_service, "Postgres migration locks the table")
+        result = semantic_service.recall(RecallRequest(text="kubernetes pods", threshold=0.9))
+        assert not any(p.startswith("L4:") for p in result.search_path)
+
+    def test_topic_filter_applies(self, semantic_service):
+        _remember(semantic_service, "Postgres migration locks the table", topic="databases")
+        result = semantic_service.recall(RecallRequest(
+            text="postgress migrations", topic="frontend", threshold=0.3,
+        ))
+        assert result.fragments == []
+
+    def test_forget_removes_vector(self, semantic_service, embeddings):
+        frag = _remember(semantic_service, "Temporary fragment")
+        semantic_service.forget(frag.id)
+        assert frag.id not in embeddings
+
+    def test_disabled_without_index(self, service):
+        _remember(service, "Postgres migration locks the table")
+        result = service.recall(RecallRequest(text="postgress", threshold=0.0))
+        assert not any(p.startswith("L4:") for p in result.search_path)
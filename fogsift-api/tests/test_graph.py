@@ -0,0 +1,171 @@
+"""Tests for link traversal: recall expansion, the neighbourhood query and LinkGraph."""
+
+import json
+
+import pytest
+from fogsift_memory_system.graph import LinkGraph
+from fogsift_memory_system.sessions import SessionSweeper
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, LinkCreate, LinkRelationType, RecallRequest,
+)
+
+
+def _remember(service, name, content=None, keywords=None):
+    return service.remember(FragmentCreate(
+        content=content or f"Graph node {name}.", topic="graph",
+        type=FragmentType.DECISION, keywords=keywords or [name],
+    ))
+
+
+def _link(service, a, b, relation=LinkRelationType.RELATED):
+    service.link(LinkCreate(from_id=a.id, to_id=b.id, relation_type=relation))
+
+
+@pytest.fixture
+def chain(service):
+    """a -> b -> c -> d, plus e -resolved_by-> a."""
+    nodes = {name: _remember(service, name) for name in "abcde"}
+    _link(service, nodes["a"], nodes["b"])
+    _link(service, nodes["b"], nodes["c"])
+    _link(service, nodes["c"], nodes["d"])
+    _link(service, nodes["e"], nodes["a"], LinkRelationType.RESOLVED_BY)
+    return nodes
+
+
+class TestGetNeighbors:
+    def test_both_directions(self, store, chain):
+        edges = store.get_neighbors([chain["a"].id])
+        assert {(e["neighbor_id"], e["direction"]) for e in edges} == {
+            (chain["b"].id, "out"), (chain["e"].id, "in"),
+        }
+
+    def test_relation_filter(self, store, chain):
+        edges = store.get_neighbors([chain["a"].id], relation_types=["resolved_by"])
+        assert [e["neighbor_id"] for e in edges] == [chain["e"].id]
+
+    def test_fanout_cap_per_source(self, service, store):
+        hub = _remember(service, "hub")
+        for i in range(6):
+            _link(service, hub, _remember(service, f"spoke{i}"))
+        assert len(store.get_neighbors([hub.id], fanout=4)) == 4
+
+
+class TestRecallLinks:
+    def test_links_ignored_by_default(self, service, chain):
+        result = service.recall(RecallRequest(keywords=["a"]))
+        assert [f.id for f in result.fragments] == [chain["a"].id]
+        assert result.edges == []
+
+    def test_one_hop_expansion(self, service, chain):
+        result = service.recall(RecallRequest(keywords=["a"], include_links=True))
+        ids = [f.id for f in result.fragments]
+        assert ids[0] == chain["a"].id
+        assert set(ids[1:]) == {chain["b"].id, chain["e"].id}
+        assert "LINK:2" in result.search_path
+        assert {(e.from_id, e.to_id) for e in result.edges} == {
+            (chain["a"].id, chain["b"].id), (chain["e"].id, chain["a"].id),
+        }
+
+    def test_depth_and_types(self, service, chain):
+        result = service.recall(RecallRequest(
+            keywords=["a"], include_links=True, link_depth=3,
+            link_types=[LinkRelationType.RELATED],
+        ))
+        assert [f.id for f in result.fragments] == [chain[n].id for n in "abcd"]
+        assert [e.depth for e in result.edges] == [1, 2, 3]
+
+    def test_expansion_charged_to_budget(self, service):
+        seed = _remember(service, "seed", content="x " * 300)
+        big = _remember(service, "big", content="y " * 300)
+        _link(service, seed, big)
+        result = service.recall(RecallRequest(keywords=["seed"], include_links=True, token_budget=400))
+        assert [f.id for f in result.fragments] == [seed.id]
+        assert result.total_tokens <= 400
+        assert not any(p.startswith("LINK") for p in result.search_path)
+
+
+class TestGraph:
+    def test_neighbourhood(self, service, chain):
+        graph = service.graph(chain["b"].id, depth=2)
+        assert graph.root_id == chain["b"].id
+        assert graph.fragments[0].id == chain["b"].id
+        assert {f.id for f in graph.fragments} == {chain[n].id for n in "abcde"}
+        assert max(e.depth for e in graph.edges) == 2
+        assert len(graph.edges) == 4
+
+    def test_missing_fragment(self, service):
+        assert service.graph("frag_missing") is None
+
+
+def _neighbor_set(store, fragment_id, **kwargs):
+    return {
+        (e["neighbor_id"], e["relation_type"], e["direction"])
+        for e in store.get_neighbors([fragment_id], **kwargs)
+    }
+
+
+class TestLinkGraph:
+    def test_rows_newest_first_both_directions(self):
+        graph = LinkGraph.from_links([
+            ("a", "c", "related"),   # newest
+            ("a", "b", "informs"),
+            ("d", "a", "caused_by"),
+        ])
+        edges = graph.neighbors(["a"])
+        assert [(e["neighbor_id"], e["direction"]) for e in edges] == [
+            ("c", "out"), ("b", "out"), ("d", "in"),
+        ]
+        assert [e["neighbor_id"] for e in graph.neighbors(["a"], fanout=2)] == ["c", "b"]
+        assert graph.neighbors(["a"], relation_types=["caused_by"])[0]["neighbor_id"] == "d"
+
+    def test_matches_sql_expansion(self, store, chain):
+        sql = {name: _neighbor_set(store, frag.id) for name, frag in chain.items()}
+        store.enable_link_graph()
+        assert {name: _neighbor_set(store, frag.id) for name, frag in chain.items()} == sql
+
+    def test_incremental_link_and_forget(self, service, store, chain):
+        store.enable_link_graph()
+        extra = _remember(service, "extra")
+        _link(service, chain["d"], extra, LinkRelationType.INFORMS)
+        assert (extra.id, "informs", "out") in _neighbor_set(store, chain["d"].id)
+
+        service.forget(chain["c"].id)
+        assert _neighbor_set(store, chain["b"].id) == {(chain["a"].id, "related", "in")}
+        assert _neighbor_set(store, chain["c"].id) == set()
+
+    def test_recreated_id_has_no_stale_edges(self):
+        graph = LinkGraph.from_links([("a", "b", "related")])
+        graph.remove_fragments(["a"])
+        graph.add_link("a", "x", "related")
+        assert [e["neighbor_id"] for e in graph.neighbors(["a"])] == ["x"]
+        assert graph.neighbors(["b"]) == []
+
+    def test_compaction_preserves_rows(self):
+        graph = LinkGraph()
+        graph.add_link("a", "b", "related")
+        graph.add_link("a", "c", "informs")
+        graph.remove_fragments(["b"])
+        assert graph.stats()["tombstones"] == 1
+        graph.compact()
+        stats = graph.stats()
+        assert stats["delta_entries"] == 0 and stats["tombstones"] == 0
+        assert [(e["neighbor_id"], e["relation_type"]) for e in graph.neighbors(["a"])] == [
+            ("c", "informs"),
+        ]
+
+    def test_import_adds_only_new_links(self, service, store, chain):
+        graph = store.enable_link_graph()
+        records = [json.loads(line) for line in service.export_ndjson()]
+        service.import_records([r for r in records if r["kind"] == "link"])
+        assert graph.stats()["delta_entries"] == 0
+
+    def test_session_sweep_updates_graph(self, service, store, chain):
+        store.enable_link_graph()
+        temp = service.remember(FragmentCreate(
+            content="Session scratch.", topic="graph", type=FragmentType.DECISION,
+            scope="session", session_id="s1",
+        ))
+        _link(service, chain["a"], temp)
+        service.end_session("s1")
+        SessionSweeper(store).run_once()
+        assert temp.id not in {n for n, _, _ in _neighbor_set(store, chain["a"].id)}
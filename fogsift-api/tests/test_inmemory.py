@@ -0,0 +1,203 @@
+"""Tests for the in-memory backend.
+
+The backend-agnostic service suites are re-run against InMemoryStore and
+InMemorySearch (the fixtures below override conftest's SQLite ones), then
+the two engines are compared on identical data.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fogsift_memory_system.inmemory import InMemoryStore, InMemorySearch
+from fogsift_memory_system.schema import initialize_database
+from fogsift_memory_system.store import MemoryStore
+from fogsift_memory_system.search import MemorySearch
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, LinkCreate, LinkRelationType, RecallRequest,
+)
+from tests import test_cache, test_graph, test_references, test_serialization, test_service, test_sessions
+from tests.test_cache import cache, cached_service  # noqa: F401  (fixtures of the re-run suites)
+from tests.test_graph import chain  # noqa: F401
+
+
+@pytest.fixture
+def store():
+    return InMemoryStore()
+
+
+@pytest.fixture
+def search(store):
+    return InMemorySearch(store)
+
+
+class TestInMemoryRemember(test_service.TestRemember):
+    """Re-runs test_service.TestRemember on the in-memory backend."""
+
+
+class TestInMemoryRememberBatch(test_service.TestRememberBatch):
+    """Re-runs test_service.TestRememberBatch on the in-memory backend."""
+
+
+class TestInMemoryRecall(test_service.TestRecall):
+    """Re-runs test_service.TestRecall on the in-memory backend."""
+
+
+class TestInMemoryForget(test_service.TestForget):
+    """Re-runs test_service.TestForget on the in-memory backend."""
+
+
+class TestInMemoryLink(test_service.TestLink):
+    """Re-runs test_service.TestLink on the in-memory backend."""
+
+
+class TestInMemoryGetStats(test_service.TestGetStats):
+    """Re-runs test_service.TestGetStats on the in-memory backend."""
+
+
+class TestInMemoryExportImport(test_service.TestExportImport):
+    """Re-runs test_service.TestExportImport on the in-memory backend."""
+
+
+class TestInMemoryRecallJson(test_serialization.TestRecallJson):
+    """Re-runs test_serialization.TestRecallJson on the in-memory backend."""
+
+
+class TestInMemoryNeighbors(test_graph.TestGetNeighbors):
+    """Re-runs test_graph.TestGetNeighbors on the in-memory backend."""
+
+
+class TestInMemoryRecallLinks(test_graph.TestRecallLinks):
+    """Re-runs test_graph.TestRecallLinks on the in-memory backend."""
+
+
+class TestInMemoryGraph(test_graph.TestGraph):
+    """Re-runs test_graph.TestGraph on the in-memory backend."""
+
+
+class TestInMemorySessions(test_sessions.TestSessionFragments):
+    """Re-runs test_sessions.TestSessionFragments on the in-memory backend."""
+
+
+class TestInMemorySweeper(test_sessions.TestSessionSweeper):
+    """Re-runs test_sessions.TestSessionSweeper on the in-memory backend."""
+
+
+class TestInMemoryReferences(test_references.TestReferenceTracker):
+    """Re-runs test_references.TestReferenceTracker on the in-memory backend."""
+
+
+class TestInMemoryRecallCaching(test_cache.TestRecallCaching):
+    """Re-runs test_cache.TestRecallCaching on the in-memory backend."""
+
+
+def _fragment(i):
+    return FragmentCreate(
+        content=f"Fragment {i} about caching and redis replicas number {i % 7}.",
+        topic=f"topic-{i % 3}",
+        type=list(FragmentType)[i % len(FragmentType)],
+        keywords=[f"k{i % 5}", f"k{i % 11}", "shared"],
+        importance=round((i * 37 % 100) / 100, 2),
+    )
+
+
+@pytest.fixture
+def engines():
+    """The same 120 fragments stored by both engines, with identical ids and timestamps."""
+    sql_store = MemoryStore(initialize_database(":memory:"))
+    memory_store = InMemoryStore()
+    services = {
+        "sql": MemoryService(sql_store, MemorySearch(sql_store)),
+        "memory": MemoryService(memory_store, InMemorySearch(memory_store)),
+    }
+    written = services["sql"].remember_batch([_fragment(i) for i in range(120)])
+    memory_store.create_fragments(
+        [sql_store.get_fragment(f.id) for f in written],
+        [f.keywords for f in written],
+    )
+    yield services
+    sql_store.pool.close()
+
+
+class TestEngineParity:
+    @pytest.mark.parametrize("keywords", [["shared"], ["k1", "k2", "k3"], ["k4", "shared"], ["absent"]])
+    def test_l1_order_and_match_counts(self, engines, keywords):
+        pages = {
+            name: [(r["id"], r["match_count"]) for r in service.search.search_l1(keywords, limit=200)]
+            for name, service in engines.items()
+        }
+        assert pages["memory"] == pages["sql"]
+
+    def test_l1_filters_and_cursor(self, engines):
+        after = None
+        for _ in range(3):
+            rows = {
+                name: service.search.search_l1(["shared", "k2"], topic="topic-1", limit=10, after=after)
+                for name, service in engines.items()
+            }
+            assert [r["id"] for r in rows["memory"]] == [r["id"] for r in rows["sql"]]
+            last = rows["sql"][-1]
+            after = (last["match_count"], last["importance"], last["id"])
+
+    @pytest.mark.parametrize("budget", [None, 60])
+    def test_l2_order_and_budget_cut(self, engines, budget):
+        ids = {
+            name: [r["id"] for r in service.search.search_l2(
+                "topic-2", None, limit=30, tiers=["hot", "warm"], token_budget=budget,
+            )]
+            for name, service in engines.items()
+        }
+        assert ids["memory"] == ids["sql"]
+
+    def test_l3_finds_the_same_fragments(self, engines):
+        ids = {
+            name: {r["id"] for r in service.search.search_l3("redis number 3", limit=200)}
+            for name, service in engines.items()
+        }
+        assert ids["memory"] == ids["sql"]
+
+    def test_stats_match(self, engines):
+        stats = {name: service.get_stats(detailed=True) for name, service in engines.items()}
+        assert stats["memory"] == stats["sql"]
+
+    def test_stats_stay_in_step_with_writes(self, engines):
+        victims = [r["id"] for r in engines["sql"].search.search_l1(["k3"], limit=200)]
+        for service in engines.values():
+            for frag_id in victims:
+                service.forget(frag_id)
+            service.store.increment_reference(victims + [r["id"] for r in service.search.search_l1(["k4"])])
+        stats = {name: service.get_stats(detailed=True) for name, service in engines.items()}
+        assert stats["memory"] == stats["sql"]
+        assert stats["memory"].total_fragments == 120 - len(victims)
+
+
+class TestInMemoryStore:
+    def test_duplicate_ids_raise_integrity_error(self, service):
+        written = service.remember(_fragment(1))
+        row = service.store.get_fragment(written.id)
+        with pytest.raises(sqlite3.IntegrityError):
+            service.store.create_fragments([row], [[]])
+        assert service.store.create_fragments([row], [[]], ignore_existing=True) == 0
+
+    def test_forget_drops_links_and_index_entries(self, service):
+        a = service.remember(_fragment(1))
+        b = service.remember(_fragment(2))
+        service.link(LinkCreate(from_id=a.id, to_id=b.id, relation_type=LinkRelationType.RELATED))
+        service.forget(a.id)
+        assert list(service.store.iter_links()) == []
+        assert service.store.get_neighbors([b.id]) == []
+        assert a.id not in dict(service.store.keyword_index.search(["shared"]))
+        assert a.id not in service.store.term_scores(["redis"])
+
+    def test_demote_tier_uses_last_referenced(self, service):
+        frag = service.remember(_fragment(1))
+        service.store._fragments[frag.id]["last_referenced"] = "2020-01-01 00:00:00"
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        assert service.store.demote_tier("hot", "warm", cutoff) == [frag.id]
+        assert service.store.get_fragment(frag.id)["ttl_tier"] == "warm"
+        service.recall(RecallRequest(keywords=["shared"]))
+        assert service.store.get_fragment(frag.id)["ttl_tier"] == "hot"
+
+    def test_reports_an_empty_pool(self, service):
+        assert service.get_pool_stats().size == 0
@@ -0,0 +1,158 @@
+"""Tests for the in-memory keyword index behind L1."""
+
+import json
+import time
+
+import pytest
+from fogsift_memory_system.keyword_index import KeywordIndex
+from fogsift_memory_system.search import MemorySearch
+from fogsift_memory_system.sessions import SessionSweeper
+from fogsift_memory_system.store import MemoryStore
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+from tests import test_search
+
+
+@pytest.fixture
+def store(db):
+    store = MemoryStore(db)
+    store.enable_keyword_index()
+    return store
+
+
+class TestIndexedL1Search(test_search.TestL1Search):
+    pass
+
+
+def _fragment(i, **kwargs):
+    fields = {
+        "content": f"Fragment {i}.",
+        "topic": f"topic-{i % 3}",
+        "type": list(FragmentType)[i % len(FragmentType)],
+        "keywords": [f"k{i % 5}", f"k{i % 7}", "shared"],
+        "importance": round((i * 37 % 100) / 100, 2),
+    }
+    return FragmentCreate(**{**fields, **kwargs})
+
+
+@pytest.fixture
+def corpus(service):
+    return service.remember_batch([_fragment(i) for i in range(150)])
+
+
+def _sql(store):
+    """A second search over the same database that never consults the index."""
+    sql_store = MemoryStore(store.pool)
+    return MemorySearch(sql_store)
+
+
+def _page(search, *args, **kwargs):
+    return [(r["id"], r["match_count"]) for r in search.search_l1(*args, **kwargs)]
+
+
+class TestIndexMatchesSql:
+    @pytest.mark.parametrize("match_all", [False, True])
+    @pytest.mark.parametrize("keywords", [["shared"], ["k1", "k3", "k4"], ["k2", "shared"], ["absent", "k1"]])
+    def test_same_page(self, store, search, corpus, keywords, match_all):
+        assert (_page(search, keywords, limit=200, match_all=match_all)
+                == _page(_sql(store), keywords, limit=200, match_all=match_all))
+
+    @pytest.mark.parametrize("flags", [{"prefix": True}, {"fuzzy": True}, {"prefix": True, "fuzzy": True}])
+    @pytest.mark.parametrize("keywords", [["migra", "k1", "k0"], ["migratoin", "k2"], ["shraed", "k1", "migration"]])
+    def test_same_expanded_page(self, service, store, search, corpus, keywords, flags):
+        service.remember_batch([
+            _fragment(i, keywords=[kw, f"k{i % 5}"])
+            for i, kw in enumerate(["migration", "migrate", "migrations-plan", "integration", "shard"], 500)
+        ])
+        for after in (None, (1, 0.5, "")):
+            assert (_page(search, keywords, limit=200, after=after, **flags)
+                    == _page(_sql(store), keywords, limit=200, after=after, **flags))
+
+    def test_same_filtered_cursor_pages(self, store, search, corpus):
+        after = None
+        for _ in range(4):
+            page = _page(search, ["shared", "k2", "k3"], topic="topic-1", limit=7, after=after)
+            assert page == _page(_sql(store), ["shared", "k2", "k3"], topic="topic-1", limit=7, after=after)
+            last = store.get_fragment(page[-1][0])
+            after = (page[-1][1], last["importance"], last["id"])
+
+    def test_single_keyword_pages_stay_ordered_across_writes(self, service, store, search, corpus):
+        _page(search, ["k2"])  # Builds the keyword's ranked view before the writes below
+        service.remember_batch([_fragment(i) for i in range(200, 230)])
+        service.forget(corpus[2].id)
+        after, seen = None, []
+        while True:
+            page = _page(search, ["k2"], topic="topic-2", limit=4, after=after)
+            assert page == _page(_sql(store), ["k2"], topic="topic-2", limit=4, after=after)
+            if not page:
+                break
+            seen += page
+            last = store.get_fragment(page[-1][0])
+            after = (page[-1][1], last["importance"], last["id"])
+        assert len(seen) == len(_page(_sql(store), ["k2"], topic="topic-2", limit=500))
+
+    def test_follows_remember_and_forget(self, service, store, search, corpus):
+        added = service.remember(_fragment(1000, importance=1.0))
+        service.forget(corpus[0].id)
+        assert _page(search, ["shared", "k0"]) == _page(_sql(store), ["shared", "k0"])
+        assert search.search_l1(["shared"])[0]["id"] == added.id
+
+    def test_import_skips_known_fragments(self, service, store, corpus):
+        service.import_records([json.loads(line) for line in service.export_ndjson()])
+        assert store.keyword_index.stats()["fragments"] == 150
+
+    def test_session_sweep_updates_index(self, service, store):
+        service.remember(_fragment(1, scope="session", session_id="s1"))
+        service.end_session("s1")
+        SessionSweeper(store).run_once()
+        assert store.keyword_index.search(["shared"]) == []
+
+    def test_match_all_recall(self, service, corpus):
+        result = service.recall(RecallRequest(keywords=["k1", "k3"], match_all_keywords=True))
+        assert result.fragments and all({"k1", "k3"} <= set(f.keywords) for f in result.fragments)
+
+
+class TestKeywordIndex:
+    def test_cold_index_falls_back_to_sql(self, db, service):
+        service.remember(_fragment(1))
+        cold = MemoryStore(db)
+        cold.keyword_index = KeywordIndex()  # Attached but never loaded
+        assert [r["match_count"] for r in MemorySearch(cold).search_l1(["shared", "k1"])] == [2]
+
+    def test_background_load(self, db, service):
+        service.remember(_fragment(1))
+        store = MemoryStore(db)
+        index = store.enable_keyword_index(background=True)
+        for _ in range(200):
+            if index.ready:
+                break
+            time.sleep(0.01)
+        assert index.search(["k1"])[0][1] == 1
+
+    def test_writes_during_load_are_kept(self):
+        index = KeywordIndex()
+        index.add("late", 0.9, "t", "error", ["redis"])
+        index.remove_fragments(["gone"])
+        index.load([
+            ("early", 0.5, "t", "error", "redis"),
+            ("gone", 0.7, "t", "error", "redis"),
+            ("late", 0.9, "t", "error", "redis"),
+        ])
+        assert index.search(["redis"]) == [("late", 1), ("early", 1)]
+
+    def test_recreated_id_starts_fresh(self):
+        index = KeywordIndex()
+        index.load([("a", 0.5, "t", "error", "redis")])
+        index.remove_fragments(["a"])
+        index.add("a", 0.5, "t", "error", ["kafka"])
+        assert index.search(["redis"]) == []
+        assert index.search(["kafka"]) == [("a", 1)]
+
+    def test_compaction_drops_tombstones(self):
+        index = KeywordIndex(min_compact=2)
+        index.load([(f"f{i}", i / 10, "t", "error", "redis") for i in range(5)])
+        index.remove_fragments(["f1", "f2", "f3"])
+        stats = index.stats()
+        assert stats["tombstones"] == 0 and stats["postings"] == 2
+        assert index.search(["redis"]) == [("f4", 1), ("f0", 1)]
+        index.add("f5", 0.0, "t", "error", ["redis"])
+        assert index.search(["redis"], match_all=True)[-1] == ("f5", 1)
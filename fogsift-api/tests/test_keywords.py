@@ -0,0 +1,183 @@
+"""Tests for keyword extraction: analysis, TF-IDF selection and term statistics."""
+
+import pytest
+from fogsift_memory_system.cache import RecallCache
+from fogsift_memory_system.inmemory import InMemoryStore, InMemorySearch
+from fogsift_memory_system.keywords import (
+    KeywordExtractor, analyze, keyword_terms, normalize_keyword, stem, tokenize,
+)
+from fogsift_memory_system.schema import backfill_terms, initialize_database
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+def _remember(service, content, keywords=None, topic="infra"):
+    return service.remember(FragmentCreate(content=content, topic=topic, type=FragmentType.ERROR, keywords=keywords))
+
+
+def _term_stats(db):
+    return dict(db.execute("SELECT term, doc_count FROM term_stats").fetchall())
+
+
+class TestAnalysis:
+    def test_tokenize_keeps_joined_words_and_drops_possessives(self):
+        assert tokenize("Redis's max_memory hit node.js rate-limit!") == [
+            "redis", "max_memory", "hit", "node.js", "rate-limit",
+        ]
+
+    @pytest.mark.parametrize("word,expected", [
+        ("replicas", "replica"), ("queries", "query"), ("processes", "process"),
+        ("keys", "key"), ("class", "class"), ("status", "status"), ("redis", "redis"),
+        ("plays", "play"), ("gas", "gas"), ("ties", "tie"), ("policies", "policy"),
+        ("series", "series"), ("movies", "movie"), ("postgres", "postgres"), ("kubernetes", "kubernetes"),
+    ])
+    def test_stem_strips_plurals_only(self, word, expected):
+        assert stem(word) == expected
+
+    def test_analyze_drops_stopwords_short_tokens_and_numbers(self):
+        assert analyze("The Redis replicas ran out of memory at 2024 on db") == [
+            "redis", "replica", "ran", "memory",
+        ]
+
+    def test_normalize_keyword_stems_each_word(self):
+        assert normalize_keyword("  Redis   Replicas ") == "redis replica"
+
+    def test_keyword_terms_dedupe_by_term(self):
+        assert keyword_terms(["Replicas", "replica", "", "queries"]) == ["replica", "query"]
+
+
+class TestKeywordExtractor:
+    def test_prefers_terms_rare_in_the_corpus(self, service):
+        for i in range(5):
+            _remember(service, f"Redis cache note {i}.", keywords=["note"])
+        extractor = KeywordExtractor(service.store, max_keywords=2)
+        assert extractor.extract("Redis cache evicted the sentinel failover config.")[:1] == ["evicted"]
+
+    def test_frequent_terms_outrank_single_mentions(self, store):
+        extractor = KeywordExtractor(store, max_keywords=1)
+        assert extractor.extract("Kafka lag. Consumer lag grew; lag alerts fired.") == ["lag"]
+
+    def test_is_deterministic(self, store):
+        extractor = KeywordExtractor(store)
+        content = "Deploy pipeline failed: terraform plan drifted from staging state."
+        assert extractor.extract(content) == extractor.extract(content)
+        assert extractor.extract(content) == ["deploy", "pipeline", "failed", "terraform", "plan"]
+
+    def test_batch_matches_single_extraction(self, store):
+        extractor = KeywordExtractor(store)
+        contents = ["Redis replicas lagged.", "", "Postgres vacuum stalled."]
+        assert extractor.extract_batch(contents) == [extractor.extract(c) for c in contents]
+
+    def test_remember_extracts_when_no_keywords_given(self, service):
+        frag = _remember(service, "Sentinel failover promoted the wrong replicas.")
+        assert "replicas" in frag.keywords and "the" not in frag.keywords
+
+    def test_keywords_keep_the_first_spelling(self, store):
+        extractor = KeywordExtractor(store, max_keywords=1)
+        assert extractor.extract("Replicas lag; one replica lags more, replicas drift.") == ["replicas"]
+
+
+class TestTermStats:
+    def test_counts_follow_remember_and_forget(self, service, db):
+        a = _remember(service, "Redis replicas lagged behind.", keywords=["redis"])
+        _remember(service, "Redis memory full.", keywords=["redis"])
+        assert _term_stats(db)["redis"] == 2 and _term_stats(db)["replica"] == 1
+        service.forget(a.id)
+        stats = _term_stats(db)
+        assert stats["redis"] == 1 and "replica" not in stats
+
+    def test_document_frequencies_read_from_stats(self, service):
+        _remember(service, "Redis replicas lagged.", keywords=["redis"])
+        _remember(service, "Redis memory full.", keywords=["redis"])
+        assert service.store.term_document_frequencies(["redis", "replica", "absent"]) == (
+            2, {"redis": 2, "replica": 1},
+        )
+
+    def test_rebuild_matches_triggers(self, service, db):
+        _remember(service, "Redis replicas lagged.", keywords=["redis"])
+        _remember(service, "Kafka consumers lagged.", keywords=["kafka"])
+        before = _term_stats(db)
+        db.execute("DELETE FROM term_stats")
+        service.store.rebuild_stats()
+        assert _term_stats(db) == before
+
+    def test_in_memory_store_counts_the_same(self, service):
+        memory_store = InMemoryStore()
+        memory = MemoryService(memory_store, InMemorySearch(memory_store))
+        contents = ["Redis replicas lagged.", "Redis memory full.", "Kafka consumers lagged."]
+        for svc in (service, memory):
+            written = [_remember(svc, content, keywords=["x"]) for content in contents]
+            svc.forget(written[0].id)
+        terms = ["redis", "replica", "lagged", "kafka", "memory"]
+        assert (memory.store.term_document_frequencies(terms)
+                == service.store.term_document_frequencies(terms))
+
+    def test_existing_database_is_backfilled(self, tmp_path):
+        path = str(tmp_path / "legacy.db")
+        conn = initialize_database(path)
+        conn.execute(
+            "INSERT INTO fragments (id, content, topic, type) VALUES ('f1', 'Redis replicas lagged', 't', 'error')"
+        )
+        conn.execute("DROP TABLE fragment_terms")  # As if written before term statistics existed
+        conn.execute("DELETE FROM term_stats")
+        conn.commit()
+        conn.close()
+
+        conn = initialize_database(path)
+        assert _term_stats(conn) == {"redis": 1, "replica": 1, "lagged": 1}
+        conn.close()
+
+    def test_backfill_pages_through_fragments(self, db, service):
+        for i in range(7):
+            _remember(service, f"Replica note {i}.", keywords=["x"])
+        db.execute("DELETE FROM fragment_terms")
+        assert backfill_terms(db, batch_size=3) == 7
+        assert backfill_terms(db, batch_size=3) == 0
+        assert _term_stats(db)["replica"] == 7
+
+
+class TestKeywordTerms:
+    def test_stored_keywords_keep_their_spelling(self, service):
+        frag = _remember(service, "Series of movies.", keywords=["Series", "movies", "Postgres", "replicas"])
+        assert frag.keywords == ["movies", "postgres", "replicas", "series"]
+        assert service.store.get_fragment(frag.id)["keywords"] == frag.keywords
+
+    def test_existing_keywords_get_terms_without_being_rewritten(self, tmp_path):
+        path = str(tmp_path / "legacy.db")
+        conn = initialize_database(path)
+        conn.execute("INSERT INTO fragments (id, content, topic, type) VALUES ('f1', 'Redis lag', 't', 'error')")
+        conn.execute("DROP INDEX idx_keywords_term")
+        conn.execute("ALTER TABLE keywords DROP COLUMN term")  # As if written before match terms existed
+        conn.executemany("INSERT INTO keywords (fragment_id, keyword) VALUES ('f1', ?)", [("replicas",), ("queries",)])
+        conn.commit()
+        conn.close()
+
+        conn = initialize_database(path)
+        rows = set(conn.execute("SELECT keyword, term FROM keywords").fetchall())
+        assert {tuple(row) for row in rows} == {("replicas", "replica"), ("queries", "query")}
+        conn.close()
+
+    def test_plural_and_singular_keywords_count_once(self, service):
+        frag = _remember(service, "Replica lag.", keywords=["replica", "replicas", "lag"])
+        [row] = service.search.search_l1(["replicas", "lag"])
+        assert (row["id"], row["match_count"]) == (frag.id, 2)
+
+
+class TestNormalizedRecall:
+    def test_plural_query_finds_singular_keyword(self, service):
+        frag = _remember(service, "Replica lag.", keywords=["replica"])
+        result = service.recall(RecallRequest(keywords=["Replicas"]))
+        assert [f.id for f in result.fragments] == [frag.id]
+
+    def test_cache_key_ignores_plurals(self):
+        assert RecallCache.key_for(RecallRequest(keywords=["replicas"])) == RecallCache.key_for(
+            RecallRequest(keywords=["replica"])
+        )
+
+    def test_remember_invalidates_plural_entries(self, store, search):
+        service = MemoryService(store, search, RecallCache(max_entries=8, ttl_seconds=60))
+        _remember(service, "Replica lag.", keywords=["replica"])
+        req = RecallRequest(keywords=["replicas"])
+        service.recall(req)
+        _remember(service, "More replicas lagging.", keywords=["replicas"])
+        assert len(service.recall(req).fragments) == 2
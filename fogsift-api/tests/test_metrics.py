@@ -0,0 +1,121 @@
+"""Tests for recall stage timings, the Prometheus rendering and the slow-query log."""
+
+import logging
+
+import pytest
+from fogsift_memory_system.cache import RecallCache
+from fogsift_memory_system.metrics import (
+    Histogram, Metrics, RECALL_SECONDS, STAGE_SECONDS, stage,
+)
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+def _remember(service, keyword="metrics", topic="observability"):
+    return service.remember(FragmentCreate(
+        content="Histograms beat averages for latency.", topic=topic,
+        type=FragmentType.DECISION, keywords=[keyword],
+    ))
+
+
+def _stages(metrics):
+    return {dict(labels)["stage"] for labels in metrics.snapshot().get(STAGE_SECONDS, {})}
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        h = Histogram(buckets=(0.001, 0.01))
+        for seconds in (0.0005, 0.005, 0.005, 5.0):
+            h.observe(seconds)
+        assert h.cumulative() == [1, 3, 4]
+        assert h.count == 4
+        assert h.sum == pytest.approx(5.0105)
+
+    def test_stage_outside_a_trace_is_a_noop(self):
+        with stage("l1_sql"):
+            pass  # Nothing to record into; must not raise
+
+
+class TestMetricsRender:
+    def test_prometheus_text_format(self):
+        metrics = Metrics(buckets=(0.01,))
+        metrics.observe(STAGE_SECONDS, 0.002, stage="l1_sql")
+        metrics.inc("fogsift_recall_slow_total")
+        text = metrics.render({"fogsift_pool_readers_available": ("Idle readers", {(): 3})})
+
+        assert "# TYPE fogsift_recall_stage_duration_seconds histogram" in text
+        assert 'fogsift_recall_stage_duration_seconds_bucket{stage="l1_sql",le="0.01"} 1' in text
+        assert 'fogsift_recall_stage_duration_seconds_bucket{stage="l1_sql",le="+Inf"} 1' in text
+        assert 'fogsift_recall_stage_duration_seconds_count{stage="l1_sql"} 1' in text
+        assert "# TYPE fogsift_recall_slow_total counter" in text
+        assert "fogsift_recall_slow_total 1" in text
+        assert "# TYPE fogsift_pool_readers_available gauge" in text
+        assert "fogsift_pool_readers_available 3" in text
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.inc("fogsift_test_total", stage='a"b')
+        assert 'fogsift_test_total{stage="a\\"b"} 1' in metrics.render()
+
+
+class TestRecallInstrumentation:
+    def test_recall_records_total_and_stage_timings(self, store, search):
+        metrics = Metrics()
+        service = MemoryService(store, search, metrics=metrics)
+        _remember(service)
+        service.recall(RecallRequest(keywords=["metrics"]))
+        service.recall(RecallRequest(topic="observability", keywords=["absent"]))
+
+        snapshot = metrics.snapshot()
+        assert snapshot[RECALL_SECONDS][(("cache", "off"),)]["count"] == 2
+        assert {"l1_sql", "l2_sql", "format", "ranking", "references", "response_build"} <= _stages(metrics)
+
+    def test_cache_hits_are_labelled(self, store, search):
+        metrics = Metrics()
+        service = MemoryService(store, search, cache=RecallCache(), metrics=metrics)
+        _remember(service)
+        request = RecallRequest(keywords=["metrics"])
+        service.recall(request)
+        service.recall(request)
+
+        totals = metrics.snapshot()[RECALL_SECONDS]
+        assert totals[(("cache", "miss"),)]["count"] == 1
+        assert totals[(("cache", "hit"),)]["count"] == 1
+
+    def test_render_includes_pool_and_cache_counters(self, store, search):
+        service = MemoryService(store, search, cache=RecallCache(), metrics=Metrics())
+        service.recall(RecallRequest(keywords=["metrics"]))
+        text = service.render_metrics()
+        assert 'fogsift_pool_checkouts_total{role="reader"}' in text
+        assert "fogsift_recall_cache_misses_total 1" in text
+
+    def test_recall_json_times_serialization(self, store, search):
+        metrics = Metrics()
+        service = MemoryService(store, search, metrics=metrics)
+        _remember(service)
+        service.recall_json(RecallRequest(keywords=["metrics"]))
+        assert "serialization" in _stages(metrics)
+        assert "response_build" not in _stages(metrics)
+
+
+class TestSlowQueryLog:
+    def test_slow_recall_logs_sql_and_plan(self, store, search, caplog):
+        metrics = Metrics(slow_query_ms=1e-6)  # Every recall is "slow"
+        service = MemoryService(store, search, metrics=metrics)
+        _remember(service)
+
+        with caplog.at_level(logging.WARNING, logger="fogsift_memory.slow_query"):
+            service.recall(RecallRequest(keywords=["metrics"]))
+
+        message = caplog.records[-1].getMessage()
+        assert message.startswith("slow recall")
+        assert "[l1_sql] SELECT f.*, COUNT(DISTINCT k.term) AS match_count" in message
+        assert "keywords" in message.split("[l1_sql]")[1]  # Plan mentions the table scanned
+        assert "fogsift_recall_slow_total 1" in metrics.render()
+
+    def test_disabled_by_default(self, store, search, caplog):
+        service = MemoryService(store, search, metrics=Metrics())
+        _remember(service)
+        with caplog.at_level(logging.WARNING, logger="fogsift_memory.slow_query"):
+            service.recall(RecallRequest(keywords=["metrics"]))
+        assert not caplog.records
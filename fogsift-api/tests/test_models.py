@@ -128,6 +128,10 @@ class TestRecallRequest:
             req = RecallRequest(keywords=["test"], token_budget=budget)
             assert req.token_budget == budget
 
+    def test_cursor_requires_keywords(self):
+        with pytest.raises(ValidationError):
+            RecallRequest(topic="auth", cursor="abc")
+
 
 class TestLinkCreate:
     def test_valid_link(self):
@@ -0,0 +1,96 @@
+"""Tests for the SQLite ConnectionPool."""
+
+import threading
+
+import pytest
+from fogsift_memory_system.pool import ConnectionPool, PoolTimeout
+from fogsift_memory_system.store import MemoryStore
+from fogsift_memory_system.search import MemorySearch
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+@pytest.fixture
+def file_pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=3, timeout=0.5)
+    yield pool
+    pool.close()
+
+
+class TestConnectionPool:
+    def test_memory_db_has_no_readers(self):
+        pool = ConnectionPool(":memory:", size=4)
+        assert pool.size == 0
+        with pool.reader() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM fragments").fetchone()[0] == 0
+        pool.close()
+
+    def test_readers_are_read_only(self, file_pool):
+        with file_pool.reader() as conn:
+            with pytest.raises(Exception):
+                conn.execute("DELETE FROM fragments")
+
+    def test_readers_see_committed_writes(self, file_pool):
+        with file_pool.writer() as conn:
+            conn.execute("INSERT INTO metadata (key, value) VALUES ('k', 'v')")
+        with file_pool.reader() as conn:
+            row = conn.execute("SELECT value FROM metadata WHERE key = 'k'").fetchone()
+        assert row["value"] == "v"
+
+    def test_writer_rolls_back_on_error(self, file_pool):
+        with pytest.raises(RuntimeError):
+            with file_pool.writer() as conn:
+                conn.execute("INSERT INTO metadata (key, value) VALUES ('gone', 'v')")
+                raise RuntimeError("boom")
+        with file_pool.reader() as conn:
+            assert conn.execute("SELECT 1 FROM metadata WHERE key = 'gone'").fetchone() is None
+
+    def test_exhausted_pool_times_out(self, file_pool):
+        held = [file_pool._readers.get() for _ in range(file_pool.size)]
+        with pytest.raises(PoolTimeout):
+            with file_pool.reader():
+                pass
+        for conn in held:
+            file_pool._readers.put(conn)
+        assert file_pool.metrics()["reader"]["timeouts"] == 1
+
+    def test_metrics_track_checkouts(self, file_pool):
+        with file_pool.reader():
+            pass
+        with file_pool.writer():
+            pass
+        metrics = file_pool.metrics()
+        assert metrics["reader"]["checkouts"] == 1
+        assert metrics["writer"]["checkouts"] == 1
+        assert metrics["readers_available"] == 3
+
+    def test_concurrent_recall_and_remember(self, file_pool):
+        store = MemoryStore(file_pool)
+        service = MemoryService(store, MemorySearch(store))
+        errors = []
+
+        def writer():
+            try:
+                for i in range(20):
+                    service.remember(FragmentCreate(
+                        content=f"Pooled write {i}.", topic="pool",
+                        type=FragmentType.DECISION, keywords=["pool"],
+                    ))
+            except Exception as e:  # pragma: no cover - surfaced via assert
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(20):
+                    service.recall(RecallRequest(keywords=["pool"]))
+            except Exception as e:  # pragma: no cover - surfaced via assert
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert service.get_stats().total_fragments == 20
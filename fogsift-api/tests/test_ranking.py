@@ -0,0 +1,123 @@
+"""Tests for relevance scoring and budget packing."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fogsift_memory_system.ranking import RelevanceScorer, pack_budget, parse_timestamp
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def _frag(frag_id, importance=0.5, keywords=(), days_idle=0, refs=0, **scores):
+    return {
+        "id": frag_id,
+        "content": "x" * 40,
+        "importance": importance,
+        "keywords": list(keywords),
+        "last_referenced": (NOW - timedelta(days=days_idle)).isoformat(),
+        "reference_count": refs,
+        **scores,
+    }
+
+
+def _order(scorer, frags, request):
+    return [f["id"] for _, f in scorer.rank(frags, request, now=NOW)]
+
+
+class TestParseTimestamp:
+    def test_mixed_formats_are_utc(self):
+        iso = parse_timestamp("2026-06-01T00:00:00+00:00")
+        sqlite = parse_timestamp("2026-06-01 00:00:00")
+        assert iso == sqlite
+
+    def test_invalid_is_none(self):
+        assert parse_timestamp("not a date") is None
+        assert parse_timestamp(None) is None
+
+
+class TestRelevanceScorer:
+    def test_keyword_overlap_beats_importance(self):
+        frags = [
+            _frag("important", importance=0.95, keywords=["redis"]),
+            _frag("overlap", importance=0.6, keywords=["redis", "cluster", "failure"]),
+        ]
+        request = RecallRequest(keywords=["redis", "cluster", "failure"])
+        assert _order(RelevanceScorer(), frags, request) == ["overlap", "important"]
+
+    def test_plural_query_credits_singular_keywords(self):
+        scorer = RelevanceScorer()
+        frag = _frag("f", keywords=["migration"])
+        plural = scorer.rank([frag], RecallRequest(keywords=["migrations"]), now=NOW)[0][0]
+        singular = scorer.rank([frag], RecallRequest(keywords=["migration"]), now=NOW)[0][0]
+        assert plural == pytest.approx(singular)
+        frags = [_frag("important", importance=0.9), _frag("plural", importance=0.6, keywords=["Replicas"])]
+        assert _order(scorer, frags, RecallRequest(keywords=["replica"])) == ["plural", "important"]
+
+    def test_expanded_l1_matches_count_as_keyword_hits(self):
+        frags = [
+            _frag("important", importance=0.9),
+            _frag("prefixed", importance=0.6, keywords=["migration"], match_count=1),
+        ]
+        request = RecallRequest(keywords=["migra"], prefix_keywords=True)
+        assert _order(RelevanceScorer(), frags, request) == ["prefixed", "important"]
+
+    def test_text_score_is_relative_to_best_hit(self):
+        frags = [_frag("weak", text_score=1.0), _frag("strong", text_score=8.0)]
+        assert _order(RelevanceScorer(), frags, RecallRequest(text="query")) == ["strong", "weak"]
+
+    def test_recency_decay(self):
+        frags = [_frag("stale", days_idle=120), _frag("fresh", days_idle=1)]
+        assert _order(RelevanceScorer(), frags, RecallRequest(topic="t")) == ["fresh", "stale"]
+
+    def test_reference_count_breaks_ties(self):
+        frags = [_frag("unused"), _frag("popular", refs=50)]
+        assert _order(RelevanceScorer(), frags, RecallRequest(topic="t")) == ["popular", "unused"]
+
+    def test_custom_weights(self):
+        scorer = RelevanceScorer(weights={"keywords": 0.0, "importance": 1.0})
+        frags = [
+            _frag("overlap", importance=0.6, keywords=["redis"]),
+            _frag("important", importance=0.9),
+        ]
+        assert _order(scorer, frags, RecallRequest(keywords=["redis"])) == ["important", "overlap"]
+
+    def test_unknown_weight_rejected(self):
+        with pytest.raises(ValueError):
+            RelevanceScorer(weights={"popularity": 1.0})
+
+
+class TestPackBudget:
+    def test_skips_oversized_fragment(self):
+        frags = [{"cost": 50}, {"cost": 200}, {"cost": 40}]
+        packed, used = pack_budget(frags, 100, lambda f: f["cost"])
+        assert packed == [{"cost": 50}, {"cost": 40}]
+        assert used == 90
+
+    def test_empty(self):
+        assert pack_budget([], 100, len) == ([], 0)
+
+
+class TestRecallRanking:
+    def test_oversized_top_hit_does_not_block_budget(self, service):
+        big = service.remember(FragmentCreate(
+            content="pack " * 200, topic="pack", type=FragmentType.PREFERENCE, keywords=["pack"],
+        ))
+        small = service.remember(FragmentCreate(
+            content="Small pack note.", topic="pack", type=FragmentType.PROCEDURE, keywords=["pack"],
+        ))
+        result = service.recall(RecallRequest(keywords=["pack"], token_budget=100))
+        assert [f.id for f in result.fragments] == [small.id]
+        assert big.id not in [f.id for f in result.fragments]
+
+    def test_layer_scores_merge_across_layers(self, service):
+        both = service.remember(FragmentCreate(
+            content="Rotate the signing keys quarterly.", topic="security",
+            type=FragmentType.PROCEDURE, keywords=["keys"],
+        ))
+        keyword_only = service.remember(FragmentCreate(
+            content="Unrelated wording entirely.", topic="security",
+            type=FragmentType.PROCEDURE, keywords=["keys"],
+        ))
+        result = service.recall(RecallRequest(keywords=["keys"], text="signing keys"))
+        assert [f.id for f in result.fragments] == [both.id, keyword_only.id]
@@ -0,0 +1,105 @@
+"""Tests for ReferenceTracker durability modes."""
+
+import time
+from datetime import datetime
+
+import pytest
+from fogsift_memory_system.references import ReferenceTracker
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+def _remember(service, keyword="refs"):
+    return service.remember(FragmentCreate(
+        content="Reference tracking.", topic="refs", type=FragmentType.DECISION,
+        keywords=[keyword],
+    ))
+
+
+def _count(store, frag_id):
+    return store.get_fragment(frag_id)["reference_count"]
+
+
+class TestReferenceTracker:
+    def test_unknown_mode_rejected(self, store):
+        with pytest.raises(ValueError):
+            ReferenceTracker(store, mode="eventually")
+
+    def test_sync_mode_writes_through(self, store, service):
+        frag = _remember(service)
+        ReferenceTracker(store, "sync").record([frag.id])
+        assert _count(store, frag.id) == 1
+
+    def test_off_mode_never_writes(self, store, search):
+        service = MemoryService(store, search, references=ReferenceTracker(store, "off"))
+        frag = _remember(service)
+        service.recall(RecallRequest(keywords=["refs"]))
+        assert _count(store, frag.id) == 0
+
+    def test_buffered_mode_coalesces_until_flush(self, store, search):
+        tracker = ReferenceTracker(store, "buffered")
+        service = MemoryService(store, search, references=tracker)
+        frag = _remember(service)
+        for _ in range(3):
+            service.recall(RecallRequest(keywords=["refs"]))
+        assert _count(store, frag.id) == 0
+        assert tracker.pending() == 1
+
+        assert tracker.flush() == 1
+        assert _count(store, frag.id) == 3
+        assert tracker.pending() == 0
+
+    def test_flush_updates_last_referenced(self, store, service):
+        frag = _remember(service)
+        tracker = ReferenceTracker(store, "buffered")
+        tracker.record([frag.id])
+        tracker.flush()
+        stored = datetime.fromisoformat(store.get_fragment(frag.id)["last_referenced"])
+        assert stored > frag.last_referenced
+
+    def test_background_flusher_runs_on_interval(self, store, service):
+        frag = _remember(service)
+        tracker = ReferenceTracker(store, "buffered", flush_interval_ms=10)
+        tracker.start()
+        try:
+            tracker.record([frag.id])
+            deadline = time.time() + 2
+            while _count(store, frag.id) == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            tracker.close()
+        assert _count(store, frag.id) == 1
+
+    def test_threshold_wakes_flusher_early(self, store, service):
+        frag = _remember(service)
+        tracker = ReferenceTracker(store, "buffered", flush_interval_ms=60_000, flush_threshold=2)
+        tracker.start()
+        try:
+            tracker.record([frag.id, frag.id])
+            deadline = time.time() + 2
+            while _count(store, frag.id) == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            tracker.close()
+        assert _count(store, frag.id) == 2
+
+    def test_close_flushes_pending(self, store, service):
+        frag = _remember(service)
+        tracker = ReferenceTracker(store, "buffered", flush_interval_ms=60_000)
+        tracker.start()
+        tracker.record([frag.id])
+        tracker.close()
+        assert _count(store, frag.id) == 1
+
+    def test_failed_flush_keeps_hits(self, store, service, monkeypatch):
+        frag = _remember(service)
+        tracker = ReferenceTracker(store, "buffered")
+        tracker.record([frag.id])
+
+        def boom(*args):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(store, "apply_references", boom)
+        with pytest.raises(RuntimeError):
+            tracker.flush()
+        assert tracker.pending() == 1
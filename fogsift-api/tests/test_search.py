@@ -3,6 +3,7 @@
 import pytest
 from datetime import datetime, timezone
 from fogsift_memory_system.models import FragmentCreate, FragmentType
+from fogsift_memory_system.search import decode_cursor, encode_cursor
 
 
 def store_frag(service, content, topic, ftype, keywords=None):
@@ -69,6 +70,75 @@ class TestL1Search:
         for r in results:
             assert "keywords" in r
 
+    def test_l1_ranks_by_match_count(self, service, search):
+        one = store_frag(service, "One match.", "infra", FragmentType.ERROR, ["redis"])
+        three = store_frag(service, "Three matches.", "infra", FragmentType.PROCEDURE,
+                           ["redis", "cluster", "oom"])
+        results = search.search_l1(["redis", "cluster", "oom", "REDIS"])
+        assert [r["id"] for r in results] == [three.id, one.id]
+        assert [r["match_count"] for r in results] == [3, 1]
+
+    def test_l1_limit_and_keyset_pages(self, service, search):
+        for i in range(7):
+            store_frag(service, f"Paged {i}.", "infra", FragmentType.ERROR,
+                       ["page"] if i % 2 else ["page", "extra"])
+        seen, after = [], None
+        while True:
+            page = search.search_l1(["page", "extra"], limit=3, after=after)
+            if not page:
+                break
+            assert len(page) <= 3
+            seen.extend(r["id"] for r in page)
+            last = page[-1]
+            after = (last["match_count"], last["importance"], last["id"])
+        assert len(seen) == len(set(seen)) == 7
+        assert seen == [r["id"] for r in search.search_l1(["page", "extra"])]
+
+    def test_l1_match_all_requires_every_keyword(self, service, search):
+        store_frag(service, "Redis only.", "infra", FragmentType.ERROR, ["redis"])
+        both = store_frag(service, "Redis cluster.", "infra", FragmentType.ERROR, ["redis", "cluster"])
+        results = search.search_l1(["redis", "cluster"], match_all=True)
+        assert [(r["id"], r["match_count"]) for r in results] == [(both.id, 2)]
+        assert search.search_l1(["redis", "absent"], match_all=True) == []
+
+    def test_l1_prefix_matches_longer_keywords(self, service, search):
+        migration = store_frag(service, "Schema migration.", "db", FragmentType.DECISION, ["migration"])
+        migrate = store_frag(service, "Migrate the users table.", "db", FragmentType.DECISION, ["migrate"])
+        store_frag(service, "Image resize.", "media", FragmentType.DECISION, ["image"])
+        assert search.search_l1(["migra"]) == []
+        assert {r["id"] for r in search.search_l1(["Migra"], prefix=True)} == {migration.id, migrate.id}
+
+    def test_l1_short_keywords_only_match_exactly_with_prefix(self, service, search):
+        store_frag(service, "Schema migration.", "db", FragmentType.DECISION, ["migration"])
+        assert search.search_l1(["mi"], prefix=True) == []
+
+    def test_l1_fuzzy_matches_typos(self, service, search):
+        frag = store_frag(service, "Pod evicted.", "k8s", FragmentType.ERROR, ["kubernetes"])
+        store_frag(service, "Redis down.", "infra", FragmentType.ERROR, ["redis"])
+        assert search.search_l1(["kuberentes"]) == []
+        assert [r["id"] for r in search.search_l1(["kuberentes"], fuzzy=True)] == [frag.id]
+        assert search.search_l1(["kbrnts"], fuzzy=True) == []
+
+    def test_l1_expanded_keyword_counts_once(self, service, search):
+        both = store_frag(service, "Migrate, then verify the migration.", "db", FragmentType.DECISION,
+                          ["migration", "migrate", "postgres"])
+        one = store_frag(service, "Postgres vacuum.", "db", FragmentType.DECISION, ["postgres"])
+        results = search.search_l1(["migra", "postgre"], prefix=True)
+        assert [(r["id"], r["match_count"]) for r in results] == [(both.id, 2), (one.id, 1)]
+        results = search.search_l1(["migra", "postgre"], prefix=True, match_all=True)
+        assert [r["id"] for r in results] == [both.id]
+
+
+class TestCursor:
+    def test_roundtrip(self):
+        token = encode_cursor({"match_count": 2, "importance": 0.85, "id": "frag_abc"})
+        assert decode_cursor(token) == (2, 0.85, "frag_abc")
+
+    @pytest.mark.parametrize("token", ["", "not-a-cursor", "W10", "eyJhIjoxfQ"])
+    def test_invalid_rejected(self, token):
+        with pytest.raises(ValueError):
+            decode_cursor(token)
+
 
 class TestL2Search:
     def test_l2_finds_by_topic(self, service, search):
@@ -100,3 +170,54 @@ class TestL2Search:
         store_frag(service, "API gateway timeout.", "api", FragmentType.ERROR, ["gateway", "timeout"])
         results = search.search_l2(topic="api")
         assert any("gateway" in r.get("keywords", []) for r in results)
+
+
+class TestL3Search:
+    def test_l3_finds_by_content_text(self, service, search):
+        store_frag(service, "Postgres vacuum stalled the nightly batch.", "db", FragmentType.ERROR, ["postgres"])
+        results = search.search_l3("vacuum batch")
+        assert len(results) == 1
+        assert "vacuum" in results[0]["content"]
+
+    def test_l3_stems_terms(self, service, search):
+        store_frag(service, "Deployments failed after migrations ran.", "ops", FragmentType.ERROR, ["deploy"])
+        assert len(search.search_l3("migration")) == 1
+
+    def test_l3_ranks_by_bm25(self, service, search):
+        store_frag(service, "Cache cache cache invalidation everywhere.", "perf", FragmentType.DECISION, ["a"])
+        store_frag(service, "One cache mention in a long note about other topics.", "perf", FragmentType.DECISION, ["b"])
+        results = search.search_l3("cache")
+        assert results[0]["text_score"] >= results[1]["text_score"]
+        assert results[0]["content"].startswith("Cache cache")
+
+    def test_l3_topic_filter(self, service, search):
+        store_frag(service, "Timeout talking to the gateway.", "api", FragmentType.ERROR, ["x"])
+        store_frag(service, "Timeout in the worker queue.", "queue", FragmentType.ERROR, ["y"])
+        results = search.search_l3("timeout", topic="queue")
+        assert [r["topic"] for r in results] == ["queue"]
+
+    def test_l3_ignores_fts_syntax(self, service, search):
+        store_frag(service, "Quoted \"strings\" and NEAR operators.", "misc", FragmentType.DECISION, ["z"])
+        assert len(search.search_l3('strings" OR NEAR(')) == 1
+        assert search.search_l3("***") == []
+
+    def test_l3_index_follows_deletes(self, service, search, store):
+        frag = store_frag(service, "Ephemeral kubernetes note.", "k8s", FragmentType.DECISION, ["k8s"])
+        store.delete_fragment(frag.id)
+        assert search.search_l3("kubernetes") == []
+
+    def test_l3_backfills_existing_database(self, tmp_path):
+        from fogsift_memory_system.schema import initialize_database
+        path = str(tmp_path / "legacy.db")
+        conn = initialize_database(path)
+        conn.execute(
+            "INSERT INTO fragments (id, content, topic, type) VALUES ('f1', 'legacy terraform note', 't', 'decision')"
+        )
+        conn.execute("DROP TABLE fragments_fts")
+        conn.commit()
+        conn.close()
+
+        conn = initialize_database(path)
+        rows = conn.execute("SELECT rowid FROM fragments_fts WHERE fragments_fts MATCH 'terraform'").fetchall()
+        conn.close()
+        assert len(rows) == 1
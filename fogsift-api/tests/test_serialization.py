@@ -0,0 +1,85 @@
+"""Tests for the direct JSON encoding of recall results."""
+
+import json
+
+import pytest
+from fogsift_memory_system.cache import RecallCache
+from fogsift_memory_system.serialization import RecallResult, fragment_payload
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentResponse, FragmentType, LinkCreate, LinkRelationType, RecallRequest,
+)
+
+
+def _seed(service):
+    first = service.remember(FragmentCreate(
+        content="Ünïcode — quotes \" and \\ backslashes  included.", topic="encoding",
+        type=FragmentType.DECISION, keywords=["json", "unicode"],
+        source={"url": "https://example.com/ä", "ratio": 1e-7, "big": 1e16, "nested": [1.5, None, True]},
+    ))
+    second = service.remember(FragmentCreate(
+        content="Plain ascii fragment about json encoding.", topic="encoding",
+        type=FragmentType.ERROR, keywords=["json"], importance=0.123456789,
+    ))
+    service.link(LinkCreate(from_id=first.id, to_id=second.id, relation_type=LinkRelationType.INFORMS))
+    service.store.increment_reference([second.id])  # last_referenced becomes SQLite's naive format
+    return first, second
+
+
+REQUESTS = [
+    RecallRequest(keywords=["json"]),
+    RecallRequest(keywords=["json"], include_links=True),
+    RecallRequest(text="json encoding"),
+    RecallRequest(topic="encoding"),
+    RecallRequest(keywords=["nothing-matches"]),
+]
+
+
+class TestRecallJson:
+    @pytest.mark.parametrize("request_", REQUESTS)
+    def test_bytes_match_the_pydantic_model(self, service, request_):
+        _seed(service)
+        result = service._recall(request_)
+        assert result.to_json() == result.to_response().model_dump_json().encode()
+
+    def test_recall_json_is_the_recall_response(self, service):
+        _seed(service)
+        request = RecallRequest(keywords=["json"], include_links=True)
+        encoded = json.loads(service.recall_json(request))
+        modelled = service.recall(request).model_dump(mode="json")
+        for body in (encoded, modelled):
+            body.pop("query_time_ms")
+            for frag in body["fragments"]:
+                frag.pop("reference_count"), frag.pop("last_referenced")  # Bumped by the first call
+        assert encoded == modelled
+        assert encoded["edges"]
+
+    def test_cache_hits_serve_both_paths(self, store, search):
+        service = MemoryService(store, search, cache=RecallCache())
+        _seed(service)
+        request = RecallRequest(keywords=["json"])
+        first = service.recall_json(request)
+        hit = service.recall(request)
+        assert [f["id"] for f in json.loads(first)["fragments"]] == [f.id for f in hit.fragments]
+        assert service.cache.hits == 1
+
+
+class TestFragmentPayload:
+    def test_keeps_model_field_order_and_drops_search_scores(self, service):
+        first, _ = _seed(service)
+        row = {**service.store.get_fragment(first.id), "match_count": 2, "text_score": 1.5}
+        assert list(fragment_payload(row)) == list(FragmentResponse.model_fields)
+
+    def test_unusual_timestamps_fall_back_to_validation(self, service):
+        first, _ = _seed(service)
+        row = {**service.store.get_fragment(first.id), "created_at": 1_700_000_000}
+        result = RecallResult([row], [], 1, ["L1:1"], 1.0)
+        assert result.to_json() == result.to_response().model_dump_json().encode()
+
+    def test_copies_share_one_validated_response(self, service):
+        _seed(service)
+        result = service._recall(RecallRequest(keywords=["json"]))
+        copy = result.with_query_time(0.5)
+        assert copy.to_response().query_time_ms == 0.5
+        assert result.to_response() is result.to_response()
+        assert copy.to_response().fragments[0] is result.to_response().fragments[0]
@@ -1,12 +1,24 @@
 """Tests for MemoryService business logic."""
 
+import json
+
 import pytest
+import fogsift_memory_system.service as service_module
+from fogsift_memory_system.schema import initialize_database
+from fogsift_memory_system.store import MemoryStore
+from fogsift_memory_system.search import MemorySearch
+from fogsift_memory_system.service import MemoryService
 from fogsift_memory_system.models import (
     FragmentCreate, FragmentType, FragmentResponse,
     RecallRequest, RecallResponse, LinkCreate, LinkRelationType,
 )
 
 
+def _fresh_store_and_search():
+    store = MemoryStore(initialize_database(":memory:"))
+    return store, MemorySearch(store)
+
+
 class TestRemember:
     def test_remember_returns_fragment_response(self, service):
         req = FragmentCreate(
@@ -52,6 +64,23 @@ class TestRemember:
         assert "custom" in result.keywords
         assert "keywords" in result.keywords
 
+    def test_remember_does_not_read_back(self, service, store, monkeypatch):
+        def fail(*args):
+            raise AssertionError("remember() must not re-read the fragment")
+
+        monkeypatch.setattr(store, "get_fragment", fail)
+        service.remember(FragmentCreate(
+            content="No readback.", topic="test", type=FragmentType.DECISION,
+        ))
+
+    @pytest.mark.parametrize("source", [None, {}, {"url": "https://example.com", "n": [1, 2]}])
+    def test_remember_response_matches_stored_row(self, service, store, source):
+        result = service.remember(FragmentCreate(
+            content="Round trip.", topic="test", type=FragmentType.ERROR,
+            keywords=["Beta", "alpha", "beta"], source=source,
+        ))
+        assert result == FragmentResponse(**store.get_fragment(result.id))
+
     def test_importance_defaults_by_type(self, service):
         expected = {
             FragmentType.ERROR: 0.9,
@@ -67,6 +96,37 @@ class TestRemember:
             assert result.importance == expected_importance, f"Failed for {ftype}"
 
 
+class TestRememberBatch:
+    def test_batch_returns_responses_in_order(self, service):
+        reqs = [
+            FragmentCreate(content=f"Batch note {i}.", topic="import", type=FragmentType.DECISION,
+                           keywords=["Import", f"note{i}"])
+            for i in range(3)
+        ]
+        results = service.remember_batch(reqs)
+        assert [r.content for r in results] == [r.content for r in reqs]
+        assert results[0].keywords == ["import", "note0"]
+        assert results[0].importance == 0.7
+
+    def test_batch_matches_stored_rows(self, service, store):
+        results = service.remember_batch([
+            FragmentCreate(content="Stored check.", topic="import", type=FragmentType.ERROR,
+                           source={"client_id": "acme"}),
+        ])
+        stored = FragmentResponse(**store.get_fragment(results[0].id))
+        assert stored.model_dump(exclude={"keywords"}) == results[0].model_dump(exclude={"keywords"})
+        assert sorted(stored.keywords) == sorted(results[0].keywords)
+
+    def test_batch_fragments_are_recallable(self, service):
+        service.remember_batch([
+            FragmentCreate(content="Batch recall.", topic="import", type=FragmentType.ERROR,
+                           keywords=["bulk"])
+            for _ in range(5)
+        ])
+        result = service.recall(RecallRequest(keywords=["bulk"], token_budget=1000))
+        assert len(result.fragments) == 5
+
+
 class TestRecall:
     def test_recall_l1_hit(self, service):
         service.remember(FragmentCreate(
@@ -80,6 +140,23 @@ class TestRecall:
         assert any("L1" in path for path in result.search_path)
         assert len(result.fragments) >= 1
 
+    def test_unreferenced_recall_leaves_reference_counts(self, service):
+        frag = service.remember(FragmentCreate(
+            content="Redis memory OOM.", topic="infra", type=FragmentType.ERROR, keywords=["redis"],
+        ))
+        result = service.recall_unreferenced(RecallRequest(keywords=["redis"]))
+        assert [f["id"] for f in result.fragments] == [frag.id]
+        assert service.store.get_fragment(frag.id)["reference_count"] == 0
+
+    def test_recall_expands_keywords_only_when_asked(self, service):
+        service.remember(FragmentCreate(
+            content="Pods evicted under memory pressure.", topic="k8s", type=FragmentType.ERROR,
+            keywords=["kubernetes", "eviction"],
+        ))
+        assert service.recall(RecallRequest(keywords=["kubernets", "evict"])).fragments == []
+        result = service.recall(RecallRequest(keywords=["kubernets", "evict"], prefix_keywords=True, fuzzy_keywords=True))
+        assert len(result.fragments) == 1
+
     def test_recall_l2_fallback(self, service):
         service.remember(FragmentCreate(
             content="Auth service failing.", topic="auth", type=FragmentType.ERROR,
@@ -89,6 +166,15 @@ class TestRecall:
         assert result.success is True
         assert any("L2" in path for path in result.search_path)
 
+    def test_recall_l3_text_search(self, service):
+        service.remember(FragmentCreate(
+            content="Stripe webhook retries duplicated invoices.", topic="billing",
+            type=FragmentType.ERROR, keywords=["stripe"],
+        ))
+        result = service.recall(RecallRequest(text="duplicated invoices", token_budget=1000))
+        assert "L3:1" in result.search_path
+        assert len(result.fragments) == 1
+
     def test_recall_empty_results_on_no_match(self, service):
         req = RecallRequest(keywords=["absolutely_nonexistent_xyz"], token_budget=500)
         result = service.recall(req)
@@ -140,6 +226,42 @@ class TestRecall:
         result = service.recall(req)
         assert result.query_time_ms >= 0
 
+    def test_recall_pages_l1_matches_with_cursor(self, service, monkeypatch):
+        monkeypatch.setattr(service_module, "L1_LIMIT", 2)
+        ids = {service.remember(FragmentCreate(
+            content=f"Paged note {i}.", topic="paging", type=FragmentType.DECISION,
+            keywords=["paging"],
+        )).id for i in range(5)}
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            result = service.recall(RecallRequest(keywords=["paging"], cursor=cursor))
+            seen.extend(f.id for f in result.fragments)
+            pages += 1
+            cursor = result.next_cursor
+            if cursor is None:
+                break
+        assert pages == 3
+        assert sorted(seen) == sorted(ids)
+
+    def test_cursor_page_skips_other_layers(self, service, monkeypatch):
+        monkeypatch.setattr(service_module, "L1_LIMIT", 1)
+        for i in range(2):
+            service.remember(FragmentCreate(
+                content="Cursor layers text.", topic="paging", type=FragmentType.DECISION,
+                keywords=["layers"],
+            ))
+        first = service.recall(RecallRequest(keywords=["layers"], text="cursor layers"))
+        assert any(p.startswith("L3") for p in first.search_path)
+        second = service.recall(RecallRequest(
+            keywords=["layers"], text="cursor layers", cursor=first.next_cursor,
+        ))
+        assert second.search_path == ["L1:1"]
+
+    def test_invalid_cursor_raises(self, service):
+        with pytest.raises(ValueError):
+            service.recall(RecallRequest(keywords=["x"], cursor="garbage"))
+
 
 class TestForget:
     def test_forget_existing(self, service):
@@ -176,3 +298,54 @@ class TestGetStats:
         assert isinstance(stats.by_type, dict)
         assert isinstance(stats.by_tier, dict)
         assert isinstance(stats.by_topic, dict)
+
+
+class TestExportImport:
+    def _export(self, service, after_id=None):
+        return [json.loads(line) for line in service.export_ndjson(after_id)]
+
+    def test_export_emits_fragments_then_links(self, service, error_fragment, solution_fragment):
+        service.link(LinkCreate(
+            from_id=error_fragment.id, to_id=solution_fragment.id,
+            relation_type=LinkRelationType.RESOLVED_BY,
+        ))
+        records = self._export(service)
+        assert [r["kind"] for r in records] == ["fragment", "fragment", "link"]
+        frag_ids = [r["id"] for r in records if r["kind"] == "fragment"]
+        assert frag_ids == sorted(frag_ids)
+        assert all("keywords" in r for r in records if r["kind"] == "fragment")
+
+    def test_export_resumes_after_fragment_id(self, service, error_fragment, solution_fragment):
+        first_id = min(error_fragment.id, solution_fragment.id)
+        records = self._export(service, after_id=first_id)
+        assert [r["id"] for r in records] == [max(error_fragment.id, solution_fragment.id)]
+
+    def test_roundtrip_into_empty_store(self, service, error_fragment, solution_fragment):
+        service.link(LinkCreate(
+            from_id=error_fragment.id, to_id=solution_fragment.id,
+            relation_type=LinkRelationType.RESOLVED_BY,
+        ))
+        records = self._export(service)
+
+        target = MemoryService(*_fresh_store_and_search())
+        result = target.import_records(records)
+        assert (result.fragments, result.links, result.skipped) == (2, 1, 0)
+        assert self._export(target) == records
+
+    def test_import_is_idempotent(self, service, error_fragment):
+        records = self._export(service)
+        result = service.import_records(records)
+        assert result.fragments == 0
+        assert result.skipped == 1
+
+    def test_import_skips_links_to_missing_fragments(self, service):
+        result = service.import_records([{
+            "kind": "link", "id": "link_orphan", "from_id": "frag_a", "to_id": "frag_b",
+            "relation_type": "related", "created_at": "2026-01-01 00:00:00",
+        }])
+        assert result.links == 0
+        assert result.skipped == 1
+
+    def test_import_rejects_unknown_kind(self, service):
+        with pytest.raises(ValueError):
+            service.import_records([{"kind": "bogus"}])
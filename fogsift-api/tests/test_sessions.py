@@ -0,0 +1,126 @@
+"""Tests for session-scoped fragments and the SessionSweeper."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from fogsift_memory_system.sessions import SessionSweeper
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, LinkCreate, LinkRelationType,
+)
+
+
+def _remember(service, session_id=None, scope="session", content="Session note."):
+    return service.remember(FragmentCreate(
+        content=content, topic="sessions", type=FragmentType.DECISION,
+        scope=scope, session_id=session_id, keywords=["session"],
+    ))
+
+
+class TestSessionFragments:
+    def test_session_id_requires_session_scope(self):
+        with pytest.raises(ValidationError):
+            FragmentCreate(
+                content="x", topic="t", type=FragmentType.ERROR,
+                scope="permanent", session_id="s1",
+            )
+
+    def test_session_id_is_stored(self, service):
+        frag = _remember(service, session_id="s1")
+        assert frag.session_id == "s1"
+
+    def test_end_session_reports_pending(self, service):
+        _remember(service, session_id="s1")
+        _remember(service, session_id="s1")
+        result = service.end_session("s1")
+        assert result.pending_fragments == 2
+
+
+class TestSessionSweeper:
+    def test_sweeps_only_ended_sessions(self, service, store):
+        ended = _remember(service, session_id="done")
+        live = _remember(service, session_id="live")
+        permanent = _remember(service, scope="permanent")
+        service.end_session("done")
+
+        result = SessionSweeper(store).run_once()
+        assert result["ended_sessions"] == 1
+        assert store.get_fragment(ended.id) is None
+        assert store.get_fragment(live.id) is not None
+        assert store.get_fragment(permanent.id) is not None
+
+    def test_sweep_cascades_keywords_and_links(self, service, store, db):
+        frag = _remember(service, session_id="done")
+        other = _remember(service, scope="permanent")
+        service.link(LinkCreate(from_id=frag.id, to_id=other.id, relation_type=LinkRelationType.RELATED))
+        service.end_session("done")
+        SessionSweeper(store).run_once()
+        assert db.execute("SELECT COUNT(*) FROM keywords WHERE fragment_id = ?", (frag.id,)).fetchone()[0] == 0
+        assert db.execute("SELECT COUNT(*) FROM links").fetchone()[0] == 0
+
+    def test_sweeps_in_bounded_batches(self, service, store):
+        for _ in range(5):
+            _remember(service, session_id="big")
+        service.end_session("big")
+        batches = []
+        sweeper = SessionSweeper(store, batch_size=2, max_batches=2, on_delete=batches.append)
+        assert sweeper.run_once()["ended_sessions"] == 4
+        assert [len(b) for b in batches] == [2, 2]
+        assert sweeper.run_once()["ended_sessions"] == 1
+
+    def test_ended_session_row_removed_once_empty(self, service, store, db):
+        _remember(service, session_id="done")
+        service.end_session("done")
+        SessionSweeper(store).run_once()
+        assert db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 0
+
+    def test_orphan_session_fragments_expire(self, service, store):
+        frag = _remember(service)
+        sweeper = SessionSweeper(store, orphan_ttl_hours=24)
+        assert sweeper.run_once()["orphaned"] == 0
+        later = datetime.now(timezone.utc) + timedelta(hours=25)
+        assert sweeper.run_once(now=later)["orphaned"] == 1
+        assert store.get_fragment(frag.id) is None
+
+    def test_idle_sessions_expire(self, service, store):
+        frag = _remember(service, session_id="abandoned")
+        sweeper = SessionSweeper(store, idle_ttl_hours=12)
+        assert sweeper.run_once()["idle_sessions"] == 0
+        later = datetime.now(timezone.utc) + timedelta(hours=13)
+        assert sweeper.run_once(now=later)["idle_sessions"] == 1
+        assert store.get_fragment(frag.id) is None
+
+    def test_sweep_invalidates_recall_cache(self, store, search):
+        from fogsift_memory_system.cache import RecallCache
+        from fogsift_memory_system.service import MemoryService
+        from fogsift_memory_system.models import RecallRequest
+        cache = RecallCache()
+        service = MemoryService(store, search, cache)
+        _remember(service, session_id="done")
+        req = RecallRequest(keywords=["session"])
+        assert len(service.recall(req).fragments) == 1
+        service.end_session("done")
+        SessionSweeper(store, on_delete=cache.invalidate_fragments).run_once()
+        assert service.recall(req).fragments == []
+
+
+class TestIdleSessions:
+    def test_recent_activity_keeps_the_whole_session(self, service, store, db):
+        old = _remember(service, session_id="s1")
+        _remember(service, session_id="s1")
+        db.execute(
+            "UPDATE fragments SET created_at = datetime('now', '-1 day'), "
+            "last_referenced = datetime('now', '-1 day') WHERE id = ?", (old.id,)
+        )
+        sweeper = SessionSweeper(store, idle_ttl_hours=12)
+        assert sweeper.run_once()["idle_sessions"] == 0
+        assert store.get_fragment(old.id) is not None
+
+    def test_recall_counts_as_activity(self, service, store, db):
+        frag = _remember(service, session_id="s1")
+        db.execute("UPDATE fragments SET created_at = datetime('now', '-1 day') WHERE id = ?", (frag.id,))
+        sweeper = SessionSweeper(store, idle_ttl_hours=12)
+        store.increment_reference([frag.id])
+        assert sweeper.run_once()["idle_sessions"] == 0
+        db.execute("UPDATE fragments SET last_referenced = '2020-01-01T00:00:00+00:00' WHERE id = ?", (frag.id,))
+        assert sweeper.run_once()["idle_sessions"] == 1
@@ -0,0 +1,267 @@
+"""Tests for tenant/topic sharding and fan-out recall."""
+
+import json
+import sqlite3
+
+import pytest
+from fogsift_memory_system.async_service import AsyncMemoryService
+from fogsift_memory_system.metrics import Metrics, RECALL_SECONDS
+from fogsift_memory_system.sharding import ShardLimitReached, ShardRouter, ShardedMemoryService, UnknownTenant
+from fogsift_memory_system.models import (
+    FragmentCreate, FragmentType, LinkCreate, LinkRelationType, RecallRequest,
+)
+
+
+def _fragment(topic="infra", keywords=("redis",), content="Redis notes.", **kwargs):
+    return FragmentCreate(
+        content=content, topic=topic, type=FragmentType.DECISION, keywords=list(keywords), **kwargs
+    )
+
+
+@pytest.fixture
+def tenant_service(tmp_path):
+    service = ShardedMemoryService(ShardRouter(str(tmp_path), mode="tenant"))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def topic_service(tmp_path):
+    service = ShardedMemoryService(ShardRouter(str(tmp_path), mode="topic", topic_shards=4))
+    yield service
+    service.close()
+
+
+class TestShardRouter:
+    def test_tenants_get_their_own_files(self, tmp_path, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment())
+        tenant_service.remember(_fragment())
+        assert sorted(p.name for p in tmp_path.glob("*.db")) == ["acme.db", "default.db"]
+
+    def test_existing_shards_are_reopened(self, tmp_path, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment())
+        tenant_service.close()
+        reopened = ShardRouter(str(tmp_path), mode="tenant")
+        assert [s.name for s in reopened.shards()] == ["acme"]
+        reopened.close()
+
+    def test_rejects_unsafe_tenant_ids(self, tenant_service):
+        with pytest.raises(ValueError):
+            tenant_service.for_tenant("../etc")
+
+    def test_default_shard_is_not_a_tenant(self, tenant_service):
+        tenant_service.remember(_fragment(content="Untenanted redis."))
+        for create in (True, False):
+            with pytest.raises(ValueError):
+                tenant_service.for_tenant("default", create)
+
+    def test_reads_never_create_shards(self, tmp_path, tenant_service):
+        with pytest.raises(UnknownTenant):
+            tenant_service.for_tenant("ghost", create=False).recall(RecallRequest(keywords=["redis"]))
+        assert list(tmp_path.glob("*.db")) == []
+        tenant_service.for_tenant("acme").remember(_fragment())
+        assert tenant_service.for_tenant("acme", create=False).recall(RecallRequest(keywords=["redis"])).fragments
+
+    def test_allow_list(self, tmp_path):
+        service = ShardedMemoryService(ShardRouter(str(tmp_path), mode="tenant", tenants=["acme"]))
+        service.for_tenant("acme").remember(_fragment())
+        with pytest.raises(UnknownTenant):
+            service.for_tenant("globex")
+        assert [p.name for p in tmp_path.glob("*.db")] == ["acme.db"]
+        service.close()
+
+    def test_max_shards(self, tmp_path):
+        service = ShardedMemoryService(ShardRouter(str(tmp_path), mode="tenant", max_shards=2))
+        service.for_tenant("a").remember(_fragment())
+        service.for_tenant("b").remember(_fragment())
+        with pytest.raises(ShardLimitReached):
+            service.for_tenant("c")
+        service.for_tenant("a").remember(_fragment())  # Existing shards are still served
+        assert len(list(tmp_path.glob("*.db"))) == 2
+        service.close()
+
+    def test_pool_size_is_configurable(self, tmp_path):
+        router = ShardRouter(str(tmp_path), mode="tenant", pool_size=3)
+        assert router.for_tenant("acme").service.store.pool_metrics()["size"] == 3
+        router.close()
+
+    def test_topic_hash_is_stable(self, tmp_path):
+        router = ShardRouter(str(tmp_path), mode="topic", topic_shards=4)
+        assert len(router.shards()) == 4
+        assert router.for_topic("infra") is router.for_topic("infra")
+        router.close()
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            ShardRouter(str(tmp_path), mode="client")
+
+
+class TestTenantSharding:
+    def test_tenant_recall_is_isolated(self, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment(content="Acme redis."))
+        tenant_service.for_tenant("globex").remember(_fragment(content="Globex redis."))
+        result = tenant_service.for_tenant("acme").recall(RecallRequest(keywords=["redis"]))
+        assert [f.content for f in result.fragments] == ["Acme redis."]
+
+    def test_recall_without_tenant_fans_out(self, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment(content="Acme redis."))
+        tenant_service.for_tenant("globex").remember(_fragment(content="Globex redis."))
+        result = tenant_service.recall(RecallRequest(keywords=["redis"]))
+        assert sorted(f.content for f in result.fragments) == ["Acme redis.", "Globex redis."]
+        assert result.search_path == ["L1:2"]
+
+    def test_fan_out_respects_the_budget(self, tenant_service):
+        for tenant in ("a", "b", "c"):
+            tenant_service.for_tenant(tenant).remember(_fragment(content="word " * 300))
+        result = tenant_service.recall(RecallRequest(keywords=["redis"], token_budget=500))
+        assert len(result.fragments) == 1
+        assert result.total_tokens == 300
+
+    def test_fan_out_references_only_returned_fragments(self, tenant_service):
+        written = {
+            tenant: tenant_service.for_tenant(tenant).remember(_fragment(content="word " * 300)).id
+            for tenant in ("a", "b", "c")
+        }
+        result = tenant_service.recall(RecallRequest(keywords=["redis"], token_budget=500))
+        counts = {
+            tenant: tenant_service.for_tenant(tenant).store.get_fragment(frag_id)["reference_count"]
+            for tenant, frag_id in written.items()
+        }
+        [returned] = [tenant for tenant, frag_id in written.items() if frag_id == result.fragments[0].id]
+        assert counts == {tenant: int(tenant == returned) for tenant in written}
+
+    def test_fan_out_json_matches_the_model(self, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment())
+        tenant_service.for_tenant("globex").remember(_fragment())
+        request = RecallRequest(keywords=["redis"])
+        encoded = json.loads(tenant_service.recall_json(request))
+        modelled = tenant_service.recall(request)  # References bumped by the first call may reorder ties
+        assert sorted(f["id"] for f in encoded["fragments"]) == sorted(f.id for f in modelled.fragments)
+        assert encoded["search_path"] == modelled.search_path == ["L1:2"]
+
+    def test_cursor_pages_through_every_shard_once(self, tenant_service):
+        for tenant in ("acme", "globex"):
+            tenant_service.for_tenant(tenant).remember_batch([
+                _fragment(keywords=["redis"] + (["cluster"] if i % 3 == 0 else []), importance=i / 40)
+                for i in range(40)
+            ])
+        seen, cursor = [], None
+        while True:
+            page = tenant_service.recall(RecallRequest(
+                keywords=["redis", "cluster"], token_budget=50_000, cursor=cursor,
+            ))
+            seen += [f.id for f in page.fragments]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 80
+
+
+class TestTopicSharding:
+    def test_topic_recall_reads_one_shard(self, topic_service):
+        topic_service.remember(_fragment(topic="infra"))
+        shard = topic_service.router.for_topic("infra")
+        calls = []
+        original = shard.service.recall
+        shard.service.recall = lambda request: calls.append(request) or original(request)
+        result = topic_service.recall(RecallRequest(topic="infra"))
+        assert len(result.fragments) == 1 and len(calls) == 1
+
+    def test_batch_keeps_request_order(self, topic_service):
+        topics = [f"topic-{i}" for i in range(12)]
+        responses = topic_service.remember_batch([_fragment(topic=t) for t in topics])
+        assert [r.topic for r in responses] == topics
+        assert len({topic_service.router.for_topic(t).name for t in topics}) > 1
+
+    def test_id_operations_find_the_shard(self, topic_service):
+        first = topic_service.remember(_fragment(topic="alpha"))
+        second = topic_service.remember(_fragment(topic="alpha"))
+        topic_service.link(LinkCreate(
+            from_id=first.id, to_id=second.id, relation_type=LinkRelationType.INFORMS,
+        ))
+        assert [f.id for f in topic_service.graph(first.id).fragments] == [first.id, second.id]
+        assert topic_service.forget(first.id)
+        assert not topic_service.forget(first.id)
+        assert topic_service.graph(first.id) is None
+
+    def test_cross_shard_links_are_rejected(self, topic_service):
+        topics = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        by_shard = {topic_service.router.for_topic(t).name: t for t in topics}
+        assert len(by_shard) > 1
+        one, other = [topic_service.remember(_fragment(topic=t)) for t in list(by_shard.values())[:2]]
+        with pytest.raises(sqlite3.IntegrityError):
+            topic_service.link(LinkCreate(
+                from_id=one.id, to_id=other.id, relation_type=LinkRelationType.INFORMS,
+            ))
+
+    def test_export_import_round_trip(self, tmp_path, topic_service):
+        fragments = topic_service.remember_batch([_fragment(topic=f"t{i}") for i in range(10)])
+        topic_service.link(LinkCreate(
+            from_id=fragments[0].id, to_id=fragments[0].id, relation_type=LinkRelationType.INFORMS,
+        ))
+        records = [json.loads(line) for line in topic_service.export_ndjson()]
+
+        target = ShardedMemoryService(ShardRouter(str(tmp_path / "copy"), mode="topic", topic_shards=4))
+        result = target.import_records(records)
+        assert (result.fragments, result.links, result.skipped) == (10, 1, 0)
+        assert target.get_stats().by_topic == topic_service.get_stats().by_topic
+        target.close()
+
+    def test_export_resumes_inside_a_shard(self, topic_service):
+        topic_service.remember_batch([_fragment(topic=f"t{i}") for i in range(10)])
+        ids = [json.loads(line)["id"] for line in topic_service.export_ndjson()]
+        resumed = [json.loads(line)["id"] for line in topic_service.export_ndjson(ids[4])]
+        assert resumed == ids[5:]
+        with pytest.raises(ValueError):
+            topic_service.export_ndjson("frag_missing")
+
+
+class TestShardStats:
+    def test_stats_are_summed_across_shards(self, tenant_service):
+        tenant_service.for_tenant("acme").remember(_fragment(topic="infra"))
+        tenant_service.for_tenant("globex").remember(_fragment(topic="infra"))
+        tenant_service.remember(_fragment(topic="billing"))
+        stats = tenant_service.get_stats(detailed=True)
+        assert stats.total_fragments == 3
+        assert stats.by_topic == {"infra": 2, "billing": 1}
+        assert stats.by_reference_count == {"0": 3}
+
+    def test_shard_stats(self, tenant_service):
+        tenant_service.for_tenant("acme").remember_batch([_fragment(), _fragment()])
+        tenant_service.remember(_fragment())
+        shards = {s.name: s for s in tenant_service.shard_stats().shards}
+        assert {name: s.total_fragments for name, s in shards.items()} == {"acme": 2, "default": 1}
+        assert shards["acme"].size_bytes > 0
+        assert shards["acme"].pool.writer.checkouts >= 1
+        assert tenant_service.get_pool_stats().size == sum(s.pool.size for s in shards.values())
+
+    def test_metrics_are_labelled_by_shard(self, tmp_path):
+        service = ShardedMemoryService(ShardRouter(str(tmp_path)), metrics=Metrics())
+        service.for_tenant("acme").remember(_fragment())
+        service.for_tenant("globex").remember(_fragment())
+        service.recall(RecallRequest(keywords=["redis"]))
+        text = service.render_metrics()
+        assert 'fogsift_pool_checkouts_total{role="writer",shard="acme"}' in text
+        assert service.metrics.snapshot()[RECALL_SECONDS][(("cache", "fanout"),)]["count"] == 1
+        service.close()
+
+
+class TestAsyncTenants:
+    def test_tenant_view_shares_the_executor(self, tenant_service):
+        facade = AsyncMemoryService(tenant_service)
+        view = facade.for_tenant("acme")
+        assert view.service is tenant_service.for_tenant("acme")
+        assert view._executor is facade._executor
+        facade.shutdown()
+
+    def test_unknown_tenant_reads_raise(self, tmp_path, tenant_service):
+        facade = AsyncMemoryService(tenant_service)
+        with pytest.raises(UnknownTenant):
+            facade.for_tenant("ghost", create=False)
+        assert list(tmp_path.glob("*.db")) == []
+        facade.shutdown()
+
+    def test_unsharded_service_ignores_tenants(self, service):
+        facade = AsyncMemoryService(service)
+        assert facade.for_tenant("acme") is facade
+        facade.shutdown()
@@ -2,6 +2,7 @@
 
 import pytest
 from datetime import datetime, timezone
+from fogsift_memory_system.store import normalize_keywords
 
 
 def _frag_data(fragment_id="frag_test001"):
@@ -59,6 +60,65 @@ class TestCreateFragment:
         assert result["keywords"] == []
 
 
+class TestCreateFragments:
+    def test_batch_inserts_all(self, store):
+        frags = [_frag_data(f"frag_b{i}") for i in range(3)]
+        written = store.create_fragments(frags, [["redis"], ["redis", "Cluster"], []])
+        assert written == 3
+        assert sorted(store.get_fragment("frag_b1")["keywords"]) == ["cluster", "redis"]
+        assert store.get_fragment("frag_b2")["keywords"] == []
+
+    def test_batch_is_atomic(self, store):
+        frags = [_frag_data("frag_dup"), _frag_data("frag_dup")]
+        with pytest.raises(Exception):
+            store.create_fragments(frags, [["a"], ["b"]])
+        assert store.get_fragment("frag_dup") is None
+
+
+    def test_ignore_existing_skips_duplicates(self, store):
+        store.create_fragment(_frag_data("frag_seen"), ["a"])
+        written = store.create_fragments(
+            [_frag_data("frag_seen"), _frag_data("frag_new")], [["a"], ["b"]],
+            ignore_existing=True,
+        )
+        assert written == 1
+        assert store.get_fragment("frag_new") is not None
+
+    def test_ignore_existing_leaves_skipped_keywords_alone(self, store, search):
+        store.create_fragment(_frag_data("frag_seen"), ["a"])
+        written = store.create_fragments(
+            [_frag_data("frag_seen"), _frag_data("frag_new"), _frag_data("frag_new")],
+            [["a", "stray"], ["b"], ["dup"]],
+            ignore_existing=True,
+        )
+        assert written == 1
+        assert store.get_fragment("frag_seen")["keywords"] == ["a"]
+        assert store.get_fragment("frag_new")["keywords"] == ["b"]
+        assert search.search_l1(["stray", "dup"]) == []
+
+
+class TestIterFragments:
+    def test_pages_through_all_fragments_in_id_order(self, store):
+        for i in range(7):
+            store.create_fragment(_frag_data(f"frag_p{i}"), [f"kw{i}"])
+        frags = list(store.iter_fragments(batch_size=3))
+        assert [f["id"] for f in frags] == [f"frag_p{i}" for i in range(7)]
+        assert frags[4]["keywords"] == ["kw4"]
+
+    def test_after_id_resumes(self, store):
+        for i in range(3):
+            store.create_fragment(_frag_data(f"frag_r{i}"), [])
+        assert [f["id"] for f in store.iter_fragments(after_id="frag_r0")] == ["frag_r1", "frag_r2"]
+
+
+class TestNormalizeKeywords:
+    def test_lowercases_dedupes_and_preserves_order(self):
+        assert normalize_keywords(["Redis", "cluster", "REDIS"]) == ["redis", "cluster"]
+
+    def test_truncates_to_stored_length(self):
+        assert normalize_keywords(["k" * 150]) == ["k" * 100]
+
+
 class TestGetFragment:
     def test_missing_returns_none(self, store):
         assert store.get_fragment("nonexistent") is None
@@ -149,3 +209,67 @@ class TestGetStats:
         assert stats["total_fragments"] == 2
         assert stats["by_type"]["error"] == 1
         assert stats["by_type"]["decision"] == 1
+
+
+def _scanned_stats(db):
+    """What the old full-scan get_stats computed, for comparison."""
+    return {
+        "total_fragments": db.execute("SELECT COUNT(*) FROM fragments").fetchone()[0],
+        "by_type": dict(db.execute("SELECT type, COUNT(*) FROM fragments GROUP BY type").fetchall()),
+        "by_tier": dict(db.execute("SELECT ttl_tier, COUNT(*) FROM fragments GROUP BY ttl_tier").fetchall()),
+        "by_topic": dict(db.execute("SELECT topic, COUNT(*) FROM fragments GROUP BY topic").fetchall()),
+    }
+
+
+class TestIncrementalStats:
+    def _seed(self, store):
+        for i, (ftype, topic) in enumerate([("error", "a"), ("decision", "a"), ("decision", "b")]):
+            data = _frag_data(f"frag_inc{i}")
+            data.update(type=ftype, topic=topic)
+            store.create_fragment(data, [])
+
+    def _counters(self, store):
+        stats = store.get_stats()
+        return {k: stats[k] for k in ("total_fragments", "by_type", "by_tier", "by_topic")}
+
+    def test_counters_follow_inserts_and_deletes(self, db, store):
+        self._seed(store)
+        store.delete_fragment("frag_inc0")
+        assert self._counters(store) == _scanned_stats(db)
+        assert "error" not in store.get_stats()["by_type"]  # Empty buckets disappear
+
+    def test_counters_follow_tier_changes(self, db, store):
+        self._seed(store)
+        db.execute("UPDATE fragments SET ttl_tier = 'cold' WHERE id = 'frag_inc1'")
+        assert store.get_stats()["by_tier"] == {"hot": 2, "cold": 1}
+        assert self._counters(store) == _scanned_stats(db)
+
+    def test_reference_distribution_is_detailed_only(self, store):
+        self._seed(store)
+        for _ in range(10):
+            store.increment_reference(["frag_inc0"])
+        store.increment_reference(["frag_inc1"])
+        assert "by_reference_count" not in store.get_stats()
+        assert store.get_stats(detailed=True)["by_reference_count"] == {"0": 1, "1-9": 1, "10-99": 1}
+
+    def test_rebuild_matches_triggers(self, db, store):
+        self._seed(store)
+        before = store.get_stats(detailed=True)
+        db.execute("DELETE FROM fragment_stats")
+        store.rebuild_stats()
+        assert store.get_stats(detailed=True) == before
+
+    def test_existing_database_is_backfilled(self, tmp_path):
+        from fogsift_memory_system.schema import initialize_database
+        from fogsift_memory_system.store import MemoryStore
+
+        path = str(tmp_path / "legacy.db")
+        conn = initialize_database(path)
+        MemoryStore(conn).create_fragment(_frag_data("frag_old"), [])
+        conn.execute("DROP TABLE fragment_stats")  # As if written before the counters existed
+        conn.commit()
+        conn.close()
+
+        conn = initialize_database(path)
+        assert MemoryStore(conn).get_stats()["total_fragments"] == 1
+        conn.close()
@@ -0,0 +1,105 @@
+"""Tests for the TTL tier lifecycle (demotion job, promotion on access, tiered L2)."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import fogsift_memory_system.service as service_module
+from fogsift_memory_system.tiering import TierPolicy, TieringJob
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def _remember(service, content="Tier test.", topic="tiers", keywords=None):
+    return service.remember(FragmentCreate(
+        content=content, topic=topic, type=FragmentType.DECISION, keywords=keywords,
+    ))
+
+
+def _age(db, frag_id, days, refs=0, fmt="iso"):
+    ts = NOW - timedelta(days=days)
+    value = ts.isoformat() if fmt == "iso" else ts.strftime("%Y-%m-%d %H:%M:%S")
+    db.execute(
+        "UPDATE fragments SET last_referenced = ?, reference_count = ? WHERE id = ?",
+        (value, refs, frag_id),
+    )
+    db.commit()
+
+
+def _tier(store, frag_id):
+    return store.get_fragment(frag_id)["ttl_tier"]
+
+
+class TestTierPolicy:
+    def test_cold_before_warm_rejected(self):
+        with pytest.raises(ValueError):
+            TierPolicy(warm_after_days=10, cold_after_days=5)
+
+
+class TestTieringJob:
+    def test_recent_fragments_stay_hot(self, store, service, db):
+        frag = _remember(service)
+        _age(db, frag.id, days=1)
+        TieringJob(store).run_once(now=NOW)
+        assert _tier(store, frag.id) == "hot"
+
+    def test_idle_fragment_demoted_to_warm(self, store, service, db):
+        frag = _remember(service)
+        _age(db, frag.id, days=10)
+        result = TieringJob(store).run_once(now=NOW)
+        assert result == {"hot->warm": 1, "warm->cold": 0}
+        assert _tier(store, frag.id) == "warm"
+
+    def test_long_idle_fragment_demoted_to_cold(self, store, service, db):
+        frag = _remember(service)
+        _age(db, frag.id, days=45, fmt="sqlite")
+        TieringJob(store).run_once(now=NOW)
+        assert _tier(store, frag.id) == "cold"
+
+    def test_frequently_referenced_fragment_stays_warm(self, store, service, db):
+        frag = _remember(service)
+        _age(db, frag.id, days=45, refs=25)
+        TieringJob(store).run_once(now=NOW)
+        assert _tier(store, frag.id) == "warm"
+
+    def test_demotes_in_bounded_batches(self, store, service, db):
+        frags = [_remember(service, content=f"Batch {i}.") for i in range(5)]
+        for f in frags:
+            _age(db, f.id, days=10)
+        changed = []
+        job = TieringJob(store, batch_size=2, on_change=changed.append)
+        assert job.run_once(now=NOW)["hot->warm"] == 5
+        assert [len(batch) for batch in changed] == [2, 2, 1]
+
+    def test_access_promotes_back_to_hot(self, store, service, db):
+        frag = _remember(service, keywords=["promote"])
+        _age(db, frag.id, days=45)
+        TieringJob(store).run_once(now=NOW)
+        service.recall(RecallRequest(keywords=["promote"]))
+        assert _tier(store, frag.id) == "hot"
+
+
+class TestTieredRecall:
+    def test_l2_scans_hot_and_warm_before_cold(self, store, service, db, monkeypatch):
+        monkeypatch.setattr(service_module, "L2_LIMIT", 1)
+        cold = _remember(service, content="Cold but important.")
+        db.execute("UPDATE fragments SET ttl_tier = 'cold', importance = 1.0 WHERE id = ?", (cold.id,))
+        db.commit()
+        hot = _remember(service, content="Hot fragment.")
+        result = service.recall(RecallRequest(topic="tiers"))
+        assert [f.id for f in result.fragments] == [hot.id]
+
+    def test_cold_tier_fills_remaining_l2_slots(self, store, service, db):
+        cold = _remember(service, content="Cold fragment.")
+        db.execute("UPDATE fragments SET ttl_tier = 'cold' WHERE id = ?", (cold.id,))
+        db.commit()
+        hot = _remember(service, content="Hot fragment.")
+        result = service.recall(RecallRequest(topic="tiers"))
+        assert {f.id for f in result.fragments} == {hot.id, cold.id}
+
+    def test_include_cold_false_skips_cold(self, store, service, db):
+        cold = _remember(service, content="Cold fragment.")
+        db.execute("UPDATE fragments SET ttl_tier = 'cold' WHERE id = ?", (cold.id,))
+        db.commit()
+        result = service.recall(RecallRequest(topic="tiers", include_cold=False))
+        assert result.fragments == []
@@ -0,0 +1,93 @@
+"""Tests for token counting, persistence and budget enforcement."""
+
+import sqlite3
+
+from fogsift_memory_system.schema import initialize_database
+from fogsift_memory_system.store import MemoryStore
+from fogsift_memory_system.service import MemoryService
+from fogsift_memory_system.tokens import ApproxTokenizer, backfill_token_counts
+from fogsift_memory_system.models import FragmentCreate, FragmentType, RecallRequest
+
+
+class _WordTokenizer:
+    name = "words"
+
+    def count(self, text):
+        return len(text.split())
+
+
+def _remember(service, content, topic="tokens"):
+    return service.remember(FragmentCreate(
+        content=content, topic=topic, type=FragmentType.DECISION, keywords=["tok"],
+    ))
+
+
+class TestApproxTokenizer:
+    def test_prose(self):
+        assert ApproxTokenizer().count("Use a queue for jobs") == 5
+
+    def test_code_costs_more_than_length_estimate(self):
+        code = "if(x){y[0]=f(a,b);}"
+        assert ApproxTokenizer().count(code) > len(code) // 4
+
+    def test_empty(self):
+        assert ApproxTokenizer().count("") == 0
+
+
+class TestTokenCountPersistence:
+    def test_count_stored_at_remember(self, service, store):
+        frag = _remember(service, "Cache the tenant lookup")
+        assert frag.token_count == 4
+        assert store.get_fragment(frag.id)["token_count"] == 4
+
+    def test_total_tokens_uses_stored_counts(self, store, search):
+        service = MemoryService(store, search, tokenizer=_WordTokenizer())
+        _remember(service, "one two three")
+        _remember(service, "four five")
+        result = service.recall(RecallRequest(keywords=["tok"]))
+        assert result.total_tokens == 5
+
+    def test_migration_adds_column(self, tmp_path):
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE fragments (id TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                     "topic TEXT NOT NULL, type TEXT NOT NULL, importance REAL, scope TEXT, "
+                     "ttl_tier TEXT, created_at TIMESTAMP, last_referenced TIMESTAMP, "
+                     "reference_count INTEGER, source JSON)")
+        conn.execute("INSERT INTO fragments VALUES ('frag_old', 'legacy row here', 't', 'error', "
+                     "0.5, 'permanent', 'hot', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 0, NULL)")
+        conn.commit()
+        conn.close()
+
+        db = initialize_database(path)
+        store = MemoryStore(db)
+        assert store.get_fragment("frag_old")["token_count"] is None
+        assert backfill_token_counts(store, ApproxTokenizer()) == 1
+        assert store.get_fragment("frag_old")["token_count"] == 3
+        db.close()
+
+    def test_tokenizer_change_recounts(self, service, store):
+        frag = _remember(service, "alpha beta gamma")
+        backfill_token_counts(store, ApproxTokenizer())
+        assert backfill_token_counts(store, ApproxTokenizer()) == 0
+        assert backfill_token_counts(store, _WordTokenizer()) == 1
+        assert store.get_fragment(frag.id)["token_count"] == 3
+
+
+class TestL2BudgetCut:
+    def test_rows_cut_at_budget_in_sql(self, store, search):
+        service = MemoryService(store, search, tokenizer=_WordTokenizer())
+        for _ in range(10):
+            _remember(service, " ".join(["word"] * 40), topic="wide")
+        rows = search.search_l2("wide", token_budget=100)
+        assert len(rows) == 3  # 0, 40, 80 tokens spent before each; the 4th starts at 120
+
+    def test_oversized_rows_skipped_not_blocking(self, store, search):
+        service = MemoryService(store, search, tokenizer=_WordTokenizer())
+        service.remember(FragmentCreate(
+            content=" ".join(["big"] * 500), topic="mixed", type=FragmentType.PREFERENCE,
+        ))
+        small = _remember(service, "small note", topic="mixed")
+        result = service.recall(RecallRequest(topic="mixed", token_budget=100))
+        assert [f.id for f in result.fragments] == [small.id]
+        assert result.total_tokens == 2
@@ -0,0 +1,94 @@
+"""Tests for the keyword vocabulary behind prefix and fuzzy L1 matching."""
+
+import random
+
+import pytest
+from fogsift_memory_system.vocabulary import (
+    MAX_FUZZY_EXPANSIONS, KeywordVocabulary, edit_distance, keyword_matches, max_edits,
+)
+
+
+def _osa(a, b):
+    """Textbook optimal string alignment distance, as the reference."""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+class TestEditDistance:
+    @pytest.mark.parametrize("a,b,expected", [
+        ("migration", "migration", 0), ("migration", "migratoin", 1), ("redis", "redsi", 1),
+        ("kubernetes", "kubernets", 1), ("cache", "cached", 1), ("", "abc", 3), ("ca", "abc", 3),
+    ])
+    def test_known_distances(self, a, b, expected):
+        assert edit_distance(a, b, 5) == expected
+
+    def test_matches_reference_within_bound(self):
+        rng = random.Random(5)
+        for _ in range(2000):
+            a = "".join(rng.choices("abcd", k=rng.randint(0, 8)))
+            b = "".join(rng.choices("abcd", k=rng.randint(0, 8)))
+            for bound in (0, 1, 2):
+                assert edit_distance(a, b, bound) == min(_osa(a, b), bound + 1)
+
+    @pytest.mark.parametrize("keyword,edits", [("api", 0), ("redis", 1), ("postgres", 1), ("migration", 2)])
+    def test_max_edits_grows_with_length(self, keyword, edits):
+        assert max_edits(keyword) == edits
+
+
+class TestKeywordVocabulary:
+    @pytest.fixture
+    def vocabulary(self):
+        vocabulary = KeywordVocabulary()
+        vocabulary.add(["migration", "migrate", "migrations-plan", "integration", "redis", "rebase", "api"])
+        return vocabulary
+
+    def test_add_ignores_known_and_empty_keywords(self, vocabulary):
+        vocabulary.add(["redis", "", "kafka"])
+        assert len(vocabulary) == 8
+
+    def test_with_prefix_is_a_sorted_range(self, vocabulary):
+        assert vocabulary.with_prefix("migra") == ["migrate", "migration", "migrations-plan"]
+        assert vocabulary.with_prefix("zzz") == []
+
+    def test_similar_orders_by_distance(self, vocabulary):
+        vocabulary.add(["migrations"])
+        assert vocabulary.similar("migratoin") == ["migration", "migrations"]
+        assert vocabulary.similar("redsi") == ["redis"]
+        assert vocabulary.similar("apj") == []  # Too short to be fuzzy
+
+    def test_similar_is_capped(self):
+        vocabulary = KeywordVocabulary()
+        vocabulary.add(f"service{i:02d}" for i in range(100))
+        assert len(vocabulary.similar("service00")) == MAX_FUZZY_EXPANSIONS
+
+    def test_similar_agrees_with_a_full_scan(self):
+        rng = random.Random(11)
+        words = {"".join(rng.choices("abcdefgh", k=rng.randint(4, 10))) for _ in range(1500)}
+        vocabulary = KeywordVocabulary()
+        vocabulary.add(words)
+        for query in rng.sample(sorted(words), 40):
+            query = query[1:] + "a"
+            expected = sorted(
+                (edit_distance(query, w, max_edits(query)), w) for w in words
+                if edit_distance(query, w, max_edits(query)) <= max_edits(query)
+            )
+            assert vocabulary.similar(query) == [w for _, w in expected][:MAX_FUZZY_EXPANSIONS]
+
+    def test_expansions_include_the_keyword_itself(self, vocabulary):
+        assert vocabulary.expansions(["migra", "redsi", "mi"], prefix=True, fuzzy=True) == {
+            "migra": ["migra", "migrate", "migration", "migrations-plan"],
+            "redsi": ["redis", "redsi"],
+            "mi": ["mi"],
+        }
+
+    def test_keyword_matches_follows_the_flags(self):
+        assert keyword_matches("migra", "migration", prefix=True, fuzzy=False)
+        assert not keyword_matches("migra", "migration", prefix=False, fuzzy=True)
+        assert keyword_matches("redsi", "redis", prefix=False, fuzzy=True)
+        assert not keyword_matches("mi", "migration", prefix=True, fuzzy=True)